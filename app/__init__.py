@@ -4,17 +4,34 @@ Initialisation de l'application Flask
 from flask import Flask
 from flask_cors import CORS
 from config import config
+import gc
+import logging
 import os
 
 
-def create_app(config_name='default'):
-    """Factory pour créer l'application Flask"""
+def create_app(config_name='default', preload=None):
+    """
+    Factory pour créer l'application Flask
+    
+    Args:
+        config_name: Nom de la configuration
+        preload: Construire les services et charger le dernier modèle dès la
+                 création de l'application (None = config PRELOAD_SERVICES).
+                 Avec un serveur pre-fork (gunicorn --preload), le modèle est
+                 chargé une seule fois dans le maître puis partagé par les
+                 workers en copy-on-write.
+    """
     
     app = Flask(__name__)
     
     # Charger la configuration
     app.config.from_object(config[config_name])
     
+    # Journalisation des services (sauf si le serveur l'a déjà configurée)
+    if not logging.getLogger().handlers:
+        logging.basicConfig(format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    logging.getLogger('app').setLevel(app.config['LOG_LEVEL'])
+    
     # Activer CORS
     CORS(app)
     
@@ -26,4 +43,17 @@ def create_app(config_name='default'):
     from app import routes
     app.register_blueprint(routes.bp)
     
+    # Construire les services avant le fork des workers
+    if preload is None:
+        preload = app.config['PRELOAD_SERVICES']
+    
+    if preload:
+        with app.app_context():
+            routes.get_services()
+            routes.get_result_cache()
+        
+        # Sortir les objets déjà créés du ramasse-miettes: ses passages dans
+        # les workers ne réécriront plus leurs en-têtes (pages partagées)
+        gc.freeze()
+    
     return app
\ No newline at end of file
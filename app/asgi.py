@@ -0,0 +1,415 @@
+"""
+Serveur ASGI (asyncio) de l'API JSON
+
+Les corps de requête sont lus et les réponses écrites sans bloquer: un
+client lent n'occupe qu'une coroutine. Le scoring, lui, s'exécute dans un
+pool de threads borné; quand sa file est pleine, la requête reçoit 503 avec
+Retry-After au lieu d'attendre indéfiniment.
+
+Les services (modèle, caches, métriques) sont ceux de l'application Flask:
+    uvicorn asgi:app
+"""
+import asyncio
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from flask import Flask
+
+from app import create_app, routes
+from app.utils.instrumentation import CONTENT_TYPE, POOL_JOBS, REGISTRY, REQUESTS_REJECTED, STAGE_SECONDS
+from app.utils.streaming import LineDecoder
+
+PARSE_SECONDS = STAGE_SECONDS.labels('parse')
+SERIALIZE_SECONDS = STAGE_SECONDS.labels('serialize')
+
+JSON_CONTENT_TYPE = b'application/json'
+NDJSON_CONTENT_TYPE = b'application/x-ndjson'
+
+
+class QueueFull(Exception):
+    """File du pool pleine: la requête est refusée (503)"""
+
+
+class HTTPError(Exception):
+    """Erreur renvoyée au client avec son code HTTP"""
+    
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ClientDisconnected(Exception):
+    """Le client a fermé la connexion avant la fin du corps"""
+
+
+class BoundedPool:
+    """
+    Pool de threads borné pour le travail CPU
+    
+    Au plus `workers` jobs s'exécutent et `queue_size` attendent. Au-delà,
+    run() lève QueueFull, ou attend une place si wait=True (flux: la
+    lecture du corps est suspendue, ce qui ralentit le client).
+    
+    Le compteur de jobs n'est modifié que dans la boucle asyncio: il n'a
+    pas besoin de verrou.
+    """
+    
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='classify')
+        self._waiters: deque = deque()
+    
+    @property
+    def full(self) -> bool:
+        return self.pending >= self.capacity
+    
+    async def run(self, function: Callable, *args, wait: bool = False):
+        """
+        Exécuter une fonction dans le pool
+        
+        Args:
+            function: Fonction à exécuter
+            *args: Ses arguments
+            wait: Attendre une place plutôt que lever QueueFull
+            
+        Returns:
+            Le résultat de la fonction
+        """
+        loop = asyncio.get_running_loop()
+        
+        while self.full:
+            if not wait:
+                raise QueueFull()
+            waiter = loop.create_future()
+            self._waiters.append(waiter)
+            await waiter
+        
+        self.pending += 1
+        # La place n'est libérée qu'à la fin réelle du job, même si la requête
+        # est annulée entre-temps (client déconnecté)
+        future = self._executor.submit(function, *args)
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        return await asyncio.wrap_future(future)
+    
+    def _release(self):
+        """Libérer une place et réveiller le premier job en attente"""
+        self.pending -= 1
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+    
+    def shutdown(self):
+        """Attendre les jobs en cours et arrêter les threads"""
+        self._executor.shutdown(wait=True)
+    
+    def get_stats(self) -> dict:
+        return {'workers': self.workers, 'capacity': self.capacity, 'pending': self.pending}
+
+
+class AsgiApplication:
+    """Application ASGI: /api/classify, /api/classify/batch, /api/classify/stream, /api/stats et /api/metrics"""
+    
+    def __init__(self, flask_app: Flask):
+        self.config = flask_app.config
+        
+        with flask_app.app_context():
+            _, self.preprocessing, self.classifier = routes.get_services()
+            self.result_cache = routes.get_result_cache()
+            self.coalescer = routes.get_coalescer()
+        
+        self.pool = BoundedPool(self.config['ASGI_POOL_WORKERS'], self.config['ASGI_QUEUE_SIZE'])
+        POOL_JOBS.set_function(lambda: self.pool.pending)
+        
+        self.routes: Dict[Tuple[str, str], Callable[..., Awaitable[None]]] = {
+            ('POST', '/api/classify'): self.api_classify,
+            ('POST', '/api/classify/batch'): self.api_classify_batch,
+            ('POST', '/api/classify/stream'): self.api_classify_stream,
+            ('GET', '/api/stats'): self.api_stats,
+            ('GET', '/api/metrics'): self.api_metrics
+        }
+    
+    async def __call__(self, scope: dict, receive: Callable, send: Callable):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        
+        if scope['type'] != 'http':
+            return
+        
+        handler = self.routes.get((scope['method'], scope['path']))
+        if handler is None:
+            if any(path == scope['path'] for _, path in self.routes):
+                await send_json(send, 405, {'error': 'Method not allowed'})
+            else:
+                await send_json(send, 404, {'error': 'Not found'})
+            return
+        
+        try:
+            await handler(scope, receive, send)
+        
+        except QueueFull:
+            REQUESTS_REJECTED.inc()
+            retry_after = str(self.config['ASGI_RETRY_AFTER']).encode('latin-1')
+            await send_json(send, 503, {'error': 'Server busy, retry later'},
+                            headers=[(b'retry-after', retry_after)])
+        
+        except HTTPError as e:
+            await send_json(send, e.status, {'error': str(e)})
+        
+        except ClientDisconnected:
+            pass
+        
+        except Exception as e:
+            await send_json(send, 500, {'error': str(e)})
+    
+    async def _lifespan(self, receive: Callable, send: Callable):
+        """Démarrage et arrêt du serveur"""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.get_running_loop().run_in_executor(None, self.pool.shutdown)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    
+    async def api_classify(self, scope: dict, receive: Callable, send: Callable):
+        """API: Classifier du texte (JSON)"""
+        data = await read_json(scope, receive, self.config['MAX_CONTENT_LENGTH'])
+        text = data.get('text', '') if isinstance(data, dict) else ''
+        
+        if not text:
+            raise HTTPError(400, 'Text is required')
+        
+        top_k, prune = parse_classify_options(data)
+        result = await self.pool.run(self.result_cache.classify, text, top_k, prune)
+        
+        await send_json(send, 200, routes.result_to_dict(result))
+    
+    async def api_classify_batch(self, scope: dict, receive: Callable, send: Callable):
+        """API: Classifier un lot de textes (JSON)"""
+        data = await read_json(scope, receive, self.config['MAX_CONTENT_LENGTH'])
+        texts = data.get('texts') if isinstance(data, dict) else None
+        
+        if not isinstance(texts, list) or not texts:
+            raise HTTPError(400, 'texts must be a non-empty list')
+        
+        if not all(isinstance(text, str) for text in texts):
+            raise HTTPError(400, 'texts must contain only strings')
+        
+        max_batch_size = self.config['MAX_BATCH_SIZE']
+        if len(texts) > max_batch_size:
+            raise HTTPError(413, f'Batch size exceeds the limit of {max_batch_size}')
+        
+        # prune est sans effet sur un lot (produit matriciel sur toutes les catégories)
+        top_k, _ = parse_classify_options(data)
+        results = await self.pool.run(self.classifier.classify_many, texts, top_k)
+        
+        await send_json(send, 200, {'results': [routes.result_to_dict(result) for result in results]})
+    
+    async def api_classify_stream(self, scope: dict, receive: Callable, send: Callable):
+        """
+        API: Classifier un flux de documents (un par ligne, texte brut ou NDJSON)
+        
+        Chaque résultat est renvoyé en NDJSON dès que le document est
+        classifié. Une fois le flux commencé, un pool plein n'interrompt plus
+        la réponse: la lecture du corps attend une place.
+        """
+        if not self.classifier.is_trained:
+            raise ValueError("Model not trained yet!")
+        
+        max_length = self.config['STREAM_MAX_CONTENT_LENGTH']
+        check_content_length(scope, max_length)
+        
+        if self.pool.full:
+            raise QueueFull()
+        
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', NDJSON_CONTENT_TYPE)]
+        })
+        
+        decoder = LineDecoder(self.config['STREAM_MAX_LINE_LENGTH'])
+        line_number = 0
+        received = 0
+        more_body = True
+        
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            
+            chunk = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            received += len(chunk)
+            
+            if max_length is not None and received > max_length:
+                await send_body(send, {'error': 'Stream exceeds STREAM_MAX_CONTENT_LENGTH'}, more_body=False)
+                return
+            
+            for line in decoder.feed(chunk, final=not more_body):
+                line_number += 1
+                output = await self._classify_line(line_number, line)
+                if output is not None:
+                    await send_body(send, output, more_body=True)
+        
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+    
+    async def _classify_line(self, line_number: int, line: Optional[str]) -> Optional[dict]:
+        """Résultat (ou erreur) d'une ligne du flux, None pour une ligne vide"""
+        output = {'line': line_number}
+        
+        try:
+            if line is None:
+                raise ValueError('Line exceeds STREAM_MAX_LINE_LENGTH')
+            
+            if not line.strip():
+                return None
+            
+            text = line
+            if line.lstrip().startswith('{'):
+                with PARSE_SECONDS.time():
+                    document = json.loads(line)
+                text = document.get('text', '')
+                if 'id' in document:
+                    output['id'] = document['id']
+            
+            if not isinstance(text, str) or not text:
+                raise ValueError('Text is required')
+            
+            result = await self.pool.run(self.classifier.classify, text, wait=True)
+            output.update(routes.result_to_dict(result))
+        
+        except Exception as e:
+            output['error'] = str(e)
+        
+        return output
+    
+    async def api_stats(self, scope: dict, receive: Callable, send: Callable):
+        """API: Statistiques du modèle"""
+        stats = self.classifier.get_stats()
+        stats['preprocessing'] = self.preprocessing.get_stats()
+        stats['result_cache'] = self.result_cache.get_stats()
+        stats['coalescer'] = self.coalescer.get_stats()
+        stats['pool'] = self.pool.get_stats()
+        
+        await send_json(send, 200, stats)
+    
+    async def api_metrics(self, scope: dict, receive: Callable, send: Callable):
+        """API: Métriques du processus au format Prometheus"""
+        await send_response(send, 200, REGISTRY.render().encode('utf-8'), CONTENT_TYPE.encode('latin-1'))
+
+
+def check_content_length(scope: dict, max_length: Optional[int]):
+    """Refuser (413) un corps annoncé plus grand que max_length"""
+    if max_length is None:
+        return
+    
+    for name, value in scope['headers']:
+        if name == b'content-length':
+            try:
+                length = int(value)
+            except ValueError:
+                raise HTTPError(400, 'Invalid Content-Length')
+            if length > max_length:
+                raise HTTPError(413, f'Request body exceeds the limit of {max_length} bytes')
+
+
+async def read_body(scope: dict, receive: Callable, max_length: Optional[int]) -> bytes:
+    """
+    Lire le corps de la requête sans bloquer la boucle
+    
+    Args:
+        scope: Scope ASGI de la requête
+        receive: Canal de réception ASGI
+        max_length: Taille max du corps (None = illimitée)
+        
+    Returns:
+        Le corps complet
+    """
+    check_content_length(scope, max_length)
+    
+    chunks: List[bytes] = []
+    received = 0
+    more_body = True
+    
+    while more_body:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ClientDisconnected()
+        
+        chunk = message.get('body', b'')
+        more_body = message.get('more_body', False)
+        received += len(chunk)
+        
+        if max_length is not None and received > max_length:
+            raise HTTPError(413, f'Request body exceeds the limit of {max_length} bytes')
+        chunks.append(chunk)
+    
+    return b''.join(chunks)
+
+
+def parse_classify_options(data: dict) -> Tuple[Optional[int], bool]:
+    """Options top_k et prune d'une requête de classification (400 si invalides)"""
+    try:
+        return routes.classify_options(data)
+    except ValueError as e:
+        raise HTTPError(400, str(e))
+
+
+async def read_json(scope: dict, receive: Callable, max_length: Optional[int]):
+    """Lire et décoder un corps JSON (400 s'il est invalide)"""
+    body = await read_body(scope, receive, max_length)
+    
+    try:
+        with PARSE_SECONDS.time():
+            return json.loads(body)
+    except ValueError:
+        raise HTTPError(400, 'Invalid JSON body')
+
+
+async def send_response(send: Callable, status: int, body: bytes, content_type: bytes,
+                        headers: Optional[List[Tuple[bytes, bytes]]] = None):
+    """Envoyer une réponse complète"""
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type),
+                    (b'content-length', str(len(body)).encode('latin-1'))] + (headers or [])
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_json(send: Callable, status: int, payload: dict,
+                    headers: Optional[List[Tuple[bytes, bytes]]] = None):
+    """Envoyer une réponse JSON"""
+    with SERIALIZE_SECONDS.time():
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    await send_response(send, status, body, JSON_CONTENT_TYPE, headers)
+
+
+async def send_body(send: Callable, output: dict, more_body: bool):
+    """Envoyer une ligne NDJSON d'une réponse en flux"""
+    with SERIALIZE_SECONDS.time():
+        line = json.dumps(output, ensure_ascii=False) + '\n'
+    await send({'type': 'http.response.body', 'body': line.encode('utf-8'), 'more_body': more_body})
+
+
+def create_asgi_app(config_name: str = 'default') -> AsgiApplication:
+    """
+    Créer l'application ASGI
+    
+    Args:
+        config_name: Nom de la configuration Flask (services et limites)
+        
+    Returns:
+        L'application, avec ses services construits et le dernier modèle chargé
+    """
+    return AsgiApplication(create_app(config_name, preload=True))
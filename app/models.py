@@ -13,6 +13,7 @@ class ClassificationResult:
     probabilities: Dict[str, float]
     total_tokens: int
     unique_tokens: int
+    model_version: Optional[str] = None
 
 
 @dataclass
@@ -35,6 +36,22 @@ class EvaluationMetrics:
         }
 
 
+@dataclass
+class CrossValidationMetrics:
+    """Métriques de validation croisée (moyenne et écart-type sur les folds)"""
+    k: int
+    categories: List[str]
+    fold_accuracies: List[float]
+    accuracy_mean: float
+    accuracy_std: float
+    precision_mean: Dict[str, float]
+    precision_std: Dict[str, float]
+    recall_mean: Dict[str, float]
+    recall_std: Dict[str, float]
+    f1_score_mean: Dict[str, float]
+    f1_score_std: Dict[str, float]
+
+
 @dataclass
 class TrainingDocument:
     """Document d'entraînement"""
@@ -1,16 +1,39 @@
 """
 Routes de l'application Flask
 """
-from flask import Blueprint, render_template, request, jsonify, current_app, flash, redirect, url_for
+from flask import (Blueprint, render_template, request, jsonify, current_app, flash, redirect, url_for,
+                   Response, stream_with_context)
 from werkzeug.utils import secure_filename
+from werkzeug.wsgi import get_input_stream
+import json
+import logging
 import os
-from typing import List
+import shutil
+from dataclasses import asdict
+from typing import Callable, List, Optional, Tuple, Union, TYPE_CHECKING
 
-from app.models import TrainingDocument
+from app.models import ClassificationResult, TrainingDocument
 from app.services.stop_words import StopWordsService
 from app.services.text_preprocessing import TextPreprocessingService
 from app.services.naive_bayes import NaiveBayesClassifier
-from app.utils.metrics import MetricsCalculator
+from app.services.hierarchical import HierarchicalClassifier
+from app.services.result_cache import ResultCache
+from app.services.coalescer import RequestCoalescer
+from app.utils.instrumentation import (CACHE_HITS, CACHE_MISSES, CONTENT_TYPE, MODEL_BYTES, REGISTRY,
+                                       STAGE_SECONDS, VOCABULARY_SIZE)
+from app.utils.pruning import VocabularyPruning
+from app.utils.streaming import iter_lines
+
+# Services d'entraînement et d'évaluation: importés au premier usage, pour
+# que les workers de production démarrent sans charger scipy & co.
+if TYPE_CHECKING:
+    from app.services.corpus_loader import CorpusLoader
+    from app.services.preprocessed_cache import PreprocessedCorpusCache
+
+logger = logging.getLogger(__name__)
+
+PARSE_SECONDS = STAGE_SECONDS.labels('parse')
+SERIALIZE_SECONDS = STAGE_SECONDS.labels('serialize')
 
 # Créer le blueprint
 bp = Blueprint('main', __name__)
@@ -19,6 +42,9 @@ bp = Blueprint('main', __name__)
 _stop_words_service = None
 _preprocessing_service = None
 _classifier = None
+_result_cache = None
+_coalescer = None
+_preprocessed_cache = None
 
 
 def get_services():
@@ -27,39 +53,166 @@ def get_services():
     
     if _stop_words_service is None:
         _stop_words_service = StopWordsService()
-        _preprocessing_service = TextPreprocessingService(_stop_words_service)
-        _classifier = NaiveBayesClassifier(_preprocessing_service)
+        _preprocessing_service = TextPreprocessingService(_stop_words_service,
+                                                          cache_size=current_app.config['STEM_CACHE_SIZE'],
+                                                          timing_sample=current_app.config['STAGE_TIMING_SAMPLE'])
+        pruning = VocabularyPruning(min_df=current_app.config['VOCAB_MIN_DF'],
+                                    min_count=current_app.config['VOCAB_MIN_COUNT'],
+                                    max_df=current_app.config['VOCAB_MAX_DF'],
+                                    top_n=current_app.config['VOCAB_TOP_N'])
+        _classifier = NaiveBayesClassifier(_preprocessing_service,
+                                           hash_bits=current_app.config['FEATURE_HASHING_BITS'],
+                                           pruning=pruning)
+        if current_app.config['HIERARCHICAL_CLASSIFIER']:
+            _classifier = HierarchicalClassifier(_classifier, beam_width=current_app.config['HIERARCHY_BEAM_WIDTH'])
+        
+        # Valeurs lues à chaque export des métriques (rien sur le chemin critique)
+        classifier = _classifier
+        VOCABULARY_SIZE.set_function(lambda: classifier.get_stats()['vocabulary_size'])
+        MODEL_BYTES.set_function(lambda: classifier.get_stats()['model_bytes'])
+        register_cache_metrics('stem', _preprocessing_service.stem_cache.get_stats)
+        
+        # Démarrage à chaud depuis le dernier modèle sauvegardé
+        model_path = latest_model_path()
+        if model_path is not None:
+            try:
+                _classifier.load(model_path)
+            except Exception as e:
+                logger.error("Error loading model %s: %s", model_path, e)
     
     return _stop_words_service, _preprocessing_service, _classifier
 
 
-def load_training_data() -> List[TrainingDocument]:
-    """Charger les données d'entraînement depuis le dossier"""
-    documents = []
-    training_dir = current_app.config['TRAINING_DIR']
+def get_result_cache() -> ResultCache:
+    """Obtenir le cache des résultats de classification (singleton)"""
+    global _result_cache
     
-    if not os.path.exists(training_dir):
-        return documents
+    if _result_cache is None:
+        _, _, classifier = get_services()
+        _result_cache = ResultCache(classifier,
+                                    maxsize=current_app.config['RESULT_CACHE_SIZE'],
+                                    ttl=current_app.config['RESULT_CACHE_TTL'],
+                                    classify=get_coalescer().classify)
+        register_cache_metrics('result', _result_cache.get_stats)
     
-    for filename in os.listdir(training_dir):
-        if filename.endswith('.txt'):
-            filepath = os.path.join(training_dir, filename)
-            category = filename.replace('.txt', '')
-            
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-                    
-                if content:
-                    documents.append(TrainingDocument(
-                        category=category,
-                        content=content,
-                        filepath=filepath
-                    ))
-            except Exception as e:
-                print(f"Error reading {filename}: {e}")
+    return _result_cache
+
+
+def get_coalescer() -> RequestCoalescer:
+    """Obtenir le regroupement en lots des classifications concurrentes (singleton)"""
+    global _coalescer
+    
+    if _coalescer is None:
+        _, _, classifier = get_services()
+        _coalescer = RequestCoalescer(classifier,
+                                      window=current_app.config['COALESCE_WINDOW'],
+                                      max_batch_size=current_app.config['COALESCE_MAX_BATCH_SIZE'])
+    
+    return _coalescer
+
+
+def get_preprocessed_cache() -> Optional['PreprocessedCorpusCache']:
+    """Obtenir le cache des documents prétraités (None s'il est désactivé)"""
+    global _preprocessed_cache
+    
+    if not current_app.config['PREPROCESSED_CACHE_ENABLED']:
+        return None
+    
+    if _preprocessed_cache is None:
+        from app.services.preprocessed_cache import PreprocessedCorpusCache
+        
+        _, preprocessing, _ = get_services()
+        _preprocessed_cache = PreprocessedCorpusCache(current_app.config['PREPROCESSED_CACHE_DIR'],
+                                                      preprocessing)
+        register_cache_metrics('preprocessed', _preprocessed_cache.get_stats)
+    
+    return _preprocessed_cache
+
+
+def register_cache_metrics(name: str, get_stats: Callable[[], dict]):
+    """Exporter les hits et misses d'un cache (lus dans ses statistiques)"""
+    CACHE_HITS.labels(name).set_function(lambda: get_stats()['hits'])
+    CACHE_MISSES.labels(name).set_function(lambda: get_stats()['misses'])
+
+
+def latest_model_path() -> Optional[str]:
+    """Chemin du dernier modèle sauvegardé (None s'il n'y en a pas)"""
+    model_dir = current_app.config['MODEL_DIR']
+    
+    if not os.path.isdir(model_dir):
+        return None
+    
+    names = sorted(name for name in os.listdir(model_dir)
+                   if name.startswith('model-') and not name.endswith('.tmp'))
+    
+    return os.path.join(model_dir, names[-1]) if names else None
+
+
+def save_model(classifier: Union[NaiveBayesClassifier, HierarchicalClassifier]):
+    """Sauvegarder le modèle et ne garder que les MODEL_KEEP plus récents"""
+    if not current_app.config['AUTO_SAVE_MODEL']:
+        return
+    
+    model_dir = current_app.config['MODEL_DIR']
+    os.makedirs(model_dir, exist_ok=True)
+    
+    path = os.path.join(model_dir, f'model-{classifier.model_version}')
+    if not os.path.exists(path):
+        classifier.save(path)
     
-    return documents
+    names = sorted(name for name in os.listdir(model_dir)
+                   if name.startswith('model-') and not name.endswith('.tmp'))
+    for old_name in names[:-current_app.config['MODEL_KEEP']]:
+        shutil.rmtree(os.path.join(model_dir, old_name), ignore_errors=True)
+
+
+def result_to_dict(result: ClassificationResult) -> dict:
+    """Convertir un résultat de classification en dictionnaire JSON"""
+    return {
+        'predicted_category': result.predicted_category,
+        'confidence': result.confidence,
+        'probabilities': result.probabilities,
+        'total_tokens': result.total_tokens,
+        'unique_tokens': result.unique_tokens,
+        'model_version': result.model_version
+    }
+
+
+def classify_options(data: dict) -> Tuple[Optional[int], bool]:
+    """
+    Lire les options top_k et prune d'une requête de classification
+    
+    Args:
+        data: Corps JSON de la requête
+        
+    Returns:
+        (top_k, prune); ValueError si une option est invalide
+    """
+    top_k = data.get('top_k')
+    if top_k is not None and (not isinstance(top_k, int) or isinstance(top_k, bool) or top_k < 1):
+        raise ValueError('top_k must be a positive integer')
+    
+    prune = data.get('prune', False)
+    if not isinstance(prune, bool):
+        raise ValueError('prune must be a boolean')
+    
+    return top_k, prune
+
+
+def get_corpus_loader() -> 'CorpusLoader':
+    """Créer le chargeur du corpus d'entraînement"""
+    from app.services.corpus_loader import CorpusLoader
+    
+    return CorpusLoader(current_app.config['TRAINING_DIR'],
+                        current_app.config['CORPUS_MANIFEST_FILE'],
+                        read_workers=current_app.config['CORPUS_READ_WORKERS'],
+                        hierarchical=current_app.config['HIERARCHICAL_CLASSIFIER'])
+
+
+def load_training_data() -> List[TrainingDocument]:
+    """Charger les données d'entraînement depuis le dossier"""
+    loader = get_corpus_loader()
+    return list(loader.iter_documents(loader.scan()))
 
 
 @bp.route('/')
@@ -91,18 +244,39 @@ def train():
     try:
         _, _, classifier = get_services()
         
-        # Charger les données
-        documents = load_training_data()
+        # Lister le corpus (les fichiers sont lus à la demande)
+        loader = get_corpus_loader()
+        files = loader.scan()
         
-        if not documents:
+        if not files:
             flash('Aucune donnée d\'entraînement trouvée dans le dossier data/training/', 'error')
             return redirect(url_for('main.index'))
         
-        # Entraîner
-        classifier.train(documents)
+        changes = loader.diff(files, classifier.model_version)
+        cache = get_preprocessed_cache()
+        
+        # partial_fit n'élague pas: avec l'élagage, seul un réentraînement complet
+        # donne le même modèle, quel que soit l'historique des entraînements
+        incremental = changes.incremental and not classifier.pruning.enabled
         
-        flash(f'Modèle entraîné avec succès! ({len(documents)} documents)', 'success')
+        if incremental:
+            # Seuls des fichiers ont été ajoutés depuis le dernier entraînement
+            if changes.added:
+                classifier.partial_fit(list(loader.iter_documents(changes.added)), cache=cache)
+        else:
+            classifier.train(loader.iter_documents(files), workers=current_app.config['TRAINING_WORKERS'],
+                             cache=cache)
         
+        save_model(classifier)
+        loader.save_manifest(files, classifier.model_version)
+        
+        total_documents = classifier.get_stats()['total_documents']
+        if incremental:
+            flash(f'Modèle mis à jour! ({len(changes.added)} nouveaux fichiers, '
+                  f'{total_documents} documents)', 'success')
+        else:
+            flash(f'Modèle entraîné avec succès! ({total_documents} documents)', 'success')
+    
     except Exception as e:
         flash(f'Erreur lors de l\'entraînement: {str(e)}', 'error')
     
@@ -122,22 +296,26 @@ def train_evaluate():
             flash('Aucune donnée d\'entraînement trouvée', 'error')
             return redirect(url_for('main.index'))
         
-        # Split train/test
+        # Split train/test (reproductible)
         import random
-        random.shuffle(documents)
+        random.Random(current_app.config['RANDOM_STATE']).shuffle(documents)
         
         test_size = int(len(documents) * current_app.config['TEST_SIZE'])
         train_docs = documents[:-test_size] if test_size > 0 else documents
         test_docs = documents[-test_size:] if test_size > 0 else []
         
         # Entraîner
-        classifier.train(train_docs)
+        cache = get_preprocessed_cache()
+        classifier.train(train_docs, workers=current_app.config['TRAINING_WORKERS'], cache=cache)
+        save_model(classifier)
         
         # Évaluer
         metrics = None
         if test_docs:
+            from app.utils.metrics import MetricsCalculator
+            
             calculator = MetricsCalculator()
-            metrics = calculator.evaluate(classifier, test_docs)
+            metrics = calculator.evaluate(classifier, test_docs, cache=cache)
         
         return render_template('index.html',
                              trained=True,
@@ -146,7 +324,7 @@ def train_evaluate():
                              train_size=len(train_docs),
                              test_size=len(test_docs),
                              success='Entraînement et évaluation terminés!')
-        
+    
     except Exception as e:
         flash(f'Erreur: {str(e)}', 'error')
         return redirect(url_for('main.index'))
@@ -178,7 +356,7 @@ def classify_file():
                              file_name=file.filename,
                              content=content,
                              result=result)
-        
+    
     except Exception as e:
         flash(f'Erreur lors de la classification: {str(e)}', 'error')
         return redirect(url_for('main.upload_page'))
@@ -188,8 +366,6 @@ def classify_file():
 def classify_text():
     """Classifier du texte saisi"""
     try:
-        _, _, classifier = get_services()
-        
         text = request.form.get('text', '').strip()
         
         if not text:
@@ -197,13 +373,13 @@ def classify_text():
             return redirect(url_for('main.upload_page'))
         
         # Classifier
-        result = classifier.classify(text)
+        result = get_result_cache().classify(text)
         
         return render_template('result.html',
                              file_name='Texte saisi',
                              content=text,
                              result=result)
-        
+    
     except Exception as e:
         flash(f'Erreur lors de la classification: {str(e)}', 'error')
         return redirect(url_for('main.upload_page'))
@@ -213,31 +389,219 @@ def classify_text():
 @bp.route('/api/stats')
 def api_stats():
     """API: Statistiques du modèle"""
-    _, _, classifier = get_services()
-    return jsonify(classifier.get_stats())
+    _, preprocessing, classifier = get_services()
+    
+    stats = classifier.get_stats()
+    stats['preprocessing'] = preprocessing.get_stats()
+    stats['result_cache'] = get_result_cache().get_stats()
+    stats['coalescer'] = get_coalescer().get_stats()
+    
+    return jsonify(stats)
+
+
+@bp.route('/api/metrics')
+def api_metrics():
+    """API: Métriques du processus (latences par étape, compteurs, jauges) au format Prometheus"""
+    get_services()
+    get_result_cache()
+    
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
 
 
 @bp.route('/api/classify', methods=['POST'])
 def api_classify():
     """API: Classifier du texte (JSON)"""
     try:
-        _, _, classifier = get_services()
-        
-        data = request.get_json()
+        with PARSE_SECONDS.time():
+            data = request.get_json()
         text = data.get('text', '')
         
         if not text:
             return jsonify({'error': 'Text is required'}), 400
         
-        result = classifier.classify(text)
+        try:
+            top_k, prune = classify_options(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        result = get_result_cache().classify(text, top_k, prune)
+        
+        with SERIALIZE_SECONDS.time():
+            return jsonify(result_to_dict(result))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/api/classify/batch', methods=['POST'])
+def api_classify_batch():
+    """API: Classifier un lot de textes (JSON)"""
+    try:
+        _, _, classifier = get_services()
+        
+        with PARSE_SECONDS.time():
+            data = request.get_json()
+        texts = data.get('texts')
+        
+        if not isinstance(texts, list) or not texts:
+            return jsonify({'error': 'texts must be a non-empty list'}), 400
+        
+        if not all(isinstance(text, str) for text in texts):
+            return jsonify({'error': 'texts must contain only strings'}), 400
+        
+        max_batch_size = current_app.config['MAX_BATCH_SIZE']
+        if len(texts) > max_batch_size:
+            return jsonify({'error': f'Batch size exceeds the limit of {max_batch_size}'}), 413
+        
+        # prune est sans effet sur un lot (produit matriciel sur toutes les catégories)
+        try:
+            top_k, _ = classify_options(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        results = classifier.classify_many(texts, top_k)
+        
+        with SERIALIZE_SECONDS.time():
+            return jsonify({'results': [result_to_dict(result) for result in results]})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/api/train/partial', methods=['POST'])
+def api_train_partial():
+    """
+    API: Ajouter des documents étiquetés au modèle sans réentraînement (JSON)
+    
+    Les documents sont aussi écrits dans le dossier d'entraînement (et le
+    manifeste du corpus mis à jour): un entraînement complet les garde.
+    """
+    try:
+        _, _, classifier = get_services()
+        
+        data = request.get_json()
+        items = data.get('documents')
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'documents must be a non-empty list'}), 400
+        
+        documents = []
+        for item in items:
+            category = item.get('category') if isinstance(item, dict) else None
+            content = item.get('content') if isinstance(item, dict) else None
+            
+            # Un fichier vide est ignoré à l'entraînement complet: le refuser ici aussi
+            if (not isinstance(category, str) or not category
+                    or not isinstance(content, str) or not content.strip()):
+                return jsonify({'error': 'Each document requires a category and a content'}), 400
+            
+            documents.append(TrainingDocument(category=category, content=content.strip()))
+        
+        loader = get_corpus_loader()
+        try:
+            files = loader.write_documents(documents)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        previous_version = classifier.model_version
+        classifier.partial_fit(documents)
+        save_model(classifier)
+        loader.extend_manifest(files, previous_version, classifier.model_version)
+        
+        return jsonify(classifier.get_stats())
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/api/cross-validate', methods=['POST'])
+def api_cross_validate():
+    """API: Validation croisée en k folds sur le corpus (le modèle servi n'est pas modifié)"""
+    try:
+        _, _, classifier = get_services()
+        
+        data = request.get_json(silent=True) or {}
+        k = data.get('k', current_app.config['CV_FOLDS'])
+        
+        if not isinstance(k, int) or k < 2:
+            return jsonify({'error': 'k must be an integer >= 2'}), 400
+        
+        documents = load_training_data()
+        
+        if len(documents) < k:
+            return jsonify({'error': f'At least {k} documents are required'}), 400
+        
+        from app.utils.metrics import MetricsCalculator
+        
+        metrics = MetricsCalculator.cross_validate(
+            classifier, documents, k=k,
+            random_state=current_app.config['RANDOM_STATE'],
+            workers=current_app.config['TRAINING_WORKERS'],
+            cache=get_preprocessed_cache()
+        )
         
-        return jsonify({
-            'predicted_category': result.predicted_category,
-            'confidence': result.confidence,
-            'probabilities': result.probabilities,
-            'total_tokens': result.total_tokens,
-            'unique_tokens': result.unique_tokens
-        })
+        return jsonify(asdict(metrics))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/api/classify/stream', methods=['POST'])
+def api_classify_stream():
+    """
+    API: Classifier un flux de documents (un par ligne, texte brut ou NDJSON)
+    
+    Le corps est lu et décodé au fil de l'eau et chaque résultat est renvoyé
+    en NDJSON dès que le document correspondant est classifié.
+    """
+    try:
+        _, _, classifier = get_services()
         
+        if not classifier.is_trained:
+            raise ValueError("Model not trained yet!")
+        
+        # Ce flux n'est pas soumis à MAX_CONTENT_LENGTH
+        stream = get_input_stream(
+            request.environ,
+            max_content_length=current_app.config['STREAM_MAX_CONTENT_LENGTH']
+        )
+    
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+    
+    def generate():
+        lines = iter_lines(stream,
+                           chunk_size=current_app.config['STREAM_CHUNK_SIZE'],
+                           max_line_length=current_app.config['STREAM_MAX_LINE_LENGTH'])
+        
+        for line_number, line in enumerate(lines, start=1):
+            output = {'line': line_number}
+            
+            try:
+                if line is None:
+                    raise ValueError('Line exceeds STREAM_MAX_LINE_LENGTH')
+                
+                if not line.strip():
+                    continue
+                
+                text = line
+                if line.lstrip().startswith('{'):
+                    with PARSE_SECONDS.time():
+                        document = json.loads(line)
+                    text = document.get('text', '')
+                    if 'id' in document:
+                        output['id'] = document['id']
+                
+                if not isinstance(text, str) or not text:
+                    raise ValueError('Text is required')
+                
+                output.update(result_to_dict(classifier.classify(text)))
+            
+            except Exception as e:
+                output['error'] = str(e)
+            
+            with SERIALIZE_SECONDS.time():
+                serialized = json.dumps(output, ensure_ascii=False) + '\n'
+            yield serialized
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
@@ -0,0 +1,178 @@
+"""
+Regroupement des classifications concurrentes en lots (micro-batching)
+"""
+from collections import deque
+from itertools import islice
+from threading import Condition, Lock
+from time import perf_counter
+from typing import Optional
+from app.models import ClassificationResult
+from app.services.naive_bayes import NaiveBayesClassifier
+from app.utils.instrumentation import COALESCED_BATCH_SIZE, COALESCER_WAIT_SECONDS
+
+
+class _PendingRequest:
+    """Texte en attente de son lot"""
+    
+    __slots__ = ('text', 'top_k', 'prune', 'enqueued', 'signal', 'promoted', 'result', 'error')
+    
+    def __init__(self, text: str, top_k: Optional[int], prune: bool):
+        self.text = text
+        self.top_k = top_k
+        self.prune = prune
+        self.enqueued = perf_counter()
+        # Verrou pris d'avance: l'appel attend en le reprenant, il est libéré
+        # une seule fois (résultat prêt, ou promotion en leader)
+        self.signal = Lock()
+        self.signal.acquire()
+        self.promoted = False
+        self.result: Optional[ClassificationResult] = None
+        self.error: Optional[BaseException] = None
+
+
+class RequestCoalescer:
+    """
+    Classifie ensemble les textes soumis en même temps par plusieurs threads
+    
+    Chaque appel rejoint une file. Le premier arrivé (le leader) forme un
+    lot, le prétraite et le score en un seul appel à classify_many, puis rend
+    à chaque appel son résultat; les autres threads dorment en attendant, au
+    lieu de se disputer le GIL. Pendant ce scoring, le premier texte resté en
+    file devient leader du lot suivant.
+    
+    Le leader n'attend que si un lot est en cours de scoring: les textes
+    arrivés entre-temps forment le lot suivant, jusqu'à `max_batch_size`
+    textes ou `window` secondes. Sans lot en cours, le texte est classifié
+    tout de suite: à faible charge, le regroupement n'ajoute pas de latence.
+    
+    Un lot ne regroupe que des textes consécutifs de même top_k. L'élagage
+    (prune) ne sert qu'aux textes classifiés seuls: il ne change pas le
+    résultat, et le scoring en lot calcule toutes les catégories.
+    """
+    
+    def __init__(self, classifier: NaiveBayesClassifier, window: float = 0.002, max_batch_size: int = 64):
+        self.classifier = classifier
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._queue: deque = deque()
+        self._condition = Condition(Lock())
+        self._leader = False  # Un leader forme-t-il déjà un lot?
+        self._scoring = 0  # Lots en cours de scoring
+        self.batches = 0
+        self.requests = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0 and self.max_batch_size > 1
+    
+    def classify(self, text: str, top_k: Optional[int] = None, prune: bool = False) -> ClassificationResult:
+        """
+        Classifier un texte, avec ceux soumis en même temps
+        
+        Args:
+            text: Texte à classifier
+            top_k: Ne garder que les k catégories les plus probables (toutes si None)
+            prune: Scoring élagué si le texte est classifié seul
+            
+        Returns:
+            ClassificationResult (le même que classify() du classificateur)
+        """
+        if not self.enabled:
+            return self.classifier.classify(text, top_k, prune)
+        
+        if prune and top_k is None:
+            top_k = 1
+        request = _PendingRequest(text, top_k, prune)
+        
+        with self._condition:
+            self._queue.append(request)
+            
+            leader = not self._leader
+            if leader:
+                self._leader = True
+            elif len(self._queue) >= self.max_batch_size:
+                # Lot complet: inutile d'attendre la fin de la fenêtre
+                self._condition.notify()
+        
+        if not leader:
+            request.signal.acquire()
+            if not request.promoted:
+                return self._result_of(request)
+        
+        # Le texte du leader est en tête de file: son résultat est prêt au retour de _lead()
+        self._lead()
+        return self._result_of(request)
+    
+    def _lead(self):
+        """Former un lot à partir de la tête de file, le scorer et réveiller ses appels"""
+        with self._condition:
+            deadline = self._queue[0].enqueued + self.window
+            while len(self._queue) < self.max_batch_size and self._scoring:
+                remaining = deadline - perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            
+            top_k = self._queue[0].top_k
+            size = 0
+            for request in islice(self._queue, self.max_batch_size):
+                if request.top_k != top_k:
+                    break
+                size += 1
+            batch = [self._queue.popleft() for _ in range(size)]
+            
+            # Les textes restants ont un nouveau leader, qui forme son lot pendant ce scoring
+            if self._queue:
+                successor = self._queue[0]
+                successor.promoted = True
+                successor.signal.release()
+            else:
+                self._leader = False
+            
+            self._scoring += 1
+            self.batches += 1
+            self.requests += size
+        
+        started = perf_counter()
+        for request in batch:
+            COALESCER_WAIT_SECONDS.observe(started - request.enqueued)
+        COALESCED_BATCH_SIZE.observe(size)
+        
+        try:
+            if size == 1:
+                results = [self.classifier.classify(batch[0].text, top_k, batch[0].prune)]
+            else:
+                results = self.classifier.classify_many([request.text for request in batch], top_k)
+        except Exception as e:
+            results = [None] * size
+            for request in batch:
+                request.error = e
+        finally:
+            with self._condition:
+                self._scoring -= 1
+                # Le scoreur est libre: le lot suivant (s'il se forme) part tout de suite
+                if self._queue:
+                    self._condition.notify()
+        
+        # Le premier texte est celui du leader, qui n'attend pas de signal
+        batch[0].result = results[0]
+        for request, result in zip(batch[1:], results[1:]):
+            request.result = result
+            request.signal.release()
+    
+    @staticmethod
+    def _result_of(request: _PendingRequest) -> ClassificationResult:
+        if request.error is not None:
+            raise request.error
+        return request.result
+    
+    def get_stats(self) -> dict:
+        """Obtenir les statistiques du regroupement"""
+        return {
+            'enabled': self.enabled,
+            'window': self.window,
+            'max_batch_size': self.max_batch_size,
+            'batches': self.batches,
+            'requests': self.requests,
+            'mean_batch_size': self.requests / self.batches if self.batches else 0.0
+        }
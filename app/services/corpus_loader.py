@@ -0,0 +1,275 @@
+"""
+Chargement du corpus d'entraînement
+"""
+import json
+import logging
+import os
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional
+from app.models import TrainingDocument
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CorpusFile:
+    """Fichier du corpus et son empreinte (mtime, taille)"""
+    path: str
+    category: str
+    mtime_ns: int
+    size: int
+
+
+@dataclass
+class CorpusChanges:
+    """Différences entre le corpus sur disque et le dernier manifeste"""
+    added: List[CorpusFile] = field(default_factory=list)
+    modified: List[CorpusFile] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    
+    @property
+    def incremental(self) -> bool:
+        """Le modèle peut-il être mis à jour avec les seuls nouveaux fichiers?"""
+        return not self.modified and not self.removed
+
+
+class CorpusLoader:
+    """
+    Chargeur du corpus d'entraînement
+    
+    Deux dispositions sont reconnues dans le dossier d'entraînement:
+    - un sous-dossier par catégorie, chaque fichier .txt étant un document
+      (data/training/sport/article1.txt);
+    - un fichier .txt par catégorie à la racine, qui forme un seul document
+      (data/training/sport.txt).
+    
+    En mode hiérarchique, la catégorie d'un fichier est le chemin de son
+    dossier (data/training/sport/football/article1.txt: sport/football).
+    
+    Un manifeste (chemin -> mtime, taille) mémorise le corpus du dernier
+    entraînement, pour ne relire que les fichiers ajoutés depuis.
+    """
+    
+    def __init__(self, training_dir: str, manifest_file: str, read_workers: int = 8,
+                 extensions: Iterable[str] = ('.txt',), hierarchical: bool = False):
+        self.training_dir = training_dir
+        self.manifest_file = manifest_file
+        self.read_workers = max(1, read_workers)
+        self.extensions = tuple(extensions)
+        self.hierarchical = hierarchical
+    
+    def scan(self) -> List[CorpusFile]:
+        """
+        Lister les fichiers du corpus (sans les lire)
+        
+        Returns:
+            Fichiers du corpus, triés par chemin
+        """
+        files = []
+        
+        if not os.path.isdir(self.training_dir):
+            return files
+        
+        for entry in os.scandir(self.training_dir):
+            if entry.is_file() and entry.name.endswith(self.extensions):
+                # Disposition à plat: le nom du fichier est la catégorie
+                category = os.path.splitext(entry.name)[0]
+                files.append(self._corpus_file(entry.path, category))
+            elif entry.is_dir():
+                # Un dossier par catégorie (par niveau de l'arborescence en mode hiérarchique)
+                for root, _, filenames in os.walk(entry.path):
+                    category = entry.name
+                    if self.hierarchical:
+                        category = os.path.relpath(root, self.training_dir).replace(os.sep, '/')
+                    for filename in filenames:
+                        if filename.endswith(self.extensions):
+                            files.append(self._corpus_file(os.path.join(root, filename), category))
+        
+        files.sort(key=lambda corpus_file: corpus_file.path)
+        return files
+    
+    @staticmethod
+    def _corpus_file(path: str, category: str) -> CorpusFile:
+        stat = os.stat(path)
+        return CorpusFile(path=path, category=category, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+    
+    def iter_documents(self, files: Iterable[CorpusFile]) -> Iterator[TrainingDocument]:
+        """
+        Lire les documents de façon paresseuse, avec des lectures concurrentes
+        
+        Seuls quelques fichiers d'avance sont lus: le corpus n'est jamais
+        entièrement en mémoire. L'ordre des fichiers est conservé.
+        
+        Args:
+            files: Fichiers à lire
+            
+        Yields:
+            Les documents non vides
+        """
+        max_pending = self.read_workers * 4
+        
+        with ThreadPoolExecutor(max_workers=self.read_workers) as executor:
+            pending = deque()
+            
+            for corpus_file in files:
+                pending.append(executor.submit(self._read, corpus_file))
+                if len(pending) >= max_pending:
+                    document = pending.popleft().result()
+                    if document is not None:
+                        yield document
+            
+            while pending:
+                document = pending.popleft().result()
+                if document is not None:
+                    yield document
+    
+    @staticmethod
+    def _read(corpus_file: CorpusFile) -> Optional[TrainingDocument]:
+        """Lire un fichier du corpus (None s'il est vide ou illisible)"""
+        try:
+            with open(corpus_file.path, 'r', encoding='utf-8') as f:
+                content = f.read().strip()
+        except Exception as e:
+            logger.error("Error reading %s: %s", corpus_file.path, e)
+            return None
+        
+        if not content:
+            return None
+        
+        return TrainingDocument(category=corpus_file.category, content=content,
+                                filepath=corpus_file.path)
+    
+    def write_documents(self, documents: Iterable[TrainingDocument]) -> List[CorpusFile]:
+        """
+        Ajouter des documents au corpus, un fichier par document
+        
+        Chaque document est écrit dans le dossier de sa catégorie (un dossier
+        par niveau en mode hiérarchique), sous un nom unique: le prochain
+        entraînement complet le relit comme les autres fichiers.
+        
+        Args:
+            documents: Documents étiquetés
+            
+        Returns:
+            Fichiers écrits, dans l'ordre des documents
+            
+        Raises:
+            ValueError: Si une catégorie n'est pas un nom de dossier valide
+        """
+        documents = list(documents)
+        directories = [self._category_dir(doc.category) for doc in documents]
+        
+        files = []
+        for doc, directory in zip(documents, directories):
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, uuid.uuid4().hex + self.extensions[0])
+            
+            # Écriture atomique: un scan concurrent ne voit pas de fichier à moitié écrit
+            tmp_file = path + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(doc.content)
+            os.replace(tmp_file, path)
+            
+            files.append(self._corpus_file(path, doc.category))
+        
+        return files
+    
+    def _category_dir(self, category: str) -> str:
+        """Dossier d'une catégorie (ValueError si elle sortirait du dossier d'entraînement)"""
+        parts = category.split('/') if self.hierarchical else [category]
+        
+        for part in parts:
+            if (part in ('', '.', '..') or os.sep in part or (os.altsep and os.altsep in part)
+                    or '\0' in part):
+                raise ValueError(f'Invalid category: {category!r}')
+        
+        return os.path.join(self.training_dir, *parts)
+    
+    def diff(self, files: List[CorpusFile], model_version: Optional[str]) -> CorpusChanges:
+        """
+        Comparer le corpus au manifeste du dernier entraînement
+        
+        Si le modèle publié n'est pas celui du manifeste, tous les fichiers
+        sont considérés comme modifiés (réentraînement complet).
+        
+        Args:
+            files: Fichiers actuels du corpus
+            model_version: Version du modèle publié
+            
+        Returns:
+            CorpusChanges
+        """
+        manifest = self.load_manifest()
+        
+        if model_version is None or manifest.get('model_version') != model_version:
+            return CorpusChanges(modified=list(files))
+        
+        known: Dict[str, list] = manifest.get('files', {})
+        changes = CorpusChanges()
+        
+        for corpus_file in files:
+            entry = known.get(corpus_file.path)
+            if entry is None:
+                changes.added.append(corpus_file)
+            elif entry != [corpus_file.mtime_ns, corpus_file.size, corpus_file.category]:
+                changes.modified.append(corpus_file)
+            else:
+                changes.unchanged += 1
+        
+        current = {corpus_file.path for corpus_file in files}
+        changes.removed = [path for path in known if path not in current]
+        
+        return changes
+    
+    def load_manifest(self) -> dict:
+        """Charger le manifeste (vide s'il n'existe pas ou est illisible)"""
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def save_manifest(self, files: List[CorpusFile], model_version: str):
+        """Enregistrer le corpus correspondant au modèle publié"""
+        self._write_manifest({
+            'model_version': model_version,
+            'files': {corpus_file.path: self._manifest_entry(corpus_file) for corpus_file in files}
+        })
+    
+    def extend_manifest(self, files: List[CorpusFile], previous_version: Optional[str], model_version: str):
+        """
+        Ajouter au manifeste des fichiers intégrés au modèle par mise à jour incrémentale
+        
+        Le manifeste n'est modifié que s'il correspond au modèle mis à jour:
+        sinon le prochain entraînement est de toute façon complet.
+        
+        Args:
+            files: Fichiers ajoutés au modèle
+            previous_version: Version du modèle avant la mise à jour
+            model_version: Version du modèle publié
+        """
+        manifest = self.load_manifest()
+        
+        if previous_version is None or manifest.get('model_version') != previous_version:
+            return
+        
+        manifest['model_version'] = model_version
+        manifest.setdefault('files', {}).update(
+            (corpus_file.path, self._manifest_entry(corpus_file)) for corpus_file in files
+        )
+        self._write_manifest(manifest)
+    
+    @staticmethod
+    def _manifest_entry(corpus_file: CorpusFile) -> list:
+        return [corpus_file.mtime_ns, corpus_file.size, corpus_file.category]
+    
+    def _write_manifest(self, manifest: dict):
+        os.makedirs(os.path.dirname(self.manifest_file), exist_ok=True)
+        tmp_file = self.manifest_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_file, self.manifest_file)
@@ -0,0 +1,406 @@
+"""
+Classification hiérarchique sur une arborescence de catégories
+"""
+import heapq
+import logging
+import math
+import numpy as np
+from dataclasses import dataclass
+from threading import Lock
+from time import perf_counter
+from typing import Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+from app.models import ClassificationResult, TrainingDocument
+from app.services.naive_bayes import ModelSnapshot, NaiveBayesClassifier
+from app.utils.instrumentation import DOCUMENTS_CLASSIFIED, STAGE_SECONDS
+from app.utils.pruning import VocabularyPruning
+
+if TYPE_CHECKING:
+    from scipy import sparse
+    from app.services.preprocessed_cache import PreprocessedCorpusCache
+
+logger = logging.getLogger(__name__)
+
+SCORE_SECONDS = STAGE_SECONDS.labels('score')
+
+
+@dataclass(frozen=True)
+class TaxonomyNode:
+    """
+    Naive Bayes d'un nœud de l'arborescence, sur ses enfants
+    
+    Les compteurs d'un enfant sont la somme de ceux des catégories de sa
+    branche. Seules les lignes des stems présents dans la branche sont
+    gardées: un nœud profond ne coûte que la taille de sa branche.
+    """
+    path: str  # '' pour la racine
+    children: List[str]  # Chemins des enfants
+    descend: List[bool]  # L'enfant est-il un nœud (sinon une catégorie)?
+    stem_ids: Optional[np.ndarray]  # Stems de la branche (triés), None si elle couvre tout le vocabulaire
+    log_priors: np.ndarray
+    log_counts: 'sparse.csr_matrix'  # Stems de la branche x enfants
+    log_denominators: np.ndarray
+    
+    @property
+    def nbytes(self) -> int:
+        stem_ids_bytes = self.stem_ids.nbytes if self.stem_ids is not None else 0
+        return (stem_ids_bytes + self.log_counts.data.nbytes + self.log_counts.indices.nbytes
+                + self.log_counts.indptr.nbytes + self.log_priors.nbytes + self.log_denominators.nbytes)
+    
+    def log_probabilities(self, known: np.ndarray, total_tokens: int) -> np.ndarray:
+        """
+        Log probabilités normalisées des enfants (mêmes formules que NaiveBayesClassifier)
+        
+        Args:
+            known: Identifiants (dans le vocabulaire du modèle) des stems connus du texte
+            total_tokens: Nombre de stems du texte, inconnus compris
+            
+        Returns:
+            Vecteur des log P(enfant | texte), aligné sur children
+        """
+        if len(self.children) == 1:
+            return np.zeros(1)
+        
+        if self.stem_ids is None:
+            rows = known
+        else:
+            # Stems du texte présents dans la branche (les autres n'ajoutent que le dénominateur)
+            positions = np.searchsorted(self.stem_ids, known)
+            positions[positions == len(self.stem_ids)] = 0
+            rows = positions[self.stem_ids[positions] == known]
+        
+        log_probs = (self.log_priors
+                     + NaiveBayesClassifier._sum_rows(self.log_counts, rows)
+                     - total_tokens * self.log_denominators)
+        
+        # Log-softmax: pas d'exp(-inf) pour les enfants très improbables
+        shifted = log_probs - log_probs.max()
+        return shifted - np.log(np.exp(shifted).sum())
+
+
+@dataclass(frozen=True)
+class Taxonomy:
+    """Nœuds compilés d'un instantané du modèle à plat (publiés d'un seul coup)"""
+    model: ModelSnapshot
+    nodes: Dict[str, TaxonomyNode]
+    depth: int
+    
+    @property
+    def nbytes(self) -> int:
+        return sum(node.nbytes for node in self.nodes.values())
+
+
+class HierarchicalClassifier:
+    """
+    Classificateur hiérarchique pour les grandes taxonomies
+    
+    Les catégories sont des chemins (ex: sports/football). Un Naive Bayes
+    grossier à la racine choisit entre les branches, puis un Naive Bayes par
+    nœud entre ses enfants. La classification ne descend que dans les
+    `beam_width` branches les plus probables de chaque niveau (recherche en
+    faisceau): seuls les nœuds visités sont scorés, au lieu de toutes les
+    catégories.
+    
+    L'entraînement, l'élagage, le hachage et la sauvegarde sont ceux du
+    NaiveBayesClassifier à plat sur les catégories finales. Les nœuds en
+    sont dérivés (sommes de colonnes) après chaque entraînement ou
+    chargement: le format des modèles sauvegardés ne change pas, et le
+    vocabulaire n'est consulté qu'une fois par texte.
+    
+    La probabilité d'une catégorie est le produit des probabilités des
+    nœuds de son chemin. Les catégories hors du faisceau sont absentes du
+    résultat: la somme des probabilités peut être inférieure à 1.
+    """
+    
+    def __init__(self, classifier: NaiveBayesClassifier, beam_width: int = 2, separator: str = '/'):
+        """
+        Args:
+            classifier: Classificateur à plat sur les catégories finales
+            beam_width: Branches gardées à chaque niveau
+            separator: Séparateur des niveaux dans le nom des catégories
+        """
+        if beam_width < 1:
+            raise ValueError("beam_width must be >= 1")
+        
+        self.classifier = classifier
+        self.preprocessing = classifier.preprocessing
+        self.beam_width = beam_width
+        self.separator = separator
+        
+        # Arborescence publiée, lue sans verrou par classify
+        self._taxonomy: Optional[Taxonomy] = None
+        self._lock = Lock()
+    
+    @property
+    def hash_bits(self) -> Optional[int]:
+        return self.classifier.hash_bits
+    
+    @property
+    def pruning(self) -> VocabularyPruning:
+        return self.classifier.pruning
+    
+    @property
+    def is_trained(self) -> bool:
+        """Le modèle a-t-il été entraîné (ou chargé)?"""
+        return self.classifier.is_trained
+    
+    @property
+    def model_version(self) -> Optional[str]:
+        """Version du modèle publié"""
+        return self.classifier.model_version
+    
+    def train(self, documents: Iterable[TrainingDocument], workers: int = 1,
+              cache: Optional['PreprocessedCorpusCache'] = None):
+        """Entraîner le modèle à plat, puis compiler l'arborescence"""
+        self.classifier.train(documents, workers=workers, cache=cache)
+        self._current_taxonomy()
+    
+    def partial_fit(self, documents: List[TrainingDocument],
+                    cache: Optional['PreprocessedCorpusCache'] = None):
+        """Mettre à jour le modèle à plat, puis recompiler l'arborescence"""
+        self.classifier.partial_fit(documents, cache=cache)
+        self._current_taxonomy()
+    
+    def save(self, directory: str):
+        """Sauvegarder le modèle à plat (l'arborescence en est dérivée au chargement)"""
+        self.classifier.save(directory)
+    
+    def load(self, directory: str):
+        """Charger un modèle à plat sauvegardé, puis compiler l'arborescence"""
+        self.classifier.load(directory)
+        self._current_taxonomy()
+    
+    def classify(self, text: str, top_k: Optional[int] = None, prune: bool = False) -> ClassificationResult:
+        """
+        Classifier un texte
+        
+        Args:
+            text: Texte à classifier
+            top_k: Ne garder que les k catégories les plus probables (toutes celles du faisceau si None)
+            prune: Comme pour NaiveBayesClassifier, top_k=1 par défaut (chaque
+                nœud n'a que quelques enfants: rien de plus à élaguer)
+                
+        Returns:
+            ClassificationResult avec la catégorie prédite et les probabilités
+        """
+        return self.classify_stems(self.preprocessing.preprocess(text), top_k, prune)
+    
+    def classify_stems(self, stems: List[str], top_k: Optional[int] = None,
+                       prune: bool = False) -> ClassificationResult:
+        """
+        Classifier un texte déjà prétraité, en descendant l'arborescence
+        
+        Args:
+            stems: Stems du texte (sortie de TextPreprocessingService.preprocess)
+            top_k: Ne garder que les k catégories les plus probables (toutes celles du faisceau si None)
+            prune: Comme pour NaiveBayesClassifier, top_k=1 par défaut (chaque
+                nœud n'a que quelques enfants: rien de plus à élaguer)
+                
+        Returns:
+            ClassificationResult avec la catégorie prédite et les probabilités
+        """
+        taxonomy = self._current_taxonomy()
+        model = taxonomy.model
+        
+        if prune and top_k is None:
+            top_k = 1
+        if top_k is not None and top_k < 1:
+            raise ValueError("top_k must be >= 1")
+        
+        DOCUMENTS_CLASSIFIED.inc()
+        
+        if not stems:
+            return NaiveBayesClassifier._create_default_result(model, top_k)
+        
+        start = perf_counter()
+        log_probs = self._descend(taxonomy, stems)
+        SCORE_SECONDS.observe(perf_counter() - start)
+        
+        ranked = sorted(log_probs.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        probabilities = {category: math.exp(log_prob) for category, log_prob in ranked}
+        
+        return NaiveBayesClassifier._create_result(model, probabilities, len(stems), len(set(stems)))
+    
+    def classify_many(self, texts: List[str], top_k: Optional[int] = None) -> List[ClassificationResult]:
+        """
+        Classifier un lot de textes (chaque texte suit son propre faisceau)
+        
+        Args:
+            texts: Liste de textes à classifier
+            top_k: Ne garder que les k catégories les plus probables
+            
+        Returns:
+            Liste de ClassificationResult, dans l'ordre des textes
+        """
+        return self.classify_stems_many([self.preprocessing.preprocess(text) for text in texts], top_k)
+    
+    def classify_stems_many(self, stems_list: List[List[str]],
+                            top_k: Optional[int] = None) -> List[ClassificationResult]:
+        """Classifier un lot de textes déjà prétraités"""
+        return [self.classify_stems(stems, top_k) for stems in stems_list]
+    
+    def predict_many(self, stems_list: List[List[str]]) -> Tuple[List[str], np.ndarray]:
+        """
+        Prédire la catégorie de documents déjà prétraités
+        
+        Args:
+            stems_list: Stems de chaque document
+            
+        Returns:
+            (catégories du modèle, indice de la catégorie prédite par document)
+        """
+        taxonomy = self._current_taxonomy()
+        category_ids = {category: i for i, category in enumerate(taxonomy.model.categories)}
+        
+        predictions = np.zeros(len(stems_list), dtype=np.int64)
+        for i, stems in enumerate(stems_list):
+            if stems:
+                log_probs = self._descend(taxonomy, stems)
+                predictions[i] = category_ids[max(log_probs, key=log_probs.get)]
+        
+        return taxonomy.model.categories, predictions
+    
+    def _descend(self, taxonomy: Taxonomy, stems: List[str]) -> Dict[str, float]:
+        """
+        Recherche en faisceau depuis la racine
+        
+        À chaque niveau, les enfants des nœuds du faisceau sont scorés; les
+        `beam_width` nœuds de plus forte log probabilité cumulée forment le
+        faisceau suivant, et les catégories atteintes sont gardées.
+        
+        Returns:
+            Log probabilité de chaque catégorie atteinte
+        """
+        ids = NaiveBayesClassifier._stem_ids_of(taxonomy.model, stems)
+        known = ids[ids >= 0]
+        
+        reached: Dict[str, float] = {}
+        beam = [(0.0, '')]
+        while beam:
+            candidates = []
+            for log_prob, path in beam:
+                node = taxonomy.nodes[path]
+                child_log_probs = node.log_probabilities(known, len(ids)).tolist()
+                for child, descend, child_log_prob in zip(node.children, node.descend, child_log_probs):
+                    if descend:
+                        candidates.append((log_prob + child_log_prob, child))
+                    else:
+                        reached[child] = log_prob + child_log_prob
+            
+            beam = heapq.nlargest(self.beam_width, candidates)
+        
+        return reached
+    
+    def _current_taxonomy(self) -> Taxonomy:
+        """Arborescence du modèle publié (compilée s'il a changé depuis)"""
+        model = self.classifier.snapshot
+        if model is None:
+            raise ValueError("Model not trained yet!")
+        
+        taxonomy = self._taxonomy
+        if taxonomy is not None and taxonomy.model is model:
+            return taxonomy
+        
+        with self._lock:
+            model = self.classifier.snapshot
+            if self._taxonomy is None or self._taxonomy.model is not model:
+                start = perf_counter()
+                self._taxonomy = compile_taxonomy(model, self.separator)
+                logger.info("Taxonomy compiled in %.3fs: %d nodes, depth %d",
+                            perf_counter() - start, len(self._taxonomy.nodes), self._taxonomy.depth)
+            return self._taxonomy
+    
+    def get_stats(self) -> dict:
+        """Obtenir les statistiques du modèle (celles du modèle à plat, et de l'arborescence)"""
+        stats = self.classifier.get_stats()
+        
+        taxonomy = self._current_taxonomy() if self.is_trained else None
+        if taxonomy is not None:
+            stats['model_bytes'] += taxonomy.nbytes
+        
+        stats['hierarchy'] = {
+            'beam_width': self.beam_width,
+            'nodes': len(taxonomy.nodes) if taxonomy is not None else 0,
+            'depth': taxonomy.depth if taxonomy is not None else 0
+        }
+        return stats
+    
+    def get_category_priors(self) -> Dict[str, float]:
+        """Obtenir les probabilités a priori des catégories"""
+        return self.classifier.get_category_priors()
+
+
+def compile_taxonomy(model: ModelSnapshot, separator: str = '/') -> Taxonomy:
+    """
+    Compiler les nœuds de l'arborescence à partir du modèle à plat
+    
+    Le chemin de chaque catégorie donne ses paires (nœud, enfant): la
+    catégorie sports/football compte pour l'enfant sports de la racine et
+    pour l'enfant sports/football du nœud sports. Une catégorie qui est
+    aussi un nœud (sports, et sports/football) est un enfant d'elle-même.
+    Les compteurs de chaque nœud sont obtenus en un produit creux
+    (compteurs des catégories x appartenance aux enfants).
+    
+    Args:
+        model: Instantané du modèle à plat
+        separator: Séparateur des niveaux
+        
+    Returns:
+        Taxonomy
+    """
+    from scipy import sparse
+    
+    # Chemins des catégories ('' pour la racine); un nom avec un niveau vide reste à la racine
+    paths = []
+    for category in model.categories:
+        parts = category.split(separator)
+        if not all(parts):
+            parts = [category]
+        paths.append([separator.join(parts[:i]) for i in range(len(parts) + 1)])
+    internal = {path[i] for path in paths for i in range(len(path) - 1)}
+    
+    # Appartenance de chaque catégorie aux enfants de chaque nœud
+    children: Dict[str, Dict[str, int]] = {node: {} for node in internal}
+    members: Dict[str, Tuple[List[int], List[int]]] = {node: ([], []) for node in internal}
+    for index, path in enumerate(paths):
+        steps = list(zip(path[:-1], path[1:]))
+        if path[-1] in internal:
+            steps.append((path[-1], path[-1]))
+        for node, child in steps:
+            rows, cols = members[node]
+            rows.append(index)
+            cols.append(children[node].setdefault(child, len(children[node])))
+    
+    documents = np.array([model.category_counts[category] for category in model.categories], dtype=float)
+    words = np.array([model.category_total_words[category] for category in model.categories], dtype=float)
+    
+    nodes = {}
+    for node, node_children in children.items():
+        rows, cols = members[node]
+        membership = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)),
+                                       shape=(len(model.categories), len(node_children)))
+        
+        # Compteurs des enfants, restreints aux stems de la branche
+        counts = (model.word_counts @ membership).tocsr()
+        counts.eliminate_zeros()
+        stem_ids = np.flatnonzero(np.diff(counts.indptr))
+        if len(stem_ids) < counts.shape[0]:
+            counts = counts[stem_ids]
+        else:
+            stem_ids = None  # Branche couvrant tout le vocabulaire (la racine, en général)
+        
+        child_documents = membership.T @ documents
+        child_words = membership.T @ words
+        
+        nodes[node] = TaxonomyNode(
+            path=node,
+            children=list(node_children),
+            descend=[child != node and child in internal for child in node_children],
+            stem_ids=stem_ids,
+            log_priors=np.log(child_documents / child_documents.sum()),
+            log_counts=sparse.csr_matrix((np.log1p(counts.data), counts.indices, counts.indptr),
+                                         shape=counts.shape),
+            # Lissage de Laplace sur le vocabulaire de la branche, comme un modèle entraîné sur ses documents
+            log_denominators=np.log(child_words + counts.shape[0])
+        )
+    
+    return Taxonomy(model=model, nodes=nodes, depth=max(len(path) - 1 for path in paths))
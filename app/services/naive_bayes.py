@@ -1,165 +1,729 @@
 """
 Service de classification Naive Bayes
 """
+import json
+import logging
+import os
+import shutil
 import numpy as np
-from collections import defaultdict, Counter
-from typing import List, Dict, Tuple, Optional
+from collections import defaultdict, deque, Counter
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import chain, islice
+from threading import Lock
+from time import perf_counter
+from typing import List, Dict, Iterable, Iterator, Tuple, Optional, Union, TYPE_CHECKING
 from app.models import ClassificationResult, TrainingDocument
 from app.services.text_preprocessing import TextPreprocessingService
+from app.utils.instrumentation import DOCUMENTS_CLASSIFIED, STAGE_SECONDS
+from app.utils.pruning import VocabularyPruning
+from app.utils.vocabulary import HashedVocabulary, Vocabulary
+
+if TYPE_CHECKING:
+    from scipy import sparse
+    from app.services.preprocessed_cache import PreprocessedCorpusCache
+
+logger = logging.getLogger(__name__)
+
+SCORE_SECONDS = STAGE_SECONDS.labels('score')
+NORMALIZE_SECONDS = STAGE_SECONDS.labels('normalize')
+TRAIN_SECONDS = STAGE_SECONDS.labels('train')
+
+
+@dataclass(frozen=True)
+class ModelSnapshot:
+    """
+    État compilé et immuable du modèle
+    
+    Un nouvel instantané est construit à chaque entraînement puis publié d'un
+    seul coup: les classifications en cours gardent l'ancien. Tout ce qui
+    grandit avec le vocabulaire est dans des tableaux NumPy, partagés sans
+    copie entre les workers d'un serveur pre-fork.
+    
+    Les compteurs sont des matrices creuses (stems x catégories): une ligne
+    par stem (ou par caractéristique hachée), pour ne lire que les lignes
+    des stems d'un document.
+    """
+    version: str
+    categories: List[str]
+    vocabulary: Union[Vocabulary, HashedVocabulary]
+    vocabulary_size: int  # Lignes non vides (= len(vocabulary) sans hachage)
+    pruned_features: int  # Stems retirés par l'élagage du dernier entraînement
+    log_priors: np.ndarray
+    log_counts: 'sparse.csr_matrix'
+    log_denominators: np.ndarray
+    word_counts: 'sparse.csr_matrix'
+    category_counts: Dict[str, int]
+    category_total_words: Dict[str, int]
+    total_documents: int
+    dense_rows: 'DenseRows'  # Stems présents dans plus de la moitié des catégories
+
+
+@dataclass(frozen=True)
+class DenseRows:
+    """
+    Lignes de log_counts des stems présents dans plus de la moitié des catégories
+    
+    Ces stems fréquents (quasi stop words) rassemblent l'essentiel des
+    cellules lues par le scoring, mais départagent peu les catégories. Le
+    scoring élagué (top_k avec prune) borne leur contribution par le min et
+    le max de chaque ligne, puis ne lit que les colonnes des catégories
+    restantes, d'où le stockage dense. Une ligne dense a moins de deux fois
+    plus de cellules que sa ligne creuse: la copie reste bornée.
+    """
+    ids: np.ndarray  # Identifiants des stems (triés)
+    log_counts: np.ndarray  # Lignes denses (len(ids) x catégories)
+    row_min: np.ndarray
+    row_max: np.ndarray
+    
+    @classmethod
+    def from_csr(cls, matrix: 'sparse.csr_matrix') -> 'DenseRows':
+        """Extraire les lignes denses d'une matrice CSR (stems x catégories)"""
+        lengths = np.diff(matrix.indptr)
+        ids = np.flatnonzero(2 * lengths > matrix.shape[1])
+        
+        log_counts = np.zeros((len(ids), matrix.shape[1]))
+        positions = _row_positions(matrix.indptr, ids)
+        log_counts[np.repeat(np.arange(len(ids)), lengths[ids]), matrix.indices[positions]] = matrix.data[positions]
+        
+        # Les cellules absentes valent 0 (log(0 + 1)): comprises dans le min
+        row_min = log_counts.min(axis=1, initial=np.inf)
+        row_max = log_counts.max(axis=1, initial=0.0)
+        
+        for array in (ids, log_counts, row_min, row_max):
+            array.setflags(write=False)
+        
+        return cls(ids=ids, log_counts=log_counts, row_min=row_min, row_max=row_max)
+    
+    def find(self, stem_ids: np.ndarray) -> np.ndarray:
+        """Ligne dense de chaque stem (-1 pour les stems creux)"""
+        if not len(self.ids):
+            return np.full(len(stem_ids), -1)
+        
+        positions = np.searchsorted(self.ids, stem_ids)
+        positions[positions == len(self.ids)] = 0
+        return np.where(self.ids[positions] == stem_ids, positions, -1)
 
 
 class NaiveBayesClassifier:
     """Classificateur Naive Bayes pour textes arabes"""
     
-    def __init__(self, preprocessing_service: TextPreprocessingService):
+    # Version du format des modèles sauvegardés
+    FORMAT_VERSION = 4
+    
+    # Tranches par processus lors de l'entraînement parallèle (équilibrage)
+    SHARDS_PER_WORKER = 4
+    
+    # Documents max par tranche (borne la mémoire quand le corpus est un flux)
+    SHARD_SIZE = 256
+    
+    def __init__(self, preprocessing_service: TextPreprocessingService,
+                 hash_bits: Optional[int] = None,
+                 pruning: Optional[VocabularyPruning] = None):
+        """
+        Args:
+            preprocessing_service: Service de prétraitement
+            hash_bits: Hacher les stems sur 2^hash_bits caractéristiques
+                       (None = vocabulaire exact)
+            pruning: Élagage du vocabulaire à l'entraînement (None = aucun)
+        """
         self.preprocessing = preprocessing_service
+        self.hash_bits = hash_bits
+        if hash_bits is not None:
+            HashedVocabulary(hash_bits)  # Valider le nombre de bits dès la création
+        self.pruning = pruning if pruning is not None else VocabularyPruning()
         
-        # Paramètres du modèle
+        # Compteurs d'entraînement (modifiés uniquement sous self._lock). Les
+        # compteurs par stem ne sont que dans le modèle publié (matrice creuse).
         self.category_counts: Dict[str, int] = {}
-        self.category_word_counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
         self.category_total_words: Dict[str, int] = {}
-        self.vocabulary: set = set()
         self.total_documents = 0
-        self.is_trained = False
+        
+        # Instantané publié, lu sans verrou par classify
+        self._model: Optional[ModelSnapshot] = None
+        self._lock = Lock()
     
-    def train(self, documents: List[TrainingDocument]):
+    @property
+    def is_trained(self) -> bool:
+        """Le modèle a-t-il été entraîné (ou chargé)?"""
+        return self._model is not None
+    
+    @property
+    def model_version(self) -> Optional[str]:
+        """Version du modèle publié"""
+        model = self._model
+        return model.version if model is not None else None
+    
+    @property
+    def snapshot(self) -> Optional[ModelSnapshot]:
+        """Instantané publié (None avant l'entraînement)"""
+        return self._model
+    
+    def train(self, documents: Iterable[TrainingDocument], workers: int = 1,
+              cache: Optional['PreprocessedCorpusCache'] = None):
         """
         Entraîner le modèle Naive Bayes
         
         Args:
-            documents: Liste de documents d'entraînement
+            documents: Documents d'entraînement (liste ou itérateur paresseux)
+            workers: Nombre de processus pour le prétraitement (1 = séquentiel)
+            cache: Cache des documents prétraités (optionnel)
         """
-        print(f"🎓 Starting training with {len(documents)} documents...")
+        logger.info("Starting training")
+        start = perf_counter()
+        
+        # Prétraiter et compter au fil des documents (en parallèle si demandé)
+        category_counts = Counter()
+        total_words = Counter()
+        hashed = HashedVocabulary(self.hash_bits) if self.hash_bits else None
+        counts = _SparseCounts(hashed)
+        document_frequency = self.pruning.needs_document_frequencies
         
-        # Réinitialiser le modèle
-        self._reset()
+        if cache is not None:
+            partials = [cache.count_documents(documents, workers=workers,
+                                              document_frequency=document_frequency, hashed=hashed)]
+        else:
+            partials = self._count_partials(documents, workers, document_frequency, hashed)
         
-        # Traiter chaque document
-        for doc in documents:
-            category = doc.category
+        for partial_category_counts, partial_word_counts, partial_total_words, partial_frequencies in partials:
+            category_counts.update(partial_category_counts)
+            total_words.update(partial_total_words)
+            counts.add(partial_category_counts, partial_word_counts, partial_frequencies)
+        
+        # Compiler hors du verrou: le modèle publié reste servi
+        word_counts = counts.to_csr()
+        vocabulary = counts.vocabulary()
+        categories = list(counts.category_ids)
+        
+        # Élaguer le vocabulaire avant de compiler
+        pruned_features = 0
+        if self.pruning.enabled:
+            category_documents = np.array([category_counts[cat] for cat in categories])
+            keep = self.pruning.select(word_counts, counts.document_frequencies(), category_documents)
+            pruned_features = _count_nonempty_rows(word_counts) - int(np.count_nonzero(keep))
+            word_counts, vocabulary = _prune_rows(word_counts, vocabulary, keep)
             
-            # Prétraiter le texte
-            stems = self.preprocessing.preprocess(doc.content)
+            # Le lissage ne porte plus que sur les occurrences des stems conservés
+            kept_words = np.asarray(word_counts.sum(axis=0)).ravel().tolist()
+            total_words = Counter(dict(zip(categories, kept_words)))
+        del counts
+        
+        with self._lock:
+            # Repartir de compteurs vides puis publier le nouvel instantané
+            self._reset()
+            self._add_counts(category_counts, total_words)
+            self._model = model = self._make_snapshot(categories, vocabulary, word_counts, pruned_features)
+        
+        TRAIN_SECONDS.observe(perf_counter() - start)
+        logger.info("Training completed: %d documents, vocabulary size %d (%d pruned), categories %s",
+                    self.total_documents, model.vocabulary_size, pruned_features,
+                    list(self.category_counts.keys()))
+    
+    def _count_partials(self, documents: Iterable[TrainingDocument], workers: int,
+                        document_frequency: bool = False,
+                        hashed: Optional[HashedVocabulary] = None) -> Iterator[Tuple[Counter, Dict[str, Counter],
+                                                                                     Counter, Dict[str, Counter]]]:
+        """
+        Compter les documents par tranches, dans l'ordre des documents
+        
+        Avec plusieurs processus, seules workers * SHARDS_PER_WORKER tranches
+        sont en cours à un instant donné. Voir _count_documents pour hashed.
+        """
+        shard_size = self.SHARD_SIZE
+        if hasattr(documents, '__len__'):
+            workers = min(workers, len(documents))
+            shard_size = max(1, min(shard_size, -(-len(documents) // (workers * self.SHARDS_PER_WORKER))))
+        
+        if workers <= 1:
+            yield _count_documents(self.preprocessing, documents, document_frequency, hashed)
+            return
+        
+        # Import différé: multiprocessing n'est utile qu'à l'entraînement parallèle
+        from concurrent.futures import ProcessPoolExecutor
+        
+        max_pending = workers * self.SHARDS_PER_WORKER
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker,
+                                 initargs=(self.preprocessing, document_frequency, hashed)) as executor:
+            pending = deque()
+            for shard in _iter_shards(documents, shard_size):
+                pending.append(executor.submit(_count_shard, shard))
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
             
-            if not stems:
-                print(f"⚠️  Empty document for category: {category}")
-                continue
+            while pending:
+                yield pending.popleft().result()
+    
+    def classify(self, text: str, top_k: Optional[int] = None, prune: bool = False) -> ClassificationResult:
+        """
+        Classifier un texte
+        
+        Args:
+            text: Texte à classifier
+            top_k: Ne garder que les k catégories les plus probables (toutes si None)
+            prune: Écarter sans les scorer entièrement les catégories qui ne
+                peuvent pas entrer dans le top k (même résultat, top_k=1 par défaut)
+                
+        Returns:
+            ClassificationResult avec la catégorie prédite et les probabilités
+        """
+        return self.classify_stems(self.preprocessing.preprocess(text), top_k, prune)
+    
+    def classify_stems(self, stems: List[str], top_k: Optional[int] = None,
+                       prune: bool = False) -> ClassificationResult:
+        """
+        Classifier un texte déjà prétraité
+        
+        Avec top_k, seules les k catégories les plus probables sont gardées,
+        et leurs probabilités sont normalisées entre elles: la confiance est
+        relative aux catégories gardées.
+        
+        Args:
+            stems: Stems du texte (sortie de TextPreprocessingService.preprocess)
+            top_k: Ne garder que les k catégories les plus probables (toutes si None)
+            prune: Écarter sans les scorer entièrement les catégories qui ne
+                peuvent pas entrer dans le top k (même résultat, top_k=1 par défaut)
+                
+        Returns:
+            ClassificationResult avec la catégorie prédite et les probabilités
+        """
+        model = self._model
+        if model is None:
+            raise ValueError("Model not trained yet!")
+        
+        if prune and top_k is None:
+            top_k = 1
+        if top_k is not None and top_k < 1:
+            raise ValueError("top_k must be >= 1")
+        
+        DOCUMENTS_CLASSIFIED.inc()
+        
+        if not stems:
+            return self._create_default_result(model, top_k)
+        
+        # Calculer les log probabilités (des seules k meilleures catégories avec top_k)
+        start = perf_counter()
+        if prune:
+            indices, log_probs = self._calculate_top_log_probabilities(model, stems, top_k)
+        else:
+            log_probs = self._calculate_log_probabilities(model, stems)
+            indices = None
+            if top_k is not None:
+                indices = self._top_indices(log_probs, top_k)
+                log_probs = log_probs[indices]
+        scored = perf_counter()
+        
+        # Normaliser les probabilités
+        probabilities = self._normalize_probabilities(model, log_probs, indices)
+        
+        SCORE_SECONDS.observe(scored - start)
+        NORMALIZE_SECONDS.observe(perf_counter() - scored)
+        
+        return self._create_result(model, probabilities, len(stems), len(set(stems)))
+    
+    def classify_many(self, texts: List[str], top_k: Optional[int] = None) -> List[ClassificationResult]:
+        """
+        Classifier un lot de textes en un seul produit matriciel
+        
+        Args:
+            texts: Liste de textes à classifier
+            top_k: Ne garder que les k catégories les plus probables (toutes si None)
             
-            # Mettre à jour les compteurs
-            self.category_counts[category] = self.category_counts.get(category, 0) + 1
+        Returns:
+            Liste de ClassificationResult, dans l'ordre des textes
+        """
+        if self._model is None:
+            raise ValueError("Model not trained yet!")
+        
+        return self.classify_stems_many([self.preprocessing.preprocess(text) for text in texts], top_k)
+    
+    def classify_stems_many(self, stems_list: List[List[str]],
+                            top_k: Optional[int] = None) -> List[ClassificationResult]:
+        """
+        Classifier un lot de textes déjà prétraités en un seul produit matriciel
+        
+        Args:
+            stems_list: Stems de chaque texte
+            top_k: Ne garder que les k catégories les plus probables (toutes si None)
             
-            if category not in self.category_total_words:
-                self.category_total_words[category] = 0
+        Returns:
+            Liste de ClassificationResult, dans l'ordre des textes
+        """
+        model = self._model
+        if model is None:
+            raise ValueError("Model not trained yet!")
+        
+        if top_k is not None and top_k < 1:
+            raise ValueError("top_k must be >= 1")
+        
+        DOCUMENTS_CLASSIFIED.inc(len(stems_list))
+        
+        # Calculer et normaliser les log probabilités de tous les documents (un lot = une mesure)
+        start = perf_counter()
+        log_probs = self._calculate_log_probabilities_many(model, stems_list)
+        indices = None
+        if top_k is not None:
+            indices = self._top_indices(log_probs, top_k)
+            log_probs = np.take_along_axis(log_probs, indices, axis=1)
+        scored = perf_counter()
+        probabilities = self._softmax(log_probs).tolist()
+        
+        SCORE_SECONDS.observe(scored - start)
+        NORMALIZE_SECONDS.observe(perf_counter() - scored)
+        
+        results = []
+        for i, stems in enumerate(stems_list):
+            if not stems:
+                results.append(self._create_default_result(model, top_k))
+                continue
             
-            # Compter les mots
-            for stem in stems:
-                self.category_word_counts[category][stem] += 1
-                self.category_total_words[category] += 1
-                self.vocabulary.add(stem)
+            if indices is None:
+                row = dict(zip(model.categories, probabilities[i]))
+            else:
+                row = dict(zip([model.categories[j] for j in indices[i].tolist()], probabilities[i]))
+            results.append(self._create_result(model, row, len(stems), len(set(stems))))
+        
+        return results
+    
+    def predict_many(self, stems_list: List[List[str]]) -> Tuple[List[str], np.ndarray]:
+        """
+        Prédire la catégorie de documents déjà prétraités, sans normalisation
+        
+        Args:
+            stems_list: Stems de chaque document
             
-            self.total_documents += 1
+        Returns:
+            (catégories du modèle, indice de la catégorie prédite par document)
+        """
+        model = self._model
+        if model is None:
+            raise ValueError("Model not trained yet!")
+        
+        predictions = np.argmax(self._calculate_log_probabilities_many(model, stems_list), axis=1)
         
-        self.is_trained = True
+        # Résultat par défaut des documents vides: première catégorie
+        empty = np.array([not stems for stems in stems_list], dtype=bool)
+        predictions[empty] = 0
         
-        print(f"✅ Training completed:")
-        print(f"   - Total documents: {self.total_documents}")
-        print(f"   - Vocabulary size: {len(self.vocabulary)}")
-        print(f"   - Categories: {list(self.category_counts.keys())}")
+        return model.categories, predictions
     
-    def classify(self, text: str) -> ClassificationResult:
+    @staticmethod
+    def _calculate_log_probabilities_many(model: ModelSnapshot, stems_list: List[List[str]]) -> np.ndarray:
         """
-        Classifier un texte
+        Calculer les log probabilités de plusieurs documents en un produit matriciel
         
         Args:
-            text: Texte à classifier
+            model: Instantané du modèle
+            stems_list: Stems de chaque document
             
         Returns:
-            ClassificationResult avec la catégorie prédite et les probabilités
+            Matrice (documents x catégories) des log probabilités
         """
-        if not self.is_trained:
-            raise ValueError("Model not trained yet!")
+        # Import différé: scipy n'est chargé qu'au premier lot, pas au démarrage
+        from scipy import sparse
         
-        # Prétraiter le texte
-        stems = self.preprocessing.preprocess(text)
+        # Construire la matrice document-terme (creuse), en une seule recherche
+        # dans le vocabulaire pour tout le lot
+        lengths = np.fromiter(map(len, stems_list), dtype=np.int64, count=len(stems_list))
+        ids = NaiveBayesClassifier._stem_ids_of(model, list(chain.from_iterable(stems_list)))
+        rows = np.repeat(np.arange(len(stems_list)), lengths)
+        known = ids >= 0
+        total_tokens = lengths.astype(float)
         
-        if not stems:
-            return self._create_default_result()
+        doc_term = sparse.csr_matrix(
+            (np.ones(np.count_nonzero(known)), (rows[known], ids[known])),
+            shape=(len(stems_list), len(model.vocabulary))
+        )
         
-        # Calculer les log probabilités
-        log_probs = {}
-        for category in self.category_counts.keys():
-            log_prob = self._calculate_log_probability(category, stems)
-            log_probs[category] = log_prob
+        return ((doc_term @ model.log_counts).toarray()
+                - np.outer(total_tokens, model.log_denominators)
+                + model.log_priors)
+    
+    def partial_fit(self, documents: List[TrainingDocument],
+                    cache: Optional['PreprocessedCorpusCache'] = None):
+        """
+        Mettre à jour le modèle avec de nouveaux documents, sans réentraînement
         
-        # Trouver la meilleure catégorie
-        predicted_category = max(log_probs, key=log_probs.get)
+        Les compteurs des nouveaux documents sont additionnés à la matrice
+        creuse publiée (nouveaux stems et catégories ajoutés en fin), puis les
+        log compteurs, priors et dénominateurs sont recalculés. L'élagage n'est
+        fait qu'à l'entraînement complet: un stem élagué qui réapparaît est
+        ajouté comme un nouveau stem.
         
-        # Normaliser les probabilités
-        probabilities = self._normalize_probabilities(log_probs)
+        Seul le comptage des nouveaux documents est incrémental: la matrice,
+        l'instantané (log compteurs, lignes denses) et, en mode exact, le
+        vocabulaire sont reconstruits en entier, en O(nombre de cellules non
+        nulles du modèle) quel que soit le nombre de documents ajoutés. Mieux
+        vaut donc regrouper les documents en lots que les ajouter un à un.
         
-        # Créer le résultat
-        result = ClassificationResult(
-            predicted_category=predicted_category,
-            confidence=probabilities[predicted_category],
-            probabilities=probabilities,
-            total_tokens=len(stems),
-            unique_tokens=len(set(stems))
+        Args:
+            documents: Nouveaux documents étiquetés
+            cache: Cache des documents prétraités (optionnel)
+        """
+        from scipy import sparse
+        
+        if cache is not None:
+            category_counts, word_counts, total_words, _ = cache.count_documents(documents)
+        else:
+            category_counts, word_counts, total_words, _ = _count_documents(self.preprocessing, documents)
+        
+        if not category_counts:
+            return
+        
+        with self._lock:
+            model = self._model
+            
+            # Mettre à jour les compteurs
+            self._add_counts(category_counts, total_words)
+            
+            if model is None:
+                vocabulary = HashedVocabulary(self.hash_bits) if self.hash_bits else Vocabulary.from_stems([])
+                categories, counts_matrix, pruned_features = [], None, 0
+            else:
+                categories, vocabulary, counts_matrix = list(model.categories), model.vocabulary, model.word_counts
+                pruned_features = model.pruned_features
+            
+            # Nouvelles catégories et nouveaux stems (ajoutés en fin de matrice)
+            categories += [cat for cat in category_counts if cat not in categories]
+            stems = list({stem for counts in word_counts.values() for stem in counts})
+            new_stems = sorted(stem for stem, stem_id in zip(stems, vocabulary.lookup(stems))
+                               if stem_id < 0)
+            vocabulary = vocabulary.extend(new_stems)
+            
+            # Compteurs des nouveaux documents, en triplets (stem, catégorie, compteur)
+            rows, cols, data = [], [], []
+            for category, counts in word_counts.items():
+                rows.append(vocabulary.lookup(list(counts)))
+                cols.append(np.full(len(counts), categories.index(category)))
+                data.append(np.fromiter(counts.values(), dtype=np.int32, count=len(counts)))
+            
+            shape = (len(vocabulary), len(categories))
+            update = sparse.csr_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+                                       shape=shape)
+            if counts_matrix is not None:
+                update = _resize(counts_matrix, shape) + update
+            
+            self._model = self._make_snapshot(categories, vocabulary, update, pruned_features)
+        
+        logger.info("Partial fit completed: %d documents, %d new stems",
+                    sum(category_counts.values()), len(new_stems))
+    
+    def _add_counts(self, category_counts: Counter, total_words: Counter):
+        """Ajouter des compteurs partiels aux compteurs d'entraînement"""
+        for category, count in category_counts.items():
+            self.category_counts[category] = self.category_counts.get(category, 0) + count
+            self.category_total_words[category] = (self.category_total_words.get(category, 0)
+                                                   + total_words[category])
+            self.total_documents += count
+    
+    def _make_snapshot(self, categories: List[str], vocabulary: Union[Vocabulary, HashedVocabulary],
+                       word_counts: 'sparse.csr_matrix', pruned_features: int = 0) -> ModelSnapshot:
+        """
+        Compiler les compteurs en un instantané
+        
+        La matrice log_counts (stems x catégories) contient log(count + 1),
+        numérateur du lissage de Laplace, sur les seules cellules non nulles
+        (log(0 + 1) = 0), et le vecteur log_denominators le log de
+        (total_words + vocab_size) par catégorie, de sorte que le scoring se
+        réduise à une somme vectorisée.
+        """
+        from scipy import sparse
+        
+        # Prior: P(Category)
+        priors = np.array([self.category_counts[cat] for cat in categories], dtype=float)
+        log_priors = np.log(priors / self.total_documents)
+        
+        # Dénominateur du lissage de Laplace: total_words + vocab_size
+        totals = np.array([self.category_total_words[cat] for cat in categories], dtype=float)
+        vocabulary_size = _count_nonempty_rows(word_counts)
+        log_denominators = np.log(totals + vocabulary_size)
+        
+        # Numérateurs: mêmes indices que word_counts, seules les valeurs changent
+        word_counts.sum_duplicates()
+        log_counts = sparse.csr_matrix((np.log1p(word_counts.data), word_counts.indices, word_counts.indptr),
+                                       shape=word_counts.shape)
+        
+        for array in (log_priors, log_denominators, word_counts.data, word_counts.indices,
+                      word_counts.indptr, log_counts.data):
+            array.setflags(write=False)
+        
+        return ModelSnapshot(
+            version=datetime.now().strftime('%Y%m%d-%H%M%S-%f'),
+            categories=categories,
+            vocabulary=vocabulary,
+            vocabulary_size=vocabulary_size,
+            pruned_features=pruned_features,
+            log_priors=log_priors,
+            log_counts=log_counts,
+            log_denominators=log_denominators,
+            word_counts=word_counts,
+            category_counts=dict(self.category_counts),
+            category_total_words=dict(self.category_total_words),
+            total_documents=self.total_documents,
+            dense_rows=DenseRows.from_csr(log_counts)
         )
+    
+    @staticmethod
+    def _calculate_log_probabilities(model: ModelSnapshot, words: List[str]) -> np.ndarray:
+        """
+        Calculer P(Category|Document) en log pour toutes les catégories
+        
+        Args:
+            model: Instantané du modèle
+            words: Liste de mots
+            
+        Returns:
+            Vecteur des log probabilités, aligné sur model.categories
+        """
+        ids = NaiveBayesClassifier._stem_ids_of(model, words)
+        known = ids[ids >= 0]
         
-        return result
+        # Les mots inconnus n'ajoutent que leur dénominateur (log(0 + 1) = 0)
+        return (model.log_priors
+                + NaiveBayesClassifier._sum_rows(model.log_counts, known)
+                - len(ids) * model.log_denominators)
     
-    def _calculate_log_probability(self, category: str, words: List[str]) -> float:
+    @staticmethod
+    def _calculate_top_log_probabilities(model: ModelSnapshot, words: List[str],
+                                         k: int) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Calculer P(Category|Document) en log
+        Calculer les log probabilités des k meilleures catégories seulement
+        
+        Les lignes creuses sont sommées pour toutes les catégories. La
+        contribution des lignes denses (stems fréquents) est bornée par leur
+        min et leur max: les k meilleures bornes basses sont scorées
+        exactement, ce qui fixe un seuil, puis seules les catégories dont la
+        borne haute atteint ce seuil sont scorées exactement, en ne lisant que
+        leurs colonnes. Une catégorie écartée a un score inférieur au seuil,
+        donc aux k catégories gardées: le top k est exact.
         
         Args:
-            category: Catégorie
+            model: Instantané du modèle
             words: Liste de mots
+            k: Nombre de catégories à garder
             
         Returns:
-            Log probabilité
+            (indices des catégories gardées, leurs log probabilités), par
+            log probabilité décroissante
         """
-        # Prior: P(Category)
-        log_prior = np.log(self.category_counts[category] / self.total_documents)
+        ids = NaiveBayesClassifier._stem_ids_of(model, words)
+        known = ids[ids >= 0]
+        rows = model.dense_rows.find(known)
+        dense = rows >= 0
+        rows = rows[dense]
+        
+        # Score exact sans les lignes denses, puis bornes de leur contribution
+        partial = (model.log_priors
+                   + NaiveBayesClassifier._sum_rows(model.log_counts, known[~dense])
+                   - len(ids) * model.log_denominators)
+        lower = partial + model.dense_rows.row_min[rows].sum()
+        upper = partial + model.dense_rows.row_max[rows].sum()
+        
+        def exact(categories: np.ndarray) -> np.ndarray:
+            return partial[categories] + model.dense_rows.log_counts[rows[:, None], categories].sum(axis=0)
+        
+        threshold = exact(NaiveBayesClassifier._top_indices(lower, k)).min()
+        # Marge pour les arrondis: la borne haute d'une catégorie du seuil peut l'égaler
+        candidates = np.flatnonzero(upper >= threshold - 1e-9 * (1 + abs(threshold)))
+        
+        if 2 * len(candidates) > len(partial):
+            # Élagage inefficace (catégories proches): lire les lignes denses en entier
+            log_probs = partial + model.dense_rows.log_counts[rows].sum(axis=0)
+            top = NaiveBayesClassifier._top_indices(log_probs, k)
+            return top, log_probs[top]
         
-        # Likelihood: P(Words|Category)
-        log_likelihood = 0.0
-        vocab_size = len(self.vocabulary)
-        total_words = self.category_total_words[category]
+        log_probs = exact(candidates)
+        top = NaiveBayesClassifier._top_indices(log_probs, k)
+        return candidates[top], log_probs[top]
+    
+    @staticmethod
+    def _top_indices(log_probs: np.ndarray, k: int) -> np.ndarray:
+        """
+        Indices des k plus grandes valeurs (sur le dernier axe), par valeur décroissante
+        
+        Sélection partielle (np.argpartition) puis tri des k indices gardés
+        seulement, au lieu d'un tri complet.
+        """
+        size = log_probs.shape[-1]
+        k = min(k, size)
         
-        for word in words:
-            # Laplace smoothing
-            count = self.category_word_counts[category].get(word, 0)
-            probability = (count + 1) / (total_words + vocab_size)
-            log_likelihood += np.log(probability)
+        if k < size:
+            top = np.argpartition(-log_probs, k - 1, axis=-1)[..., :k]
+        else:
+            top = np.broadcast_to(np.arange(size), log_probs.shape)
         
-        return log_prior + log_likelihood
+        if log_probs.ndim == 1:
+            return top[np.argsort(-log_probs[top], kind='stable')]
+        
+        order = np.argsort(-np.take_along_axis(log_probs, top, axis=-1), axis=-1, kind='stable')
+        return np.take_along_axis(top, order, axis=-1)
     
-    def _normalize_probabilities(self, log_probs: Dict[str, float]) -> Dict[str, float]:
+    @staticmethod
+    def _sum_rows(matrix: 'sparse.csr_matrix', rows: np.ndarray) -> np.ndarray:
+        """
+        Somme de lignes d'une matrice CSR (avec répétitions), sans passer par scipy
+        
+        Les cellules non nulles des lignes demandées sont rassemblées à partir
+        de indptr, puis additionnées par colonne avec un seul np.bincount.
+        """
+        positions = _row_positions(matrix.indptr, rows)
+        
+        return np.bincount(matrix.indices[positions], weights=matrix.data[positions],
+                           minlength=matrix.shape[1])
+    
+    @staticmethod
+    def _stem_ids_of(model: ModelSnapshot, words: List[str]) -> np.ndarray:
+        """Convertir des stems en identifiants (-1 pour les mots inconnus)"""
+        return model.vocabulary.lookup(words)
+    
+    def _normalize_probabilities(self, model: ModelSnapshot, log_probs: np.ndarray,
+                                 indices: Optional[np.ndarray] = None) -> Dict[str, float]:
         """
         Normaliser les log probabilités en probabilités
         
         Args:
-            log_probs: Dictionnaire de log probabilités
+            model: Instantané du modèle
+            log_probs: Vecteur de log probabilités
+            indices: Catégories de log_probs (toutes, dans l'ordre, si None)
             
         Returns:
             Dictionnaire de probabilités normalisées
         """
-        # Trouver le max pour stabilité numérique
-        max_log_prob = max(log_probs.values())
+        if indices is None:
+            categories = model.categories
+        else:
+            categories = [model.categories[i] for i in indices.tolist()]
         
-        # Convertir en exponentielles
-        exp_probs = {cat: np.exp(lp - max_log_prob) for cat, lp in log_probs.items()}
+        return dict(zip(categories, self._softmax(log_probs).tolist()))
+    
+    @staticmethod
+    def _softmax(log_probs: np.ndarray) -> np.ndarray:
+        """Convertir des log probabilités en probabilités (sur le dernier axe)"""
+        # Soustraire le max pour stabilité numérique
+        exp_probs = np.exp(log_probs - log_probs.max(axis=-1, keepdims=True))
         
         # Normaliser
-        total = sum(exp_probs.values())
-        normalized = {cat: prob / total for cat, prob in exp_probs.items()}
+        return exp_probs / exp_probs.sum(axis=-1, keepdims=True)
+    
+    @staticmethod
+    def _create_result(model: ModelSnapshot, probabilities: Dict[str, float],
+                       total_tokens: int, unique_tokens: int) -> ClassificationResult:
+        """Créer un résultat à partir des probabilités normalisées"""
+        predicted_category = max(probabilities, key=probabilities.get)
         
-        return normalized
+        return ClassificationResult(
+            predicted_category=predicted_category,
+            confidence=probabilities[predicted_category],
+            probabilities=probabilities,
+            total_tokens=total_tokens,
+            unique_tokens=unique_tokens,
+            model_version=model.version
+        )
     
-    def _create_default_result(self) -> ClassificationResult:
-        """Créer un résultat par défaut"""
-        categories = list(self.category_counts.keys())
+    @staticmethod
+    def _create_default_result(model: ModelSnapshot, top_k: Optional[int] = None) -> ClassificationResult:
+        """Créer un résultat par défaut (probabilités uniformes sur les top_k premières catégories)"""
+        categories = model.categories[:top_k]
         prob = 1.0 / len(categories)
         probs = {cat: prob for cat in categories}
         
@@ -168,32 +732,396 @@ class NaiveBayesClassifier:
             confidence=prob,
             probabilities=probs,
             total_tokens=0,
-            unique_tokens=0
+            unique_tokens=0,
+            model_version=model.version
         )
     
     def _reset(self):
-        """Réinitialiser le modèle"""
+        """Réinitialiser les compteurs d'entraînement (le modèle publié est conservé)"""
         self.category_counts = {}
-        self.category_word_counts = defaultdict(lambda: defaultdict(int))
         self.category_total_words = {}
-        self.vocabulary = set()
         self.total_documents = 0
-        self.is_trained = False
+    
+    def save(self, directory: str):
+        """
+        Sauvegarder le modèle compilé dans un dossier
+        
+        Le dossier est écrit à côté puis renommé, de sorte qu'un lecteur ne
+        voie jamais un modèle partiellement écrit.
+        
+        Args:
+            directory: Dossier de destination (ne doit pas exister)
+        """
+        model = self._model
+        if model is None:
+            raise ValueError("Model not trained yet!")
+        
+        tmp_directory = directory + '.tmp'
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        os.makedirs(tmp_directory)
+        
+        meta = {
+            'format_version': self.FORMAT_VERSION,
+            'version': model.version,
+            'categories': model.categories,
+            'category_counts': model.category_counts,
+            'category_total_words': model.category_total_words,
+            'total_documents': model.total_documents,
+            'hash_bits': model.vocabulary.hash_bits,
+            'pruned_features': model.pruned_features
+        }
+        with open(os.path.join(tmp_directory, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        
+        model.vocabulary.save(tmp_directory)
+        
+        # Matrices creuses: indices partagés, une valeur par matrice
+        np.save(os.path.join(tmp_directory, 'counts_indptr.npy'), model.word_counts.indptr)
+        np.save(os.path.join(tmp_directory, 'counts_indices.npy'), model.word_counts.indices)
+        np.save(os.path.join(tmp_directory, 'word_counts.npy'), model.word_counts.data)
+        np.save(os.path.join(tmp_directory, 'log_counts.npy'), model.log_counts.data)
+        np.save(os.path.join(tmp_directory, 'log_priors.npy'), model.log_priors)
+        np.save(os.path.join(tmp_directory, 'log_denominators.npy'), model.log_denominators)
+        
+        os.rename(tmp_directory, directory)
+    
+    def load(self, directory: str):
+        """
+        Charger un modèle sauvegardé par save()
+        
+        Les tableaux sont projetés en mémoire (mmap) en lecture seule: les
+        processus qui chargent le même modèle partagent les mêmes pages.
+        
+        Args:
+            directory: Dossier du modèle
+        """
+        from scipy import sparse
+        
+        with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        
+        if meta.get('format_version') != self.FORMAT_VERSION:
+            raise ValueError(f"Unsupported model format: {meta.get('format_version')}")
+        
+        def load_array(name: str) -> np.ndarray:
+            return np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+        
+        # Le mode (exact ou haché) est celui du modèle sauvegardé
+        if meta.get('hash_bits'):
+            vocabulary = HashedVocabulary(meta['hash_bits'])
+        else:
+            vocabulary = Vocabulary.load(directory)
+        shape = (len(vocabulary), len(meta['categories']))
+        indptr, indices = load_array('counts_indptr'), load_array('counts_indices')
+        word_counts = sparse.csr_matrix((load_array('word_counts'), indices, indptr), shape=shape)
+        log_counts = sparse.csr_matrix((load_array('log_counts'), indices, indptr), shape=shape)
+        
+        model = ModelSnapshot(
+            version=meta['version'],
+            categories=meta['categories'],
+            vocabulary=vocabulary,
+            vocabulary_size=_count_nonempty_rows(word_counts),
+            pruned_features=meta.get('pruned_features', 0),
+            log_priors=load_array('log_priors'),
+            log_counts=log_counts,
+            log_denominators=load_array('log_denominators'),
+            word_counts=word_counts,
+            category_counts=meta['category_counts'],
+            category_total_words=meta['category_total_words'],
+            total_documents=meta['total_documents'],
+            # Recalculées au chargement (non sauvegardées): le format ne change pas
+            dense_rows=DenseRows.from_csr(log_counts)
+        )
+        
+        with self._lock:
+            # Les compteurs par mot et le vocabulaire restent dans le modèle:
+            # pas de millions d'objets Python à dupliquer dans chaque worker
+            self._reset()
+            self.category_counts = dict(model.category_counts)
+            self.category_total_words = dict(model.category_total_words)
+            self.total_documents = model.total_documents
+            self._model = model
+        
+        logger.info("Model loaded from %s: vocabulary size %d, categories %s",
+                    directory, model.vocabulary_size, model.categories)
     
     def get_stats(self) -> dict:
         """Obtenir les statistiques du modèle"""
+        model = self._model
+        
+        if model is None:
+            return {
+                'trained': False,
+                'model_version': None,
+                'total_documents': 0,
+                'vocabulary_size': 0,
+                'hash_bits': self.hash_bits,
+                'pruned_features': 0,
+                'model_bytes': 0,
+                'categories': [],
+                'category_document_count': {},
+                'category_word_count': {}
+            }
+        
         return {
-            'trained': self.is_trained,
-            'total_documents': self.total_documents,
-            'vocabulary_size': len(self.vocabulary),
-            'categories': list(self.category_counts.keys()),
-            'category_document_count': dict(self.category_counts),
-            'category_word_count': dict(self.category_total_words)
+            'trained': True,
+            'model_version': model.version,
+            'total_documents': model.total_documents,
+            'vocabulary_size': model.vocabulary_size,
+            'hash_bits': model.vocabulary.hash_bits,
+            'pruned_features': model.pruned_features,
+            'model_bytes': self._model_bytes(model),
+            'categories': list(model.categories),
+            'category_document_count': dict(model.category_counts),
+            'category_word_count': dict(model.category_total_words)
         }
     
+    @staticmethod
+    def _model_bytes(model: ModelSnapshot) -> int:
+        """Taille des tableaux du modèle en octets (indices partagés comptés une fois)"""
+        return (model.vocabulary.nbytes
+                + model.word_counts.data.nbytes + model.log_counts.data.nbytes
+                + model.word_counts.indices.nbytes + model.word_counts.indptr.nbytes
+                + model.log_priors.nbytes + model.log_denominators.nbytes
+                + model.dense_rows.ids.nbytes + model.dense_rows.log_counts.nbytes
+                + model.dense_rows.row_min.nbytes + model.dense_rows.row_max.nbytes)
+    
     def get_category_priors(self) -> Dict[str, float]:
         """Obtenir les probabilités a priori des catégories"""
+        model = self._model
+        
+        if model is None:
+            return {}
+        
         return {
-            cat: count / self.total_documents 
-            for cat, count in self.category_counts.items()
-        }
\ No newline at end of file
+            cat: count / model.total_documents 
+            for cat, count in model.category_counts.items()
+        }
+
+
+class _SparseCounts:
+    """
+    Accumulateur des compteurs (stem, catégorie) d'un entraînement
+    
+    Les stems sont internés (stem -> identifiant entier, dans l'ordre
+    d'apparition), ou hachés si un HashedVocabulary est fourni, et les
+    compteurs partiels mis en attente en triplets, puis additionnés par lots
+    dans une matrice creuse (stems x catégories) de compteurs int32: 4 octets
+    par cellule non nulle. Si les tranches fournissent le nombre de documents
+    contenant chaque stem, une seconde matrice de mêmes indices l'accumule.
+    """
+    
+    # Triplets en attente avant addition dans la matrice
+    FLUSH_SIZE = 1_000_000
+    
+    def __init__(self, hashed: Optional[HashedVocabulary] = None):
+        self.hashed = hashed
+        self.stem_ids: Dict[str, int] = {}
+        self.category_ids: Dict[str, int] = {}
+        self._rows: List[np.ndarray] = []
+        self._cols: List[np.ndarray] = []
+        self._data: List[np.ndarray] = []
+        self._frequency_rows: List[np.ndarray] = []
+        self._frequency_cols: List[np.ndarray] = []
+        self._frequencies: List[np.ndarray] = []
+        self._pending = 0
+        self._matrix = None
+        self._frequency_matrix = None
+    
+    def add(self, category_counts: Counter, word_counts: Dict[str, Counter],
+            document_frequencies: Optional[Dict[str, Counter]] = None):
+        """
+        Ajouter les compteurs (et éventuellement les fréquences documentaires) d'une tranche
+        
+        Avec le hachage, les fréquences documentaires sont indexées par
+        caractéristique (voir _count_documents), pas par stem.
+        """
+        for category in category_counts:
+            self.category_ids.setdefault(category, len(self.category_ids))
+        
+        stem_ids = self.stem_ids
+        for category, counts in word_counts.items():
+            column = self.category_ids.setdefault(category, len(self.category_ids))
+            if self.hashed is not None:
+                rows = self.hashed.lookup(list(counts))
+            else:
+                rows = np.fromiter((stem_ids.setdefault(stem, len(stem_ids)) for stem in counts),
+                                   dtype=np.int64, count=len(counts))
+            self._rows.append(rows)
+            self._cols.append(np.full(len(counts), column, dtype=np.int64))
+            self._data.append(np.fromiter(counts.values(), dtype=np.int32, count=len(counts)))
+            if document_frequencies:
+                frequencies = document_frequencies[category]
+                if self.hashed is not None:
+                    rows = np.fromiter(frequencies, dtype=np.int64, count=len(frequencies))
+                    self._frequencies.append(np.fromiter(frequencies.values(), dtype=np.int32,
+                                                         count=len(frequencies)))
+                else:
+                    self._frequencies.append(np.fromiter((frequencies[stem] for stem in counts),
+                                                         dtype=np.int32, count=len(counts)))
+                self._frequency_rows.append(rows)
+                self._frequency_cols.append(np.full(len(rows), column, dtype=np.int64))
+            self._pending += len(counts)
+        
+        if self._pending >= self.FLUSH_SIZE:
+            self._flush()
+    
+    def _flush(self):
+        """Additionner les triplets en attente aux matrices"""
+        from scipy import sparse
+        
+        shape = self._shape()
+        
+        def accumulate(matrix, rows, cols, data):
+            if not data:
+                return matrix if matrix is not None else sparse.csr_matrix(shape, dtype=np.int32)
+            update = sparse.csr_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+                                       shape=shape)
+            return update if matrix is None else _resize(matrix, shape) + update
+        
+        self._matrix = accumulate(self._matrix, self._rows, self._cols, self._data)
+        if self._frequencies:
+            self._frequency_matrix = accumulate(self._frequency_matrix, self._frequency_rows,
+                                                self._frequency_cols, self._frequencies)
+        
+        self._rows, self._cols, self._data = [], [], []
+        self._frequency_rows, self._frequency_cols, self._frequencies = [], [], []
+        self._pending = 0
+    
+    def _shape(self) -> Tuple[int, int]:
+        rows = len(self.hashed) if self.hashed is not None else len(self.stem_ids)
+        return rows, len(self.category_ids)
+    
+    def to_csr(self) -> 'sparse.csr_matrix':
+        """Matrice des compteurs (stems x catégories)"""
+        self._flush()
+        return _resize(self._matrix, self._shape())
+    
+    def document_frequencies(self) -> Optional['sparse.csr_matrix']:
+        """Documents contenant chaque stem (stems x catégories), None s'ils n'ont pas été comptés"""
+        self._flush()
+        if self._frequency_matrix is None:
+            return None
+        return _resize(self._frequency_matrix, self._shape())
+    
+    def vocabulary(self) -> Union[Vocabulary, HashedVocabulary]:
+        """Vocabulaire correspondant aux lignes de la matrice"""
+        if self.hashed is not None:
+            return self.hashed
+        return Vocabulary.from_stems(list(self.stem_ids))
+
+
+def _row_positions(indptr: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Positions (dans data et indices) des cellules des lignes demandées d'une matrice CSR"""
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    
+    # Position de chaque cellule: début de sa ligne + rang dans la ligne
+    return np.arange(lengths.sum()) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+
+
+def _resize(matrix: 'sparse.csr_matrix', shape: Tuple[int, int]) -> 'sparse.csr_matrix':
+    """Agrandir une matrice CSR (lignes et colonnes vides en fin), sans copier ses valeurs"""
+    from scipy import sparse
+    
+    indptr = matrix.indptr
+    if shape[0] > len(indptr) - 1:
+        indptr = np.concatenate([indptr, np.full(shape[0] + 1 - len(indptr), indptr[-1], dtype=indptr.dtype)])
+    
+    return sparse.csr_matrix((matrix.data, matrix.indices, indptr), shape=shape)
+
+
+def _prune_rows(word_counts: 'sparse.csr_matrix', vocabulary: Union[Vocabulary, HashedVocabulary],
+                keep: np.ndarray) -> Tuple['sparse.csr_matrix', Union[Vocabulary, HashedVocabulary]]:
+    """Retirer les stems non conservés (lignes supprimées, ou vidées si le vocabulaire est haché)"""
+    from scipy import sparse
+    
+    if vocabulary.hash_bits is None:
+        word_counts = word_counts[np.flatnonzero(keep)]
+    else:
+        word_counts = (sparse.diags(keep, dtype=word_counts.dtype) @ word_counts).tocsr()
+        word_counts.eliminate_zeros()
+    
+    return word_counts, vocabulary.select(keep)
+
+
+def _count_nonempty_rows(matrix: 'sparse.csr_matrix') -> int:
+    """Nombre de lignes non vides (stems ou caractéristiques effectivement vus)"""
+    return int(np.count_nonzero(np.diff(matrix.indptr)))
+
+
+# Service de prétraitement des processus d'entraînement
+_worker_preprocessing: Optional[TextPreprocessingService] = None
+_worker_document_frequency = False
+_worker_hashed: Optional[HashedVocabulary] = None
+
+
+def _iter_shards(documents: Iterable[TrainingDocument], size: int) -> Iterator[List[TrainingDocument]]:
+    """Découper un flux de documents en tranches contiguës (l'ordre est préservé)"""
+    iterator = iter(documents)
+    while True:
+        shard = list(islice(iterator, size))
+        if not shard:
+            return
+        yield shard
+
+
+def _init_worker(preprocessing: TextPreprocessingService, document_frequency: bool = False,
+                 hashed: Optional[HashedVocabulary] = None):
+    """Initialiser un processus d'entraînement"""
+    global _worker_preprocessing, _worker_document_frequency, _worker_hashed
+    _worker_preprocessing = preprocessing
+    _worker_document_frequency = document_frequency
+    _worker_hashed = hashed
+
+
+def _count_shard(documents: List[TrainingDocument]):
+    """Compter une tranche de documents dans un processus d'entraînement"""
+    return _count_documents(_worker_preprocessing, documents, _worker_document_frequency, _worker_hashed)
+
+
+def _count_documents(preprocessing: TextPreprocessingService, documents: Iterable[TrainingDocument],
+                     document_frequency: bool = False,
+                     hashed: Optional[HashedVocabulary] = None) -> Tuple[Counter, Dict[str, Counter],
+                                                                         Counter, Dict[str, Counter]]:
+    """
+    Prétraiter des documents et compter les mots par catégorie
+    
+    Args:
+        preprocessing: Service de prétraitement
+        documents: Documents à compter
+        document_frequency: Compter aussi les documents contenant chaque mot
+        hashed: Vocabulaire haché du modèle: les fréquences documentaires sont
+                alors comptées par caractéristique (deux stems en collision
+                dans un même document ne le comptent qu'une fois)
+                
+    Returns:
+        (documents par catégorie, mots par catégorie, total de mots par catégorie,
+         documents contenant chaque mot (ou caractéristique) par catégorie, vide si non demandé)
+    """
+    category_counts = Counter()
+    word_counts = defaultdict(Counter)
+    total_words = Counter()
+    document_frequencies = defaultdict(Counter)
+    
+    for doc in documents:
+        category = doc.category
+        
+        # Prétraiter le texte
+        stems = preprocessing.preprocess(doc.content)
+        
+        if not stems:
+            logger.warning("Empty document for category: %s", category)
+            continue
+        
+        # Mettre à jour les compteurs
+        category_counts[category] += 1
+        word_counts[category].update(stems)
+        total_words[category] += len(stems)
+        if document_frequency:
+            present = set(stems)
+            if hashed is not None:
+                present = set(hashed.lookup(list(present)).tolist())
+            document_frequencies[category].update(present)
+    
+    return category_counts, dict(word_counts), total_words, dict(document_frequencies)
@@ -0,0 +1,431 @@
+"""
+Cache persistant des documents prétraités
+"""
+import hashlib
+import json
+import logging
+import os
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from app.models import TrainingDocument
+from app.services.text_preprocessing import ARABIC_TOKEN_PATTERN, TextPreprocessingService
+from app.utils.vocabulary import HashedVocabulary
+
+try:
+    import fcntl
+except ImportError:  # Windows: pas de verrou inter-processus
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class PreprocessedCorpusCache:
+    """
+    Cache des documents prétraités, sous forme de tableaux d'identifiants de stems
+    
+    Tous les documents sont concaténés dans un seul fichier binaire (int32)
+    projeté en mémoire, avec un index empreinte du contenu -> (offset, longueur).
+    Le cache est propre à une configuration de prétraitement: changer les
+    suffixes, les stop words ou le tokenizer ouvre un nouveau cache.
+    
+    Fichiers (tous en ajout seul):
+    - stems.txt: un stem par ligne, la ligne i étant le stem d'identifiant i
+    - ids.bin: identifiants de stems de tous les documents
+    - index.tsv: "empreinte<TAB>offset<TAB>longueur" par document
+    """
+    
+    # Tokens accumulés avant un comptage vectorisé (np.bincount)
+    FLUSH_TOKENS = 1_000_000
+    
+    # Documents prétraités par lot lors d'un remplissage du cache
+    MISS_BATCH_SIZE = 256
+    
+    def __init__(self, cache_dir: str, preprocessing: TextPreprocessingService):
+        self.preprocessing = preprocessing
+        self.fingerprint = self.preprocessing_fingerprint(preprocessing)
+        self.directory = os.path.join(cache_dir, self.fingerprint)
+        os.makedirs(self.directory, exist_ok=True)
+        
+        self._stems_file = os.path.join(self.directory, 'stems.txt')
+        self._ids_file = os.path.join(self.directory, 'ids.bin')
+        self._index_file = os.path.join(self.directory, 'index.tsv')
+        self._lock_file = os.path.join(self.directory, 'lock')
+        
+        self._stems: List[str] = []
+        self._stem_ids: Dict[str, int] = {}
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._stems_read = 0
+        self._index_read = 0
+        self._ids = np.zeros(0, dtype=np.int32)
+        self._lock = Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        
+        # Sous le verrou de fichier: un autre processus peut être en train d'ajouter
+        with self._lock, _FileLock(self._lock_file):
+            self._refresh()
+    
+    @staticmethod
+    def preprocessing_fingerprint(preprocessing: TextPreprocessingService) -> str:
+        """Empreinte de la configuration de prétraitement"""
+        config = {
+            'tokenizer': ARABIC_TOKEN_PATTERN.pattern,
+            'suffixes': preprocessing.suffixes,
+            'stop_words': sorted(preprocessing.stop_words_service.stop_words)
+        }
+        encoded = json.dumps(config, ensure_ascii=False, sort_keys=True).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()[:16]
+    
+    @staticmethod
+    def content_digest(content: str) -> str:
+        """Empreinte du contenu d'un document"""
+        return hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def preprocess(self, text: str) -> List[str]:
+        """
+        Prétraiter un texte en passant par le cache
+        
+        Args:
+            text: Texte arabe à prétraiter
+            
+        Returns:
+            Liste de stems (identique à TextPreprocessingService.preprocess)
+        """
+        digest = self.content_digest(text)
+        ids = self._lookup(digest)
+        
+        if ids is None:
+            stems = self.preprocessing.preprocess(text)
+            self._store([(digest, stems)])
+            return stems
+        
+        stems = self._stems
+        return [stems[i] for i in ids.tolist()]
+    
+    def count_documents(self, documents: Iterable[TrainingDocument], workers: int = 1,
+                        document_frequency: bool = False,
+                        hashed: Optional[HashedVocabulary] = None) -> Tuple[Counter, Dict[str, Counter],
+                                                                            Counter, Dict[str, Counter]]:
+        """
+        Compter les mots par catégorie à partir des tableaux en cache
+        
+        Les documents absents du cache sont prétraités (en parallèle si
+        workers > 1) puis ajoutés au cache.
+        
+        Args:
+            documents: Documents d'entraînement
+            workers: Nombre de processus pour les documents absents du cache
+            document_frequency: Compter aussi les documents contenant chaque mot
+            hashed: Vocabulaire haché du modèle: les fréquences documentaires
+                    sont alors comptées par caractéristique (deux stems en
+                    collision dans un même document ne le comptent qu'une fois)
+                    
+        Returns:
+            (documents par catégorie, mots par catégorie, total de mots par catégorie,
+             documents contenant chaque mot (ou caractéristique) par catégorie, vide si non demandé)
+        """
+        category_counts = Counter()
+        total_words = Counter()
+        counts: Dict[str, np.ndarray] = {}
+        frequencies: Dict[str, np.ndarray] = {}
+        hashed_frequencies: Dict[str, Counter] = defaultdict(Counter)
+        features = np.zeros(0, dtype=np.int64)  # Caractéristique hachée de chaque stem du cache
+        buffers: Dict[str, List[np.ndarray]] = defaultdict(list)
+        frequency_buffers: Dict[str, List[np.ndarray]] = defaultdict(list)
+        buffered_tokens = 0
+        misses: List[Tuple[str, TrainingDocument]] = []
+        order: Dict[str, None] = {}
+        
+        executor = None
+        if workers > 1:
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                           initargs=(self.preprocessing,))
+        
+        def present(ids: np.ndarray) -> np.ndarray:
+            # Stems (ou caractéristiques hachées) présents dans un document
+            nonlocal features
+            unique = np.unique(ids)
+            if hashed is None:
+                return unique
+            if len(features) < len(self._stems):
+                features = np.concatenate([features, hashed.lookup(self._stems[len(features):])])
+            return np.unique(features[unique])
+        
+        def add(category: str, ids: np.ndarray):
+            nonlocal buffered_tokens
+            if len(ids) == 0:
+                logger.warning("Empty document for category: %s", category)
+                return
+            category_counts[category] += 1
+            total_words[category] += len(ids)
+            buffers[category].append(ids)
+            if document_frequency:
+                frequency_buffers[category].append(present(ids))
+            buffered_tokens += len(ids)
+        
+        def flush():
+            # Compter toutes les occurrences en attente avec un np.bincount par catégorie
+            nonlocal buffered_tokens
+            vocab_size = len(self._stems)
+            if hashed is not None:
+                # Pas de np.bincount sur les 2^bits caractéristiques: seules celles vues sont comptées
+                for category, chunks in frequency_buffers.items():
+                    ids, document_counts = np.unique(np.concatenate(chunks), return_counts=True)
+                    hashed_frequencies[category].update(dict(zip(ids.tolist(), document_counts.tolist())))
+                frequency_buffers.clear()
+            for pending, totals in ((buffers, counts), (frequency_buffers, frequencies)):
+                for category, chunks in pending.items():
+                    bincount = np.bincount(np.concatenate(chunks), minlength=vocab_size)
+                    previous = totals.get(category)
+                    if previous is not None:
+                        bincount[:len(previous)] += previous
+                    totals[category] = bincount
+                pending.clear()
+            buffered_tokens = 0
+        
+        def process_misses():
+            texts = [doc.content for _, doc in misses]
+            if executor is not None:
+                size = -(-len(texts) // workers)
+                chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+                stems_list = [stems for chunk in executor.map(_preprocess_texts, chunks) for stems in chunk]
+            else:
+                stems_list = [self.preprocessing.preprocess(text) for text in texts]
+            
+            entries = [(digest, stems) for (digest, _), stems in zip(misses, stems_list)]
+            for (_, doc), ids in zip(misses, self._store(entries)):
+                add(doc.category, ids)
+            misses.clear()
+        
+        try:
+            for doc in documents:
+                order.setdefault(doc.category)
+                digest = self.content_digest(doc.content)
+                ids = self._lookup(digest)
+                
+                if ids is None:
+                    misses.append((digest, doc))
+                    if len(misses) >= self.MISS_BATCH_SIZE * max(1, workers):
+                        process_misses()
+                else:
+                    add(doc.category, ids)
+                
+                if buffered_tokens >= self.FLUSH_TOKENS:
+                    flush()
+            
+            if misses:
+                process_misses()
+            flush()
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        
+        # Les documents absents du cache sont comptés en différé: rétablir l'ordre des catégories
+        category_counts = Counter({category: category_counts[category]
+                                   for category in order if category in category_counts})
+        
+        # Revenir aux stems (une conversion par stem distinct, pas par token)
+        word_counts = {}
+        document_frequencies = {}
+        for category in category_counts:
+            category_array = counts[category]
+            nonzero = np.flatnonzero(category_array)
+            stems = [self._stems[i] for i in nonzero.tolist()]
+            word_counts[category] = Counter(dict(zip(stems, category_array[nonzero].tolist())))
+            if document_frequency and hashed is not None:
+                document_frequencies[category] = hashed_frequencies[category]
+            elif document_frequency:
+                document_frequencies[category] = Counter(dict(zip(stems,
+                                                                  frequencies[category][nonzero].tolist())))
+        
+        return category_counts, word_counts, total_words, document_frequencies
+    
+    def _lookup(self, digest: str) -> Optional[np.ndarray]:
+        """Tableau d'identifiants d'un document (None s'il n'est pas en cache)"""
+        entry = self._index.get(digest)
+        
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        offset, length = entry
+        return self._ids[offset:offset + length]
+    
+    def _store(self, entries: List[Tuple[str, List[str]]]) -> List[np.ndarray]:
+        """
+        Ajouter des documents prétraités au cache
+        
+        Args:
+            entries: (empreinte, stems) par document
+            
+        Returns:
+            Tableaux d'identifiants des documents, dans l'ordre des entrées
+        """
+        with self._lock, _FileLock(self._lock_file):
+            # Écarter la fin d'une écriture interrompue: un ajout à sa suite décalerait
+            # les identifiants (ids.bin) ou fusionnerait deux lignes (stems.txt, index.tsv)
+            _truncate_to_multiple(self._ids_file, 4)
+            _truncate_to_last_line(self._stems_file)
+            _truncate_to_last_line(self._index_file)
+            
+            # Relire ce que d'autres processus ont pu ajouter entre-temps
+            self._refresh()
+            
+            new_stems = []
+            arrays = []
+            for _, stems in entries:
+                ids = []
+                for stem in stems:
+                    stem_id = self._stem_ids.get(stem)
+                    if stem_id is None:
+                        stem_id = len(self._stems)
+                        self._stem_ids[stem] = stem_id
+                        self._stems.append(stem)
+                        new_stems.append(stem)
+                    ids.append(stem_id)
+                arrays.append(np.array(ids, dtype=np.int32))
+            
+            offset = os.path.getsize(self._ids_file) // 4 if os.path.exists(self._ids_file) else 0
+            index_lines = []
+            with open(self._ids_file, 'ab') as f:
+                for (digest, _), ids in zip(entries, arrays):
+                    f.write(ids.tobytes())
+                    index_lines.append(f'{digest}\t{offset}\t{len(ids)}\n')
+                    offset += len(ids)
+            
+            if new_stems:
+                with open(self._stems_file, 'a', encoding='utf-8') as f:
+                    f.write(''.join(stem + '\n' for stem in new_stems))
+            
+            with open(self._index_file, 'a', encoding='utf-8') as f:
+                f.write(''.join(index_lines))
+            
+            self._refresh()
+        
+        return arrays
+    
+    def _refresh(self):
+        """Charger les ajouts des fichiers du cache depuis la dernière lecture (sous _FileLock)"""
+        if os.path.exists(self._stems_file):
+            stems, self._stems_read = _read_lines(self._stems_file, self._stems_read)
+            for stem in stems:
+                if stem not in self._stem_ids:
+                    self._stem_ids[stem] = len(self._stems)
+                    self._stems.append(stem)
+        
+        if os.path.exists(self._index_file):
+            lines, self._index_read = _read_lines(self._index_file, self._index_read)
+            for line in lines:
+                digest, offset, length = line.split('\t')
+                self._index[digest] = (int(offset), int(length))
+        
+        # Identifiants entiers seulement: une écriture interrompue peut laisser quelques octets
+        n_ids = os.path.getsize(self._ids_file) // 4 if os.path.exists(self._ids_file) else 0
+        if n_ids != len(self._ids):
+            self._ids = np.memmap(self._ids_file, dtype=np.int32, mode='r', shape=(n_ids,)) \
+                if n_ids else np.zeros(0, dtype=np.int32)
+    
+    def get_stats(self) -> dict:
+        """Obtenir les statistiques du cache"""
+        return {
+            'fingerprint': self.fingerprint,
+            'documents': len(self._index),
+            'stems': len(self._stems),
+            'tokens': len(self._ids),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+class _FileLock:
+    """Verrou exclusif inter-processus sur un fichier (sans effet sans fcntl)"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+    
+    def __enter__(self):
+        if fcntl is not None:
+            self._file = open(self.path, 'a')
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+    
+    def __exit__(self, *exc_info):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+def _truncate_to_multiple(path: str, size: int):
+    """Tronquer un fichier à un multiple de size octets (enregistrements entiers)"""
+    if os.path.exists(path):
+        length = os.path.getsize(path)
+        if length % size:
+            logger.warning("Discarding %d bytes of an interrupted write to %s", length % size, path)
+            os.truncate(path, length - length % size)
+
+
+def _truncate_to_last_line(path: str, block_size: int = 65536):
+    """Tronquer un fichier après sa dernière fin de ligne (lignes entières)"""
+    if not os.path.exists(path):
+        return
+    
+    with open(path, 'rb+') as f:
+        length = f.seek(0, os.SEEK_END)
+        end = length
+        # Chercher la dernière fin de ligne en remontant par blocs
+        while end > 0:
+            start = max(0, end - block_size)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b'\n')
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        
+        if end < length:
+            logger.warning("Discarding %d bytes of an interrupted write to %s", length - end, path)
+            f.truncate(end)
+
+
+def _read_lines(path: str, position: int) -> Tuple[List[str], int]:
+    """
+    Lire les lignes complètes ajoutées à un fichier depuis une position
+    
+    Une ligne sans fin de ligne (en cours d'écriture) n'est pas consommée:
+    elle sera relue entière au prochain appel.
+    
+    Args:
+        path: Fichier en ajout seul
+        position: Octets déjà lus
+        
+    Returns:
+        (lignes lues, nouvelle position après la dernière fin de ligne)
+    """
+    with open(path, 'rb') as f:
+        f.seek(position)
+        data = f.read()
+    
+    end = data.rfind(b'\n') + 1
+    return data[:end].decode('utf-8').split('\n')[:-1], position + end
+
+
+# Service de prétraitement des processus de remplissage du cache
+_worker_preprocessing: Optional[TextPreprocessingService] = None
+
+
+def _init_worker(preprocessing: TextPreprocessingService):
+    """Initialiser un processus de prétraitement"""
+    global _worker_preprocessing
+    _worker_preprocessing = preprocessing
+
+
+def _preprocess_texts(texts: List[str]) -> List[List[str]]:
+    """Prétraiter un lot de textes dans un processus de prétraitement"""
+    return [_worker_preprocessing.preprocess(text) for text in texts]
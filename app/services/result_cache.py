@@ -0,0 +1,62 @@
+"""
+Cache des résultats de classification
+"""
+import hashlib
+from typing import Callable, Optional
+from app.models import ClassificationResult
+from app.services.naive_bayes import NaiveBayesClassifier
+from app.utils.cache import LRUCache
+
+
+class ResultCache:
+    """Cache des résultats de classification, indexé par le contenu du texte"""
+    
+    def __init__(self, classifier: NaiveBayesClassifier, maxsize: int = 10000,
+                 ttl: Optional[float] = None,
+                 classify: Optional[Callable[..., ClassificationResult]] = None):
+        self.classifier = classifier
+        # Classification des textes absents du cache (ex: RequestCoalescer.classify)
+        self._classify = classify or classifier.classify
+        self.cache = LRUCache(maxsize, ttl)
+        self._model_version: Optional[str] = None
+    
+    @staticmethod
+    def text_digest(text: str) -> str:
+        """Empreinte du texte normalisé (espaces consécutifs fusionnés)"""
+        normalized = ' '.join(text.split())
+        return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def classify(self, text: str, top_k: Optional[int] = None, prune: bool = False) -> ClassificationResult:
+        """
+        Classifier un texte, en réutilisant le résultat d'un texte identique
+        
+        Args:
+            text: Texte à classifier
+            top_k: Ne garder que les k catégories les plus probables (toutes si None)
+            prune: Scoring élagué (même résultat: absent de la clé du cache)
+            
+        Returns:
+            ClassificationResult (partagé entre les appels: ne pas le modifier)
+        """
+        version = self.classifier.model_version
+        
+        # Nouveau modèle: les anciens résultats ne peuvent plus servir
+        if version != self._model_version:
+            self.cache.clear()
+            self._model_version = version
+        
+        if prune and top_k is None:
+            top_k = 1
+        
+        digest = self.text_digest(text)
+        result = self.cache.get((version, digest, top_k))
+        
+        if result is None:
+            result = self._classify(text, top_k, prune)
+            self.cache.put((result.model_version, digest, top_k), result)
+        
+        return result
+    
+    def get_stats(self) -> dict:
+        """Obtenir les statistiques du cache"""
+        return self.cache.get_stats()
@@ -1,10 +1,13 @@
 """
 Service de gestion des stop words arabes
 """
+import logging
 import os
 from typing import Set, List
 from flask import current_app
 
+logger = logging.getLogger(__name__)
+
 
 class StopWordsService:
     """Service pour gérer les stop words arabes"""
@@ -24,13 +27,13 @@ class StopWordsService:
                         line = line.strip()
                         if line and not line.startswith('#'):
                             self.stop_words.add(line)
-                print(f"✅ Loaded {len(self.stop_words)} Arabic stop words")
+                logger.info("Loaded %d Arabic stop words", len(self.stop_words))
             else:
                 self._load_default_stop_words()
-                print("⚠️  Stop words file not found, using default set")
-                
+                logger.warning("Stop words file not found, using default set")
+        
         except Exception as e:
-            print(f"❌ Error loading stop words: {e}")
+            logger.error("Error loading stop words: %s", e)
             self._load_default_stop_words()
     
     def _load_default_stop_words(self):
@@ -2,21 +2,50 @@
 Service de prétraitement de texte arabe
 """
 import re
-from typing import List
+from itertools import count
+from time import perf_counter
+from typing import Dict, Iterable, Iterator, List
 from app.services.stop_words import StopWordsService
+from app.utils.cache import LRUCache
+from app.utils.instrumentation import STAGE_SECONDS, TOKENS_PROCESSED
+
+
+# Un token est une suite maximale de caractères arabes: tout le reste
+# (ponctuation, chiffres latins, espaces...) sert de séparateur
+ARABIC_TOKEN_PATTERN = re.compile(r'[\u0600-\u06FF]+')
+
+PREPROCESS_SECONDS = STAGE_SECONDS.labels('preprocess')
+TOKENIZE_SECONDS = STAGE_SECONDS.labels('tokenize')
+STEM_SECONDS = STAGE_SECONDS.labels('stem')
 
 
 class TextPreprocessingService:
     """Service de prétraitement de texte arabe"""
     
-    def __init__(self, stop_words_service: StopWordsService):
+    # Marqueur des stop words dans le cache de stems
+    _STOP_WORD = ''
+    
+    def __init__(self, stop_words_service: StopWordsService, cache_size: int = 100000,
+                 timing_sample: int = 16):
         self.stop_words_service = stop_words_service
         
+        # Un appel sur timing_sample mesure séparément tokenization et stemming (0 = jamais)
+        self.timing_sample = timing_sample
+        self._calls = count()
+        
         # Suffixes arabes courants à retirer pour le stemming
         self.suffixes = [
             "ون", "ين", "ات", "ان", "ها", "هم", "هن", 
             "كم", "كن", "ني", "ه", "ة", "ي"
         ]
+        
+        # Suffixes indexés par leur dernier caractère (ordre de priorité conservé)
+        self.suffixes_by_last_char: Dict[str, List[str]] = {}
+        for suffix in self.suffixes:
+            self.suffixes_by_last_char.setdefault(suffix[-1], []).append(suffix)
+        
+        # Cache token -> stem
+        self.stem_cache = LRUCache(cache_size)
     
     def tokenize(self, text: str) -> List[str]:
         """
@@ -28,18 +57,22 @@ class TextPreprocessingService:
         Returns:
             Liste de tokens
         """
-        # Supprimer la ponctuation (sauf les caractères arabes)
-        text = re.sub(r'[^\u0600-\u06FF\s]', ' ', text)
-        
-        # Séparer par les espaces
-        tokens = text.split()
-        
-        # Nettoyer et filtrer les tokens vides
-        tokens = [token.strip() for token in tokens if token.strip()]
+        return list(self.iter_tokens(text))
+    
+    def iter_tokens(self, text: str) -> Iterator[str]:
+        """
+        Tokenizer en un seul passage, sans copie intermédiaire du texte
         
-        return tokens
+        Args:
+            text: Texte arabe à tokenizer
+            
+        Yields:
+            Les tokens, dans l'ordre du texte
+        """
+        for match in ARABIC_TOKEN_PATTERN.finditer(text):
+            yield match.group()
     
-    def stem(self, tokens: List[str]) -> List[str]:
+    def stem(self, tokens: Iterable[str]) -> List[str]:
         """
         Stemming simple pour l'arabe
         
@@ -49,24 +82,48 @@ class TextPreprocessingService:
         Returns:
             Liste de stems
         """
-        stems = []
+        return list(self.iter_stems(tokens))
+    
+    def iter_stems(self, tokens: Iterable[str]) -> Iterator[str]:
+        """
+        Stemming + filtrage des stop words au fil des tokens
         
+        Args:
+            tokens: Tokens (liste ou générateur)
+            
+        Yields:
+            Les stems des tokens qui ne sont pas des stop words
+        """
         for token in tokens:
-            # Ignorer les stop words
-            if self.stop_words_service.is_stop_word(token):
-                continue
+            stem = self.stem_cache.get(token)
             
-            stem = token
+            if stem is None:
+                stem = self._stem_token(token)
+                self.stem_cache.put(token, stem)
             
-            # Retirer les suffixes
-            for suffix in self.suffixes:
-                if stem.endswith(suffix) and len(stem) > len(suffix) + 2:
-                    stem = stem[:-len(suffix)]
-                    break
+            # Ignorer les stop words
+            if stem:
+                yield stem
+    
+    def _stem_token(self, token: str) -> str:
+        """
+        Stemmer un token
+        
+        Args:
+            token: Token à stemmer
             
-            stems.append(stem)
+        Returns:
+            Le stem, ou _STOP_WORD si le token est un stop word
+        """
+        if self.stop_words_service.is_stop_word(token):
+            return self._STOP_WORD
         
-        return stems
+        # Retirer le premier suffixe applicable
+        for suffix in self.suffixes_by_last_char.get(token[-1], ()):
+            if token.endswith(suffix) and len(token) > len(suffix) + 2:
+                return token[:-len(suffix)]
+        
+        return token
     
     def preprocess(self, text: str) -> List[str]:
         """
@@ -78,11 +135,28 @@ class TextPreprocessingService:
         Returns:
             Liste de stems
         """
-        # Tokenization
-        tokens = self.tokenize(text)
+        # Étapes séparées, sur un échantillon d'appels: le tokenizer est d'abord
+        # parcouru seul (sans garder les tokens), le stemming est le reste du pipeline
+        sampled = self.timing_sample and next(self._calls) % self.timing_sample == 0
+        if sampled:
+            start = perf_counter()
+            for _ in self.iter_tokens(text):
+                pass
+            tokenize_seconds = perf_counter() - start
+        
+        # Tokenization -> stemming + filtrage stop words, token par token (sans
+        # liste intermédiaire). zip s'arrête au dernier token sans avancer le
+        # compteur: il compte les tokens lus.
+        start = perf_counter()
+        counter = count()
+        stems = list(self.iter_stems(token for token, _ in zip(self.iter_tokens(text), counter)))
+        preprocess_seconds = perf_counter() - start
         
-        # Stemming + filtrage stop words
-        stems = self.stem(tokens)
+        PREPROCESS_SECONDS.observe(preprocess_seconds)
+        TOKENS_PROCESSED.inc(next(counter))
+        if sampled:
+            TOKENIZE_SECONDS.observe(tokenize_seconds)
+            STEM_SECONDS.observe(max(preprocess_seconds - tokenize_seconds, 0.0))
         
         return stems
     
@@ -91,5 +165,6 @@ class TextPreprocessingService:
         return {
             'tokenizer': 'Simple Arabic Tokenizer',
             'stemmer': 'Simple Arabic Stemmer',
-            'stop_words_count': self.stop_words_service.get_count()
+            'stop_words_count': self.stop_words_service.get_count(),
+            'stem_cache': self.stem_cache.get_stats()
         }
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""
+Cache LRU borné et thread-safe
+"""
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    """Cache clé -> valeur avec éviction LRU, expiration optionnelle et compteurs"""
+    
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._expires: dict = {}
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Obtenir une valeur (et la marquer comme récemment utilisée)"""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            
+            if self.ttl is not None and self._expires[key] <= time.monotonic():
+                # Entrée expirée
+                del self._data[key]
+                del self._expires[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key: Hashable, value: Any):
+        """Ajouter une valeur, en évinçant la moins récemment utilisée si plein"""
+        if self.maxsize <= 0:
+            return
+        
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if self.ttl is not None:
+                self._expires[key] = time.monotonic() + self.ttl
+            
+            while len(self._data) > self.maxsize:
+                old_key, _ = self._data.popitem(last=False)
+                self._expires.pop(old_key, None)
+                self.evictions += 1
+    
+    def clear(self):
+        """Vider le cache"""
+        with self._lock:
+            self._data.clear()
+            self._expires.clear()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def get_stats(self) -> dict:
+        """Obtenir les statistiques du cache"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+    
+    def __getstate__(self):
+        # Le verrou n'est pas sérialisable: copier uniquement la configuration
+        return {'maxsize': self.maxsize, 'ttl': self.ttl}
+    
+    def __setstate__(self, state):
+        self.__init__(state['maxsize'], state['ttl'])
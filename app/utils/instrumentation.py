@@ -0,0 +1,335 @@
+"""
+Instrumentation: compteurs, jauges et histogrammes de latence
+
+Les métriques sont exposées au format texte de Prometheus (/api/metrics).
+Elles sont propres à chaque processus: avec plusieurs workers, chacun
+expose les siennes.
+
+Sur le chemin critique, une observation n'est qu'un ajout dans une deque
+(atomique en CPython, sans verrou); les observations en attente sont
+réparties dans les cases à l'export, ou par paquets de FOLD_SIZE.
+"""
+import math
+from bisect import bisect_left
+from collections import Counter as _Tally, deque
+from itertools import islice, repeat
+from threading import Lock
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Bornes des histogrammes de latence (secondes): de 10 µs à 100 s
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                   0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0)
+
+# Bornes des histogrammes de taille de lot
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Observations en attente avant d'être agrégées (borne la mémoire entre deux exports)
+FOLD_SIZE = 4096
+
+
+class _CounterChild:
+    """Valeur d'un compteur pour une combinaison de labels"""
+    
+    def __init__(self):
+        self._value = 0.0
+        self._pending = deque()
+        self._function: Optional[Callable[[], float]] = None
+        self._lock = Lock()
+    
+    def inc(self, amount: float = 1):
+        """Incrémenter le compteur"""
+        pending = self._pending
+        pending.append(amount)
+        if len(pending) >= FOLD_SIZE:
+            self._fold()
+    
+    def _fold(self):
+        """Additionner les incréments en attente"""
+        with self._lock:
+            self._value += sum(_drain(self._pending))
+    
+    def set_function(self, function: Callable[[], float]):
+        """Lire la valeur dans un compteur existant (appelé à chaque export)"""
+        self._function = function
+    
+    def get(self) -> float:
+        if self._function is not None:
+            return self._function()
+        self._fold()
+        return self._value
+    
+    def samples(self, name: str, labels: str) -> List[str]:
+        return [f'{name}{labels} {_format(self.get())}']
+
+
+class _GaugeChild(_CounterChild):
+    """Valeur d'une jauge pour une combinaison de labels"""
+    
+    def set(self, value: float):
+        """Fixer la valeur de la jauge"""
+        with self._lock:
+            self._pending.clear()
+            self._value = value
+
+
+class _HistogramChild:
+    """Répartition des observations d'un histogramme pour une combinaison de labels"""
+    
+    def __init__(self, buckets: Sequence[float]):
+        self._upper_bounds = list(buckets)
+        self._counts = [0] * (len(buckets) + 1)  # Dernière case: +Inf
+        self._sum = 0.0
+        self._pending = deque()
+        self._lock = Lock()
+    
+    def observe(self, value: float):
+        """Ajouter une observation"""
+        pending = self._pending
+        pending.append(value)
+        if len(pending) >= FOLD_SIZE:
+            self._fold()
+    
+    def _fold(self):
+        """Répartir les observations en attente dans les cases"""
+        with self._lock:
+            values = _drain(self._pending)
+            for index, count in _Tally(map(bisect_left, repeat(self._upper_bounds), values)).items():
+                self._counts[index] += count
+            self._sum += sum(values)
+    
+    def time(self) -> '_Timer':
+        """Mesurer la durée d'un bloc: `with histogram.time(): ...`"""
+        return _Timer(self)
+    
+    def snapshot(self) -> Tuple[List[int], float]:
+        """(nombre d'observations par case, somme des observations)"""
+        self._fold()
+        with self._lock:
+            return list(self._counts), self._sum
+    
+    def samples(self, name: str, labels: str) -> List[str]:
+        counts, total = self.snapshot()
+        prefix = labels[:-1] + ',' if labels else '{'
+        
+        lines = []
+        cumulative = 0
+        for upper_bound, count in zip(self._upper_bounds + [math.inf], counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{prefix}le="{_format(upper_bound)}"}} {cumulative}')
+        lines.append(f'{name}_sum{labels} {_format(total)}')
+        lines.append(f'{name}_count{labels} {cumulative}')
+        return lines
+
+
+class _Timer:
+    """Gestionnaire de contexte qui observe la durée de son bloc"""
+    
+    __slots__ = ('_histogram', '_start')
+    
+    def __init__(self, histogram: _HistogramChild):
+        self._histogram = histogram
+    
+    def __enter__(self):
+        self._start = perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._histogram.observe(perf_counter() - self._start)
+
+
+class _Metric:
+    """
+    Famille de métriques de même nom, une valeur par combinaison de labels
+    
+    Sans labels, la famille s'utilise directement (counter.inc()); avec des
+    labels, par labels() dont le résultat peut être gardé pour le chemin
+    critique.
+    """
+    
+    type_name = ''
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+    
+    def _new_child(self):
+        raise NotImplementedError
+    
+    def labels(self, *values: str, **labels: str):
+        """Valeur de la métrique pour une combinaison de labels"""
+        if labels:
+            values = tuple(labels[name] for name in self.labelnames)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+    
+    def render(self) -> List[str]:
+        """Lignes du format texte de Prometheus"""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+        for key, child in sorted(self._children.items()):
+            labels = ''
+            if key:
+                labels = '{' + ','.join(f'{name}="{_escape(value)}"'
+                                        for name, value in zip(self.labelnames, key)) + '}'
+            lines.extend(child.samples(self.name, labels))
+        return lines
+
+
+class Counter(_Metric):
+    """Compteur croissant (documents classifiés, tokens, hits de cache...)"""
+    
+    type_name = 'counter'
+    
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+    
+    def inc(self, amount: float = 1):
+        self._default.inc(amount)
+    
+    def set_function(self, function: Callable[[], float]):
+        self._default.set_function(function)
+
+
+class Gauge(_Metric):
+    """Valeur instantanée (taille du vocabulaire, mémoire du modèle...)"""
+    
+    type_name = 'gauge'
+    
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+    
+    def set(self, value: float):
+        self._default.set(value)
+    
+    def set_function(self, function: Callable[[], float]):
+        self._default.set_function(function)
+
+
+class Histogram(_Metric):
+    """Répartition d'observations (latences) dans des cases fixes"""
+    
+    type_name = 'histogram'
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+    
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+    
+    def observe(self, value: float):
+        self._default.observe(value)
+    
+    def time(self) -> _Timer:
+        return self._default.time()
+
+
+class Registry:
+    """Ensemble des métriques exportées"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = Lock()
+    
+    def register(self, metric: _Metric) -> _Metric:
+        """Ajouter une métrique (une seule par nom)"""
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+    
+    def render(self) -> str:
+        """Toutes les métriques au format texte de Prometheus"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def _drain(pending: deque) -> list:
+    """Retirer les valeurs en attente (celles ajoutées pendant l'appel restent en attente)"""
+    return list(islice(iter(pending.popleft, None), len(pending)))
+
+
+def _format(value: float) -> str:
+    """Nombre au format Prometheus"""
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    """Échapper une valeur de label"""
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+# Métriques de l'application
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'arabic_classifier_stage_duration_seconds',
+    'Duration of each processing stage',
+    ['stage']
+))
+TOKENS_PROCESSED = REGISTRY.register(Counter(
+    'arabic_classifier_tokens_processed_total',
+    'Tokens preprocessed (tokenized and stemmed)'
+))
+DOCUMENTS_CLASSIFIED = REGISTRY.register(Counter(
+    'arabic_classifier_documents_classified_total',
+    'Documents scored by the model (result cache hits excluded)'
+))
+CACHE_HITS = REGISTRY.register(Counter(
+    'arabic_classifier_cache_hits_total',
+    'Cache hits',
+    ['cache']
+))
+CACHE_MISSES = REGISTRY.register(Counter(
+    'arabic_classifier_cache_misses_total',
+    'Cache misses',
+    ['cache']
+))
+VOCABULARY_SIZE = REGISTRY.register(Gauge(
+    'arabic_classifier_vocabulary_size',
+    'Stems (or hashed features) with at least one count in the served model'
+))
+MODEL_BYTES = REGISTRY.register(Gauge(
+    'arabic_classifier_model_bytes',
+    'Memory of the served model arrays'
+))
+POOL_JOBS = REGISTRY.register(Gauge(
+    'arabic_classifier_pool_jobs',
+    'Scoring jobs running or queued in the ASGI worker pool'
+))
+REQUESTS_REJECTED = REGISTRY.register(Counter(
+    'arabic_classifier_requests_rejected_total',
+    'Requests rejected with 503 because the ASGI worker pool queue was full'
+))
+COALESCED_BATCH_SIZE = REGISTRY.register(Histogram(
+    'arabic_classifier_coalesced_batch_size',
+    'Requests scored together by the micro-batching coalescer',
+    buckets=BATCH_SIZE_BUCKETS
+))
+COALESCER_WAIT_SECONDS = REGISTRY.register(Histogram(
+    'arabic_classifier_coalescer_wait_seconds',
+    'Time a request waited in the coalescer queue before its batch was scored'
+))
@@ -1,11 +1,23 @@
 """
 Calcul des métriques d'évaluation
 """
+import logging
 import numpy as np
-from typing import List, Dict
-from sklearn.metrics import accuracy_score, precision_recall_fscore_support, confusion_matrix
-from app.models import EvaluationMetrics, TrainingDocument
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from scipy import sparse
+from typing import List, Dict, Optional, Tuple
+from app.models import CrossValidationMetrics, EvaluationMetrics, TrainingDocument
 from app.services.naive_bayes import NaiveBayesClassifier
+from app.services.preprocessed_cache import PreprocessedCorpusCache
+from app.utils.instrumentation import STAGE_SECONDS
+from app.utils.pruning import VocabularyPruning
+from app.utils.vocabulary import HashedVocabulary
+
+logger = logging.getLogger(__name__)
+
+EVALUATE_SECONDS = STAGE_SECONDS.labels('evaluate')
+CROSS_VALIDATE_SECONDS = STAGE_SECONDS.labels('cross_validate')
 
 
 class MetricsCalculator:
@@ -13,49 +25,56 @@ class MetricsCalculator:
     
     @staticmethod
     def evaluate(model: NaiveBayesClassifier, 
-                 test_documents: List[TrainingDocument]) -> EvaluationMetrics:
+                 test_documents: List[TrainingDocument],
+                 cache: Optional[PreprocessedCorpusCache] = None) -> EvaluationMetrics:
         """
         Évaluer le modèle sur des documents de test
         
         Args:
             model: Modèle entraîné
             test_documents: Documents de test
+            cache: Cache des documents prétraités (optionnel)
             
         Returns:
             EvaluationMetrics avec toutes les métriques
         """
-        print(f"📊 Evaluating model on {len(test_documents)} test documents...")
+        logger.info("Evaluating model on %d test documents", len(test_documents))
+        start = perf_counter()
         
-        # Prédictions
-        y_true = []
-        y_pred = []
+        # Catégories uniques, encodées en entiers une seule fois
+        categories = sorted({doc.category for doc in test_documents})
+        category_ids = {category: i for i, category in enumerate(categories)}
+        y_true = np.array([category_ids[doc.category] for doc in test_documents], dtype=np.int64)
         
-        for doc in test_documents:
-            y_true.append(doc.category)
-            result = model.classify(doc.content)
-            y_pred.append(result.predicted_category)
+        # Prédictions: tous les documents scorés en un produit matriciel
+        if cache is not None:
+            stems_list = [cache.preprocess(doc.content) for doc in test_documents]
+        else:
+            stems_list = [model.preprocessing.preprocess(doc.content) for doc in test_documents]
         
-        # Catégories uniques
-        categories = sorted(set(y_true))
+        model_categories, predictions = model.predict_many(stems_list)
         
-        # Accuracy
-        accuracy = accuracy_score(y_true, y_pred)
+        # Catégories du modèle absentes du test: colonne "autre" (indice len(categories))
+        to_label = np.array([category_ids.get(cat, len(categories)) for cat in model_categories],
+                            dtype=np.int64)
+        y_pred = to_label[predictions]
         
-        # Precision, Recall, F1-Score
-        precision, recall, f1, _ = precision_recall_fscore_support(
-            y_true, y_pred, labels=categories, average=None, zero_division=0
-        )
+        # Matrice de confusion en un seul np.bincount
+        n_columns = len(categories) + 1
+        conf = np.bincount(y_true * n_columns + y_pred,
+                           minlength=len(categories) * n_columns).reshape(len(categories), n_columns)
         
-        # Matrice de confusion
-        conf_matrix = confusion_matrix(y_true, y_pred, labels=categories)
+        # Toutes les métriques découlent de la matrice
+        accuracy, precision, recall, f1 = MetricsCalculator._metrics_from_confusion(conf)
+        conf_matrix = conf[:, :len(categories)]
         
         # Créer les dictionnaires
-        precision_dict = {cat: prec for cat, prec in zip(categories, precision)}
-        recall_dict = {cat: rec for cat, rec in zip(categories, recall)}
-        f1_dict = {cat: f for cat, f in zip(categories, f1)}
+        precision_dict = dict(zip(categories, precision.tolist()))
+        recall_dict = dict(zip(categories, recall.tolist()))
+        f1_dict = dict(zip(categories, f1.tolist()))
         
-        print(f"✅ Evaluation completed:")
-        print(f"   - Accuracy: {accuracy:.2%}")
+        EVALUATE_SECONDS.observe(perf_counter() - start)
+        logger.info("Evaluation completed: accuracy %.2f%%", accuracy * 100)
         
         return EvaluationMetrics(
             accuracy=accuracy,
@@ -64,4 +83,219 @@ class MetricsCalculator:
             f1_score=f1_dict,
             confusion_matrix=conf_matrix.tolist(),
             categories=categories
-        )
\ No newline at end of file
+        )
+    
+    @staticmethod
+    def cross_validate(model: NaiveBayesClassifier,
+                       documents: List[TrainingDocument],
+                       k: int = 5,
+                       random_state: Optional[int] = None,
+                       workers: int = 1,
+                       cache: Optional[PreprocessedCorpusCache] = None) -> CrossValidationMetrics:
+        """
+        Validation croisée en k folds
+        
+        Chaque document n'est prétraité qu'une fois. Les compteurs
+        d'entraînement d'un fold sont obtenus en soustrayant les compteurs du
+        fold aux totaux du corpus, ce qui donne exactement le modèle qu'un
+        entraînement sur les autres folds produirait, sans réentraîner, y
+        compris l'élagage du vocabulaire, appliqué aux compteurs de chaque
+        fold. Les folds sont évalués en parallèle. Le modèle passé n'est pas
+        modifié.
+        
+        Args:
+            model: Classificateur (seuls son prétraitement, son hachage et son
+                   élagage sont utilisés)
+            documents: Documents étiquetés
+            k: Nombre de folds
+            random_state: Graine du découpage en folds
+            workers: Nombre de processus pour évaluer les folds
+            cache: Cache des documents prétraités (optionnel)
+            
+        Returns:
+            CrossValidationMetrics avec moyenne et écart-type par catégorie
+        """
+        if not 2 <= k <= len(documents):
+            raise ValueError(f"k must be between 2 and the number of documents ({len(documents)})")
+        
+        logger.info("Cross-validating on %d documents (%d folds)", len(documents), k)
+        start = perf_counter()
+        
+        # Prétraiter une seule fois: matrice document-terme (creuse)
+        categories = sorted({doc.category for doc in documents})
+        category_ids = {category: i for i, category in enumerate(categories)}
+        labels = np.array([category_ids[doc.category] for doc in documents], dtype=np.int64)
+        
+        # Colonnes: stems internés, ou caractéristiques hachées comme le modèle
+        hashed = HashedVocabulary(model.hash_bits) if model.hash_bits else None
+        stem_ids: Dict[str, int] = {}
+        rows, cols = [], []
+        for i, doc in enumerate(documents):
+            stems = cache.preprocess(doc.content) if cache is not None else model.preprocessing.preprocess(doc.content)
+            rows.extend([i] * len(stems))
+            if hashed is not None:
+                cols.extend(hashed.lookup(stems).tolist())
+            else:
+                cols.extend(stem_ids.setdefault(stem, len(stem_ids)) for stem in stems)
+        
+        n_features = len(hashed) if hashed is not None else len(stem_ids)
+        doc_term = sparse.csr_matrix((np.ones(len(cols), dtype=np.int64), (rows, cols)),
+                                     shape=(len(documents), n_features))
+        
+        # Découpage reproductible en folds
+        folds = np.empty(len(documents), dtype=np.int64)
+        permutation = np.random.RandomState(random_state).permutation(len(documents))
+        for fold, indices in enumerate(np.array_split(permutation, k)):
+            folds[indices] = fold
+        
+        # Évaluer les folds (en parallèle si demandé)
+        workers = max(1, min(workers, k))
+        initargs = (doc_term, labels, folds, len(categories), model.pruning)
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_cv_worker,
+                                     initargs=initargs) as executor:
+                confusion_matrices = list(executor.map(_score_fold, range(k)))
+        else:
+            _init_cv_worker(*initargs)
+            confusion_matrices = [_score_fold(fold) for fold in range(k)]
+        
+        # Agréger les métriques des folds
+        fold_metrics = [MetricsCalculator._metrics_from_confusion(conf) for conf in confusion_matrices]
+        accuracies = np.array([accuracy for accuracy, _, _, _ in fold_metrics])
+        precision = np.array([fold[1] for fold in fold_metrics])
+        recall = np.array([fold[2] for fold in fold_metrics])
+        f1 = np.array([fold[3] for fold in fold_metrics])
+        
+        CROSS_VALIDATE_SECONDS.observe(perf_counter() - start)
+        logger.info("Cross-validation completed: accuracy %.2f%% ± %.2f%%",
+                    accuracies.mean() * 100, accuracies.std() * 100)
+        
+        return CrossValidationMetrics(
+            k=k,
+            categories=categories,
+            fold_accuracies=accuracies.tolist(),
+            accuracy_mean=float(accuracies.mean()),
+            accuracy_std=float(accuracies.std()),
+            precision_mean=dict(zip(categories, precision.mean(axis=0).tolist())),
+            precision_std=dict(zip(categories, precision.std(axis=0).tolist())),
+            recall_mean=dict(zip(categories, recall.mean(axis=0).tolist())),
+            recall_std=dict(zip(categories, recall.std(axis=0).tolist())),
+            f1_score_mean=dict(zip(categories, f1.mean(axis=0).tolist())),
+            f1_score_std=dict(zip(categories, f1.std(axis=0).tolist()))
+        )
+    
+    @staticmethod
+    def _metrics_from_confusion(conf: np.ndarray) -> Tuple[float, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Calculer accuracy, precision, recall et F1 depuis une matrice de confusion
+        
+        Args:
+            conf: Matrice de confusion (lignes = vraies catégories). Des colonnes
+                  supplémentaires comptent les prédictions hors catégories.
+                  
+        Returns:
+            (accuracy, precision, recall, f1) par catégorie (0 si indéfini)
+        """
+        n_categories = conf.shape[0]
+        true_positives = np.diag(conf[:, :n_categories]).astype(float)
+        predicted = conf[:, :n_categories].sum(axis=0)
+        actual = conf.sum(axis=1)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            precision = np.where(predicted > 0, true_positives / predicted, 0.0)
+            recall = np.where(actual > 0, true_positives / actual, 0.0)
+            f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+        
+        total = conf.sum()
+        accuracy = float(true_positives.sum() / total) if total else 0.0
+        
+        return accuracy, precision, recall, f1
+
+
+# Données partagées par les processus de validation croisée
+_cv_state: dict = {}
+
+
+def _init_cv_worker(doc_term: sparse.csr_matrix, labels: np.ndarray, folds: np.ndarray, n_categories: int,
+                    pruning: VocabularyPruning):
+    """Initialiser un processus de validation croisée (totaux du corpus calculés une fois)"""
+    category_matrix = sparse.csr_matrix((np.ones(len(labels)), (np.arange(len(labels)), labels)),
+                                        shape=(len(labels), n_categories))
+    
+    # Présence des stems par document, pour les critères d'élagage par document
+    presence = None
+    if pruning.needs_document_frequencies:
+        presence = (doc_term > 0).astype(np.int64)
+    
+    _cv_state.update(
+        doc_term=doc_term,
+        labels=labels,
+        folds=folds,
+        n_categories=n_categories,
+        category_matrix=category_matrix,
+        totals=(category_matrix.T @ doc_term).tocsr(),
+        doc_lengths=np.asarray(doc_term.sum(axis=1)).ravel(),
+        pruning=pruning,
+        presence=presence,
+        presence_totals=(category_matrix.T @ presence).tocsr() if presence is not None else None
+    )
+
+
+def _score_fold(fold: int) -> np.ndarray:
+    """
+    Évaluer un fold: entraîner par soustraction puis classifier ses documents
+    
+    Args:
+        fold: Numéro du fold de test
+        
+    Returns:
+        Matrice de confusion du fold
+    """
+    doc_term = _cv_state['doc_term']
+    labels = _cv_state['labels']
+    n_categories = _cv_state['n_categories']
+    doc_lengths = _cv_state['doc_lengths']
+    
+    test = _cv_state['folds'] == fold
+    train = ~test & (doc_lengths > 0)  # Les documents vides sont ignorés à l'entraînement
+    test_rows = np.flatnonzero(test)
+    
+    # Compteurs d'entraînement = totaux du corpus - compteurs du fold
+    fold_counts = _cv_state['category_matrix'][test_rows].T @ doc_term[test_rows]
+    train_counts = (_cv_state['totals'] - fold_counts).tocsr()
+    
+    # Catégories présentes à l'entraînement, dans l'ordre de première apparition
+    train_rows = np.flatnonzero(train)
+    document_counts = np.bincount(labels[train_rows], minlength=n_categories)
+    first_seen = np.full(n_categories, len(labels))
+    np.minimum.at(first_seen, labels[train_rows], train_rows)
+    present = np.flatnonzero(document_counts > 0)
+    present = present[np.argsort(first_seen[present], kind='stable')]
+    
+    # Élaguer comme l'entraînement: colonnes des stems retirés vidées
+    pruning = _cv_state['pruning']
+    if pruning.enabled:
+        train_presence = None
+        if _cv_state['presence'] is not None:
+            fold_presence = _cv_state['category_matrix'][test_rows].T @ _cv_state['presence'][test_rows]
+            train_presence = (_cv_state['presence_totals'] - fold_presence).T
+        keep = pruning.select(train_counts.T, train_presence, document_counts)
+        train_counts = (train_counts @ sparse.diags(keep.astype(float))).tocsr()
+    
+    # Paramètres du modèle du fold (mêmes formules que NaiveBayesClassifier)
+    vocab_size = np.count_nonzero(np.asarray(train_counts.sum(axis=0)).ravel())
+    total_words = np.asarray(train_counts.sum(axis=1)).ravel()[present]
+    log_priors = np.log(document_counts[present] / document_counts.sum())
+    log_denominators = np.log(total_words + vocab_size)
+    log_counts = train_counts[present].astype(float).log1p()
+    
+    # Scorer tous les documents du fold en un produit matriciel
+    test_lengths = doc_lengths[test_rows]
+    log_probs = (np.asarray((doc_term[test_rows] @ log_counts.T).todense())
+                 - np.outer(test_lengths, log_denominators)
+                 + log_priors)
+    predictions = present[np.argmax(log_probs, axis=1)]
+    predictions[test_lengths == 0] = present[0]  # Résultat par défaut des documents vides
+    
+    return np.bincount(labels[test_rows] * n_categories + predictions,
+                       minlength=n_categories * n_categories).reshape(n_categories, n_categories)
@@ -0,0 +1,135 @@
+"""
+Élagage du vocabulaire à l'entraînement
+"""
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+
+# Écart de gain d'information considéré comme une égalité (erreurs d'arrondi)
+GAIN_TOLERANCE = 1e-12
+
+
+@dataclass(frozen=True)
+class VocabularyPruning:
+    """
+    Critères d'élagage des stems (ou caractéristiques hachées) d'un modèle
+    
+    Les stems vus une ou deux fois forment l'essentiel du vocabulaire mais
+    n'apportent presque rien à la précision: les retirer avant de compiler le
+    modèle réduit sa taille et le dénominateur du lissage de Laplace. Les
+    valeurs par défaut ne retirent rien.
+    
+    Attributes:
+        min_df: Nombre minimal de documents contenant le stem
+        min_count: Nombre minimal d'occurrences du stem dans le corpus
+        max_df: Part maximale des documents contenant le stem (0 < max_df <= 1)
+        top_n: Garder les top_n stems de plus fort gain d'information, plus
+               ceux à égalité avec le dernier (None = pas de sélection)
+    """
+    min_df: int = 1
+    min_count: int = 1
+    max_df: float = 1.0
+    top_n: Optional[int] = None
+    
+    def __post_init__(self):
+        if self.min_df < 1 or self.min_count < 1:
+            raise ValueError("min_df and min_count must be >= 1")
+        if not 0 < self.max_df <= 1:
+            raise ValueError("max_df must be in (0, 1]")
+        if self.top_n is not None and self.top_n < 1:
+            raise ValueError("top_n must be >= 1")
+    
+    @property
+    def enabled(self) -> bool:
+        """Au moins un critère retire-t-il des stems?"""
+        return self.min_count > 1 or self.needs_document_frequencies
+    
+    @property
+    def needs_document_frequencies(self) -> bool:
+        """Les critères dépendent-ils du nombre de documents contenant chaque stem?"""
+        return self.min_df > 1 or self.max_df < 1 or self.top_n is not None
+    
+    def select(self, counts, document_frequencies, category_documents: np.ndarray) -> np.ndarray:
+        """
+        Choisir les stems conservés
+        
+        Args:
+            counts: Occurrences (matrice creuse stems x catégories)
+            document_frequencies: Documents contenant chaque stem (matrice
+                                  creuse stems x catégories, None si inutile)
+            category_documents: Nombre de documents par catégorie
+            
+        Returns:
+            Masque booléen des stems conservés
+        """
+        n_features = counts.shape[0]
+        n_documents = int(category_documents.sum())
+        keep = _row_sums(counts, n_features) >= self.min_count
+        
+        if self.needs_document_frequencies:
+            df = _row_sums(document_frequencies, n_features)
+            keep &= df >= self.min_df
+            keep &= df <= self.max_df * n_documents
+            
+            if self.top_n is not None and np.count_nonzero(keep) > self.top_n:
+                # Seuil: gain du top_n-ième stem. Les stems à égalité sont tous gardés,
+                # pour que la sélection ne dépende pas de l'ordre des stems
+                gains = np.where(keep, information_gain(document_frequencies, category_documents), -np.inf)
+                threshold = -np.partition(-gains, self.top_n - 1)[self.top_n - 1]
+                keep &= gains >= threshold - GAIN_TOLERANCE
+        
+        if not keep.any():
+            raise ValueError("Vocabulary pruning removed every feature")
+        
+        return keep
+
+
+def information_gain(document_frequencies, category_documents: np.ndarray) -> np.ndarray:
+    """
+    Gain d'information de la présence de chaque stem sur la catégorie
+    
+    IG(t) = H(C) - P(t) H(C|t) - P(non t) H(C|non t), calculé sur les seules
+    cellules non nulles: avec f(x) = x log x et A(t, c) le nombre de
+    documents de c contenant t, N(t) = somme des A(t, c),
+    N * (H(C) - IG(t)) = f(N(t)) - somme f(A(t, c))
+                         + f(N - N(t)) - somme f(N(c) - A(t, c)).
+    
+    Args:
+        document_frequencies: Documents contenant chaque stem (stems x catégories)
+        category_documents: Nombre de documents par catégorie
+        
+    Returns:
+        Gain d'information par stem (en nats)
+    """
+    coo = document_frequencies.tocoo()
+    n_features = coo.shape[0]
+    category_documents = np.asarray(category_documents, dtype=float)
+    n_documents = category_documents.sum()
+    
+    df = coo.data.astype(float)
+    n_category = category_documents[coo.col]
+    
+    # Somme sur les catégories de f(N(c) - A(t, c)): f(N(c)) partout, corrigée là où A > 0
+    absent_sum = (_xlogx(category_documents).sum()
+                  + np.bincount(coo.row, weights=_xlogx(n_category - df) - _xlogx(n_category),
+                                minlength=n_features))
+    present_sum = np.bincount(coo.row, weights=_xlogx(df), minlength=n_features)
+    n_present = np.bincount(coo.row, weights=df, minlength=n_features)
+    
+    prior_entropy = _xlogx(n_documents) - _xlogx(category_documents).sum()
+    conditional_entropy = (_xlogx(n_present) - present_sum
+                           + _xlogx(n_documents - n_present) - absent_sum)
+    
+    return (prior_entropy - conditional_entropy) / n_documents
+
+
+def _xlogx(x) -> np.ndarray:
+    """x log x, avec 0 log 0 = 0"""
+    x = np.asarray(x, dtype=float)
+    return x * np.log(np.where(x > 0, x, 1.0))
+
+
+def _row_sums(matrix, n_rows: int) -> np.ndarray:
+    """Somme des lignes d'une matrice creuse, quel que soit son format"""
+    coo = matrix.tocoo()
+    return np.bincount(coo.row, weights=coo.data, minlength=n_rows)
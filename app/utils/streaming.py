@@ -0,0 +1,89 @@
+"""
+Lecture incrémentale de flux de documents délimités par des sauts de ligne
+"""
+import codecs
+from typing import BinaryIO, Iterator, List, Optional
+
+
+class LineDecoder:
+    """
+    Découpage en lignes d'un flux UTF-8 reçu par blocs
+    
+    Seuls le décodeur et la ligne en cours sont gardés en mémoire, quelle
+    que soit la taille totale du flux. Sert au serveur WSGI (iter_lines) et
+    au serveur ASGI, dont les blocs arrivent par messages.
+    """
+    
+    def __init__(self, max_line_length: Optional[int] = None):
+        self.max_line_length = max_line_length
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._buffer = ''
+        self._overflow = False
+    
+    def feed(self, chunk: bytes, final: bool = False) -> List[Optional[str]]:
+        """
+        Ajouter un bloc
+        
+        Args:
+            chunk: Octets reçus
+            final: Dernier bloc du flux
+            
+        Returns:
+            Les lignes complètes sans leur saut de ligne, None pour une ligne
+            qui dépasse max_line_length
+        """
+        max_line_length = self.max_line_length
+        buffer = self._buffer + self._decoder.decode(chunk, final=final)
+        
+        *lines, buffer = buffer.split('\n')
+        complete = []
+        for line in lines:
+            if self._overflow:
+                # Fin d'une ligne trop longue déjà signalée
+                self._overflow = False
+                continue
+            if max_line_length is not None and len(line) > max_line_length:
+                complete.append(None)
+                continue
+            complete.append(line.rstrip('\r'))
+        
+        if max_line_length is not None and len(buffer) > max_line_length:
+            # Ligne trop longue: la signaler et ignorer la suite jusqu'au saut de ligne
+            if not self._overflow:
+                complete.append(None)
+                self._overflow = True
+            buffer = ''
+        
+        if final:
+            if buffer and not self._overflow:
+                complete.append(buffer.rstrip('\r'))
+            buffer = ''
+        
+        self._buffer = buffer
+        return complete
+
+
+def iter_lines(stream: BinaryIO, chunk_size: int = 64 * 1024,
+               max_line_length: Optional[int] = None) -> Iterator[Optional[str]]:
+    """
+    Lire un flux binaire ligne par ligne en décodant l'UTF-8 au fil de l'eau
+    
+    Seuls un bloc et la ligne en cours sont gardés en mémoire, quelle que
+    soit la taille totale du flux.
+    
+    Args:
+        stream: Flux binaire (ex: corps de la requête)
+        chunk_size: Taille des blocs lus
+        max_line_length: Longueur max d'une ligne (None = illimitée)
+        
+    Yields:
+        Chaque ligne sans son saut de ligne, ou None si elle dépasse max_line_length
+    """
+    decoder = LineDecoder(max_line_length)
+    
+    while True:
+        chunk = stream.read(chunk_size)
+        yield from decoder.feed(chunk, final=not chunk)
+        
+        if not chunk:
+            break
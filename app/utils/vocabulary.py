@@ -0,0 +1,295 @@
+"""
+Vocabulaire stem -> identifiant stocké dans des tableaux NumPy
+"""
+import os
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+
+class Vocabulary:
+    """
+    Vocabulaire immuable et interné stem -> identifiant (int32)
+    
+    Les stems sont encodés en UTF-8 (2 octets par lettre arabe) et gardés
+    triés dans un seul tampon contigu (leurs positions dans un tableau
+    d'offsets), avec l'identifiant de chacun. La recherche se fait par
+    dichotomie (np.searchsorted) sur une clé de largeur fixe, les
+    KEY_BYTES premiers octets de chaque stem: un stem n'occupe que sa
+    propre longueur, et une requête jamais plus de KEY_BYTES octets, quelle
+    que soit la longueur du plus long stem. Seuls les stems plus longs que
+    la clé, rares, sont départagés dans le tampon.
+    
+    Contrairement à un dict de millions de str et d'int, ces tampons ne
+    contiennent aucun objet Python: ils coûtent quelques dizaines d'octets
+    par stem, se sérialisent tels quels, et après un fork les recherches ne
+    modifient aucun compteur de références: les pages restent partagées
+    entre les workers.
+    """
+    
+    # Vocabulaire exact (pas de hachage)
+    hash_bits = None
+    
+    # Largeur des clés de recherche (8 lettres arabes: la plupart des stems y tiennent entiers)
+    KEY_BYTES = 16
+    
+    def __init__(self, keys: np.ndarray, blob: np.ndarray, offsets: np.ndarray, ids: np.ndarray):
+        """
+        Args:
+            keys: Préfixes (KEY_BYTES octets) des stems, dans l'ordre trié
+            blob: Stems encodés bout à bout (uint8), dans l'ordre trié
+            offsets: Début de chaque stem dans blob (len(ids) + 1 valeurs)
+            ids: Identifiant de chaque stem, dans l'ordre trié
+        """
+        self._keys = keys
+        self._blob = blob
+        self._offsets = offsets
+        self._ids = ids
+        for array in (keys, blob, offsets, ids):
+            array.setflags(write=False)
+    
+    @classmethod
+    def from_stems(cls, stems: List[str]) -> 'Vocabulary':
+        """
+        Construire un vocabulaire
+        
+        Args:
+            stems: Stems distincts, dans l'ordre de leurs identifiants
+            
+        Returns:
+            Vocabulary où stems[i] a l'identifiant i
+        """
+        encoded = [stem.encode('utf-8') for stem in stems]
+        order = np.array(sorted(range(len(encoded)), key=encoded.__getitem__), dtype=np.int64)
+        return cls._from_encoded([encoded[i] for i in order], order.astype(np.int32))
+    
+    @classmethod
+    def _from_encoded(cls, encoded: List[bytes], ids: np.ndarray) -> 'Vocabulary':
+        """Vocabulaire de stems encodés déjà triés"""
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        blob = np.frombuffer(b''.join(encoded), dtype=np.uint8).copy()
+        return cls(_keys(encoded), blob, offsets, ids)
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def __contains__(self, stem: str) -> bool:
+        return self.lookup([stem])[0] >= 0
+    
+    def lookup(self, stems: List[str]) -> np.ndarray:
+        """
+        Convertir des stems en identifiants
+        
+        Args:
+            stems: Stems à rechercher
+            
+        Returns:
+            Identifiants (int64), -1 pour les stems inconnus
+        """
+        if not len(stems) or not len(self._ids):
+            return np.full(len(stems), -1, dtype=np.int64)
+        
+        positions, found = self._search([stem.encode('utf-8') for stem in stems])
+        positions = np.minimum(positions, len(self._ids) - 1)
+        
+        return np.where(found, self._ids[positions], -1).astype(np.int64)
+    
+    def _search(self, encoded: List[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rang (dans l'ordre trié) de stems encodés
+        
+        Returns:
+            (rang d'insertion de chaque stem, le stem est-il présent?)
+        """
+        keys = _keys(encoded)
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        positions = np.searchsorted(self._keys, keys)
+        
+        # Les stems de même clé commencent tous par elle: un stem court (entier
+        # dans sa clé) est le premier d'entre eux, et présent si sa longueur est la même
+        clipped = np.minimum(positions, len(self._ids) - 1)
+        same_key = (positions < len(self._ids)) & (self._keys[clipped] == keys)
+        found = same_key & (self._offsets[clipped + 1] - self._offsets[clipped] == lengths)
+        
+        # Un stem long n'est départagé que parmi les stems de même clé
+        long = np.flatnonzero(same_key & (lengths > self.KEY_BYTES))
+        if len(long):
+            ends = np.searchsorted(self._keys, keys[long], side='right')
+            for i, end in zip(long.tolist(), ends.tolist()):
+                positions[i] = self._bisect(encoded[i], int(positions[i]), end)
+                found[i] = positions[i] < end and self._stem(positions[i]) == encoded[i]
+        
+        return positions, found
+    
+    def _bisect(self, stem: bytes, low: int, high: int) -> int:
+        """Rang d'insertion d'un stem encodé entre les rangs low et high"""
+        while low < high:
+            middle = (low + high) // 2
+            if self._stem(middle) < stem:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+    
+    def _stem(self, position: int) -> bytes:
+        """Stem encodé au rang donné de l'ordre trié"""
+        return self._blob[self._offsets[position]:self._offsets[position + 1]].tobytes()
+    
+    def extend(self, stems: Iterable[str]) -> 'Vocabulary':
+        """
+        Ajouter des stems (le vocabulaire courant n'est pas modifié)
+        
+        Args:
+            stems: Nouveaux stems, absents du vocabulaire, dans l'ordre des
+                   identifiants à leur attribuer (à partir de len(self))
+                   
+        Returns:
+            Nouveau Vocabulary
+        """
+        encoded = [stem.encode('utf-8') for stem in stems]
+        if not encoded:
+            return self
+        
+        new_ids = np.arange(len(self), len(self) + len(encoded), dtype=np.int32)
+        order = sorted(range(len(encoded)), key=encoded.__getitem__)
+        encoded, new_ids = [encoded[i] for i in order], new_ids[order]
+        new = Vocabulary._from_encoded(encoded, new_ids)
+        if not len(self._ids):
+            return new
+        
+        # Fusion des deux ordres triés en O(V): rang de chaque stem dans le tampon fusionné
+        positions = self._search(encoded)[0]
+        new_ranks = positions + np.arange(len(encoded))
+        old_ranks = np.arange(len(self._ids)) + np.searchsorted(positions, np.arange(len(self._ids)), side='right')
+        
+        # Stems de chaque rang, dans le tampon des anciens suivi du tampon des nouveaux
+        starts = np.empty(len(self._ids) + len(encoded), dtype=np.int64)
+        lengths = np.empty_like(starts)
+        starts[old_ranks], lengths[old_ranks] = self._offsets[:-1], np.diff(self._offsets)
+        starts[new_ranks], lengths[new_ranks] = new._offsets[:-1] + len(self._blob), np.diff(new._offsets)
+        blob, offsets = _gather(np.concatenate([self._blob, new._blob]), starts, lengths)
+        
+        keys = np.empty(len(starts), dtype=self._keys.dtype)
+        keys[old_ranks], keys[new_ranks] = self._keys, new._keys
+        ids = np.empty(len(starts), dtype=np.int32)
+        ids[old_ranks], ids[new_ranks] = self._ids, new._ids
+        
+        return Vocabulary(keys, blob, offsets, ids)
+    
+    def select(self, keep: np.ndarray) -> 'Vocabulary':
+        """
+        Ne garder qu'une partie des stems (le vocabulaire courant n'est pas modifié)
+        
+        Args:
+            keep: Masque booléen indexé par identifiant
+            
+        Returns:
+            Nouveau Vocabulary, identifiants renumérotés dans le même ordre
+        """
+        new_ids = (np.cumsum(keep) - 1).astype(np.int32)
+        kept = np.flatnonzero(keep[self._ids])
+        blob, offsets = _gather(self._blob, self._offsets[kept], np.diff(self._offsets)[kept])
+        return Vocabulary(self._keys[kept], blob, offsets, new_ids[self._ids[kept]])
+    
+    def stems(self) -> List[str]:
+        """Stems dans l'ordre de leurs identifiants"""
+        positions = np.empty_like(self._ids)
+        positions[self._ids] = np.arange(len(self._ids), dtype=self._ids.dtype)
+        
+        blob, offsets = self._blob.tobytes(), self._offsets.tolist()
+        return [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in positions.tolist()]
+    
+    def save(self, directory: str):
+        """Enregistrer les tableaux du vocabulaire dans un dossier"""
+        for name, array in self._arrays().items():
+            np.save(os.path.join(directory, f'{name}.npy'), array)
+    
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = 'r') -> 'Vocabulary':
+        """Charger un vocabulaire enregistré par save() (projeté en mémoire par défaut)"""
+        def load_array(name: str) -> np.ndarray:
+            return np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode)
+        
+        return cls(load_array('vocabulary_keys'), load_array('vocabulary_blob'),
+                   load_array('vocabulary_offsets'), load_array('vocabulary_ids'))
+    
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        return {'vocabulary_keys': self._keys, 'vocabulary_blob': self._blob,
+                'vocabulary_offsets': self._offsets, 'vocabulary_ids': self._ids}
+    
+    @property
+    def nbytes(self) -> int:
+        """Taille des tampons en octets"""
+        return sum(array.nbytes for array in self._arrays().values())
+
+
+class HashedVocabulary:
+    """
+    Vocabulaire de taille fixe par hachage des stems (hashing trick)
+    
+    Chaque stem est projeté sur l'une des 2^bits caractéristiques par un
+    hachage stable entre processus (CRC32 de son encodage UTF-8). Aucun stem
+    n'est stocké: la mémoire ne dépend plus de la taille du corpus, au prix
+    de collisions (des stems distincts partagent une caractéristique).
+    """
+    
+    # 2^24 caractéristiques: la matrice creuse garde un pointeur (indptr) par
+    # caractéristique, soit 64 Mo à 24 bits
+    MAX_BITS = 24
+    
+    def __init__(self, bits: int):
+        if not 1 <= bits <= self.MAX_BITS:
+            raise ValueError(f"Hash bits must be between 1 and {self.MAX_BITS}")
+        self.hash_bits = bits
+        self._mask = (1 << bits) - 1
+    
+    def __len__(self) -> int:
+        return 1 << self.hash_bits
+    
+    def __contains__(self, stem: str) -> bool:
+        return True
+    
+    def lookup(self, stems: List[str]) -> np.ndarray:
+        """
+        Convertir des stems en identifiants de caractéristiques
+        
+        Args:
+            stems: Stems à convertir
+            
+        Returns:
+            Identifiants (int64), tous dans [0, 2^bits)
+        """
+        hashes = np.fromiter((zlib.crc32(stem.encode('utf-8')) for stem in stems),
+                             dtype=np.int64, count=len(stems))
+        return hashes & self._mask
+    
+    def extend(self, stems: Iterable[str]) -> 'HashedVocabulary':
+        """Tous les stems ont déjà une caractéristique: rien à ajouter"""
+        return self
+    
+    def select(self, keep: np.ndarray) -> 'HashedVocabulary':
+        """Les identifiants sont fixés par le hachage: les caractéristiques retirées restent vides"""
+        return self
+    
+    def save(self, directory: str):
+        """Rien à enregistrer: le nombre de bits (dans les métadonnées du modèle) suffit"""
+    
+    @property
+    def nbytes(self) -> int:
+        return 0
+
+
+def _keys(encoded: List[bytes]) -> np.ndarray:
+    """Clés de recherche (KEY_BYTES premiers octets) de stems encodés en UTF-8"""
+    width = Vocabulary.KEY_BYTES
+    return np.array([stem[:width] for stem in encoded], dtype=f'S{width}')
+
+
+def _gather(blob: np.ndarray, starts: np.ndarray, lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Copier bout à bout des tranches d'un tampon (nouveau tampon, offsets)"""
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    
+    # Position de chaque octet: début de sa tranche + rang dans la tranche
+    positions = np.arange(offsets[-1]) + np.repeat(starts - offsets[:-1], lengths)
+    return blob[positions], offsets
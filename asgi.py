@@ -0,0 +1,10 @@
+"""
+Point d'entrée ASGI de l'API JSON (lectures et écritures non bloquantes)
+
+    uvicorn asgi:app --workers 4
+"""
+from app.asgi import create_asgi_app
+import os
+
+# Créer l'application (services construits et dernier modèle chargé)
+app = create_asgi_app(os.getenv('FLASK_CONFIG') or 'default')
@@ -0,0 +1,135 @@
+"""
+Benchmark du regroupement en lots des classifications concurrentes
+
+Des threads classifient chacun une part des textes, un par un, d'abord
+directement (classify), puis à travers le RequestCoalescer pour chaque
+fenêtre demandée; le débit est comparé à celui de classify_many (lots
+complets, la borne visée). Le corpus est celui de synthetic_corpus.py.
+
+Usage:
+    python benchmarks/coalescing.py [--threads 32] [--window 0.001 0.002 0.005] [--max-batch-size 64]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Callable, List
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from app import create_app
+from app.services.coalescer import RequestCoalescer
+from app.services.naive_bayes import NaiveBayesClassifier
+from app.services.stop_words import StopWordsService
+from app.services.text_preprocessing import TextPreprocessingService
+from synthetic_corpus import add_spec_arguments, generate_documents, spec_from_arguments
+
+
+def run_threads(classify: Callable[[str], object], texts: List[str], threads: int, repeat: int) -> dict:
+    """
+    Classifier les textes avec `threads` threads concurrents
+    
+    Args:
+        classify: Fonction de classification d'un texte
+        texts: Textes (le thread k traite les textes k, k + threads, ...)
+        threads: Nombre de threads
+        repeat: Nombre d'exécutions (la plus rapide est gardée)
+        
+    Returns:
+        Débit (textes/s) et latences p50/p99 (ms) de la meilleure exécution
+    """
+    runs = [_run_threads_once(classify, texts, threads) for _ in range(repeat)]
+    return max(runs, key=lambda run: run['throughput'])
+
+
+def _run_threads_once(classify: Callable[[str], object], texts: List[str], threads: int) -> dict:
+    """Une exécution de run_threads"""
+    latencies = [[] for _ in range(threads)]
+    
+    def worker(index: int):
+        for text in texts[index::threads]:
+            start = time.perf_counter()
+            classify(text)
+            latencies[index].append(time.perf_counter() - start)
+    
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    seconds = time.perf_counter() - start
+    
+    p50, p99 = np.percentile(np.concatenate(latencies) * 1000, [50, 99])
+    return {'throughput': len(texts) / seconds, 'p50_ms': p50, 'p99_ms': p99}
+
+
+def main(argv: List[str] = None) -> int:
+    app = create_app('default', preload=False)
+    logging.getLogger('app').setLevel(logging.WARNING)
+    
+    parser = argparse.ArgumentParser(description='Micro-batching coalescer throughput')
+    add_spec_arguments(parser)
+    parser.add_argument('--threads', type=int, default=32, help='Concurrent callers')
+    parser.add_argument('--window', type=float, nargs='*', default=[0.001, 0.002, 0.005],
+                        help='Coalescing windows to compare (seconds)')
+    parser.add_argument('--max-batch-size', type=int, default=app.config['COALESCE_MAX_BATCH_SIZE'],
+                        help='Maximum coalesced batch size')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per mode (best is kept)')
+    parser.add_argument('--json', help='Write the results to this file')
+    args = parser.parse_args(argv)
+    
+    with app.app_context():
+        stop_words = StopWordsService()
+    
+    documents = generate_documents(spec_from_arguments(args), stop_words.stop_words)
+    texts = [document.content for document in documents]
+    
+    classifier = NaiveBayesClassifier(TextPreprocessingService(stop_words,
+                                                               cache_size=app.config['STEM_CACHE_SIZE']))
+    classifier.train(documents)
+    classifier.classify_many(texts)  # Cache de stems chaud pour toutes les mesures
+    
+    print(f"📊 {len(texts)} texts, {args.threads} threads")
+    results = []
+    
+    durations = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        for i in range(0, len(texts), args.max_batch_size):
+            classifier.classify_many(texts[i:i + args.max_batch_size])
+        durations.append(time.perf_counter() - start)
+    results.append({'mode': 'classify_many', 'throughput': len(texts) / min(durations),
+                    'p50_ms': None, 'p99_ms': None, 'mean_batch_size': args.max_batch_size})
+    
+    results.append({'mode': 'direct', **run_threads(classifier.classify, texts, args.threads, args.repeat),
+                    'mean_batch_size': 1})
+    
+    for window in args.window:
+        coalescer = RequestCoalescer(classifier, window=window, max_batch_size=args.max_batch_size)
+        result = run_threads(coalescer.classify, texts, args.threads, args.repeat)
+        results.append({'mode': f'window={window * 1000:g}ms', **result,
+                        'mean_batch_size': coalescer.get_stats()['mean_batch_size']})
+    
+    print(f"{'mode':<16}{'texts/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'batch':>8}")
+    for result in results:
+        p50 = f"{result['p50_ms']:.2f}" if result['p50_ms'] is not None else '-'
+        p99 = f"{result['p99_ms']:.2f}" if result['p99_ms'] is not None else '-'
+        print(f"{result['mode']:<16}{result['throughput']:>10.0f}{p50:>9}{p99:>9}"
+              f"{result['mean_batch_size']:>8.1f}")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Benchmark du mode hachage (hashing trick) contre le vocabulaire exact
+
+Entraîne le classificateur sur le même découpage train/test du corpus, en
+vocabulaire exact puis pour chaque nombre de bits demandé, et compare la
+précision, la mémoire du modèle et le pic mémoire de l'entraînement.
+
+Usage:
+    python benchmarks/feature_hashing.py [--training-dir data/training] [--bits 16 18 20]
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from app import create_app
+from app.models import TrainingDocument
+from app.services.corpus_loader import CorpusLoader
+from app.services.naive_bayes import NaiveBayesClassifier
+from app.services.stop_words import StopWordsService
+from app.services.text_preprocessing import TextPreprocessingService
+from app.utils.metrics import MetricsCalculator
+
+
+def run_mode(preprocessing: TextPreprocessingService, hash_bits: Optional[int],
+             train_docs: List[TrainingDocument], test_docs: List[TrainingDocument]) -> dict:
+    """
+    Entraîner et évaluer un mode
+    
+    Args:
+        preprocessing: Service de prétraitement (partagé: même cache de stems)
+        hash_bits: Bits du hachage (None = vocabulaire exact)
+        train_docs: Documents d'entraînement
+        test_docs: Documents de test
+        
+    Returns:
+        Mesures du mode
+    """
+    classifier = NaiveBayesClassifier(preprocessing, hash_bits=hash_bits)
+    
+    tracemalloc.start()
+    start = time.perf_counter()
+    classifier.train(train_docs)
+    train_seconds = time.perf_counter() - start
+    _, train_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    metrics = MetricsCalculator.evaluate(classifier, test_docs)
+    
+    stats = classifier.get_stats()
+    
+    return {
+        'mode': f'hash {hash_bits} bits' if hash_bits else 'exact',
+        'hash_bits': hash_bits,
+        'features': stats['vocabulary_size'],
+        'model_bytes': stats['model_bytes'],
+        'train_peak_bytes': train_peak,
+        'train_seconds': train_seconds,
+        'accuracy': metrics.accuracy,
+        'macro_f1': metrics.macro_avg['f1_score']
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    app = create_app('default', preload=False)
+    logging.getLogger('app').setLevel(logging.WARNING)
+    
+    parser = argparse.ArgumentParser(description='Feature hashing vs exact vocabulary')
+    parser.add_argument('--training-dir', default=app.config['TRAINING_DIR'], help='Corpus directory')
+    parser.add_argument('--bits', type=int, nargs='+', default=[16, 18, 20], help='Hash sizes to compare')
+    parser.add_argument('--test-size', type=float, default=app.config['TEST_SIZE'], help='Test fraction')
+    parser.add_argument('--seed', type=int, default=app.config['RANDOM_STATE'], help='Split seed')
+    parser.add_argument('--json', help='Write the results to this file')
+    args = parser.parse_args(argv)
+    
+    with app.app_context():
+        loader = CorpusLoader(args.training_dir, app.config['CORPUS_MANIFEST_FILE'],
+                              read_workers=app.config['CORPUS_READ_WORKERS'])
+        documents = list(loader.iter_documents(loader.scan()))
+        
+        test_size = int(len(documents) * args.test_size)
+        if not documents or test_size == 0:
+            print(f"❌ Not enough documents in {args.training_dir}")
+            return 1
+        
+        random.Random(args.seed).shuffle(documents)
+        train_docs, test_docs = documents[:-test_size], documents[-test_size:]
+        
+        preprocessing = TextPreprocessingService(StopWordsService(),
+                                                 cache_size=app.config['STEM_CACHE_SIZE'])
+        
+        print(f"📊 {len(train_docs)} training / {len(test_docs)} test documents")
+        results = [run_mode(preprocessing, hash_bits, train_docs, test_docs)
+                   for hash_bits in [None] + args.bits]
+    
+    exact = results[0]
+    print(f"{'mode':<16}{'features':>10}{'model MB':>11}{'train peak MB':>15}"
+          f"{'train s':>9}{'accuracy':>10}{'Δ acc':>8}{'macro F1':>10}")
+    for result in results:
+        print(f"{result['mode']:<16}{result['features']:>10}"
+              f"{result['model_bytes'] / 2 ** 20:>11.1f}{result['train_peak_bytes'] / 2 ** 20:>15.1f}"
+              f"{result['train_seconds']:>9.2f}{result['accuracy']:>10.2%}"
+              f"{(result['accuracy'] - exact['accuracy']) * 100:>+8.2f}{result['macro_f1']:>10.4f}")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Benchmark du classificateur hiérarchique sur une grande taxonomie
+
+Les catégories du corpus synthétique (synthetic_corpus.py) sont regroupées
+en branches (group_XX/category_YY), puis le classificateur à plat et le
+classificateur hiérarchique, pour chaque largeur de faisceau, sont
+comparés: précision sur un découpage train/test, et latence de scoring
+d'un texte (prétraitement exclu, identique pour tous; chaque texte garde
+son meilleur temps sur les répétitions).
+
+Usage:
+    python benchmarks/hierarchy.py [--categories 256] [--groups 16] [--beam-width 1 2 4]
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+from typing import Callable, List
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from app import create_app
+from app.models import TrainingDocument
+from app.services.hierarchical import HierarchicalClassifier
+from app.services.naive_bayes import NaiveBayesClassifier
+from app.services.stop_words import StopWordsService
+from app.services.text_preprocessing import TextPreprocessingService
+from synthetic_corpus import add_spec_arguments, generate_documents, spec_from_arguments
+
+
+def group_documents(documents: List[TrainingDocument], groups: int) -> List[TrainingDocument]:
+    """Ranger les catégories (category_YY) dans `groups` branches (group_XX/category_YY)"""
+    categories = sorted({document.category for document in documents})
+    per_group = -(-len(categories) // groups)
+    paths = {category: f'group_{i // per_group:02d}/{category}' for i, category in enumerate(categories)}
+    
+    return [TrainingDocument(content=document.content, category=paths[document.category])
+            for document in documents]
+
+
+def latency_us(classify: Callable[[List[str]], object], stems_list: List[List[str]], repeat: int) -> float:
+    """Moyenne (µs) du meilleur temps de classification de chaque texte"""
+    best = [float('inf')] * len(stems_list)
+    for _ in range(repeat):
+        for i, stems in enumerate(stems_list):
+            start = time.perf_counter()
+            classify(stems)
+            best[i] = min(best[i], time.perf_counter() - start)
+    
+    return sum(best) / len(best) * 1e6
+
+
+def main(argv: List[str] = None) -> int:
+    app = create_app('default', preload=False)
+    logging.getLogger('app').setLevel(logging.WARNING)
+    
+    parser = argparse.ArgumentParser(description='Hierarchical versus flat classification on a large taxonomy')
+    add_spec_arguments(parser)
+    parser.add_argument('--groups', type=int, default=16, help='Branches under the root')
+    parser.add_argument('--beam-width', type=int, nargs='*', default=[1, 2, 4], help='Beam widths to compare')
+    parser.add_argument('--texts', type=int, default=200, help='Texts timed per mode')
+    parser.add_argument('--repeat', type=int, default=5, help='Passes per mode (best time per text is kept)')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.set_defaults(categories=256, documents=20)
+    args = parser.parse_args(argv)
+    
+    with app.app_context():
+        stop_words = StopWordsService()
+    preprocessing = TextPreprocessingService(stop_words, cache_size=app.config['STEM_CACHE_SIZE'])
+    
+    documents = group_documents(generate_documents(spec_from_arguments(args), stop_words.stop_words),
+                                args.groups)
+    random.Random(args.seed).shuffle(documents)
+    test_size = int(len(documents) * app.config['TEST_SIZE'])
+    train_docs, test_docs = documents[:-test_size], documents[-test_size:]
+    
+    stems_list = [preprocessing.preprocess(document.content) for document in test_docs]
+    labels = [document.category for document in test_docs]
+    timed = stems_list[:args.texts]
+    
+    flat = NaiveBayesClassifier(preprocessing)
+    flat.train(train_docs)
+    
+    modes = [('flat', flat)]
+    for beam_width in args.beam_width:
+        hierarchical = HierarchicalClassifier(NaiveBayesClassifier(preprocessing), beam_width=beam_width)
+        hierarchical.train(train_docs)
+        modes.append((f'beam={beam_width}', hierarchical))
+    
+    print(f"📊 {len(flat.get_stats()['categories'])} categories in {args.groups} groups, "
+          f"{len(train_docs)} training / {len(test_docs)} test documents")
+    
+    results = []
+    for name, classifier in modes:
+        categories, predictions = classifier.predict_many(stems_list)
+        accuracy = float(np.mean([categories[prediction] == label
+                                  for prediction, label in zip(predictions, labels)]))
+        latency = latency_us(lambda stems: classifier.classify_stems(stems, 1), timed, args.repeat)
+        results.append({'mode': name, 'accuracy': accuracy, 'latency_us': latency})
+    
+    print(f"{'mode':<10}{'accuracy':>10}{'µs/text':>10}{'speedup':>9}")
+    for result in results:
+        print(f"{result['mode']:<10}{result['accuracy']:>10.3f}{result['latency_us']:>10.0f}"
+              f"{results[0]['latency_us'] / result['latency_us']:>8.1f}x")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
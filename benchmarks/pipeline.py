@@ -0,0 +1,340 @@
+"""
+Benchmark de débit et de latence du pipeline complet
+
+Génère un corpus synthétique reproductible (benchmarks/synthetic_corpus.py)
+et mesure: débit du tokenizer, du stemmer et du prétraitement (MB/s),
+entraînement (documents/s), latence de classification (p50/p99), débit par
+lots, pic mémoire de l'entraînement, et débit HTTP de bout en bout via le
+client de test Flask. Les résultats sont écrits en JSON et peuvent être
+comparés à une référence: le script échoue si une mesure régresse au-delà
+de la tolérance.
+
+Usage:
+    python benchmarks/pipeline.py [--documents 250] [--repeat 3] [--output results.json]
+    python benchmarks/pipeline.py --baseline benchmarks/baseline.json [--tolerance 0.2]
+    python benchmarks/pipeline.py --save-baseline benchmarks/baseline.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from app import create_app, routes
+from app.models import TrainingDocument
+from app.services.naive_bayes import NaiveBayesClassifier
+from app.services.stop_words import StopWordsService
+from app.services.text_preprocessing import TextPreprocessingService
+from synthetic_corpus import add_spec_arguments, generate_documents, spec_from_arguments
+
+# Unités des mesures à maximiser (les autres, latences et mémoire, sont à minimiser)
+HIGHER_IS_BETTER = {'MB/s', 'docs/s', 'req/s', 'ratio'}
+
+
+class Results:
+    """Mesures du benchmark: valeur, unité et sens d'amélioration"""
+    
+    def __init__(self):
+        self.metrics: Dict[str, dict] = {}
+    
+    def add(self, name: str, value: float, unit: str):
+        better = 'higher' if unit in HIGHER_IS_BETTER else 'lower'
+        self.metrics[name] = {'value': round(float(value), 6), 'unit': unit, 'better': better}
+        print(f"   {name:<28}{value:>12.3f} {unit}")
+
+
+def best_of(repeat: int, function: Callable[[], None]) -> float:
+    """Meilleure durée (secondes) de `repeat` exécutions"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def percentiles_ms(durations: List[float]) -> Dict[str, float]:
+    """p50 et p99 d'une liste de durées (secondes), en millisecondes"""
+    p50, p99 = np.percentile(np.asarray(durations) * 1000, [50, 99])
+    return {'p50': p50, 'p99': p99}
+
+
+def bench_preprocessing(results: Results, app, documents: List[TrainingDocument], repeat: int):
+    """Débit du tokenizer, du stemmer (cache vide puis chaud) et du prétraitement complet"""
+    texts = [document.content for document in documents]
+    megabytes = sum(len(text.encode('utf-8')) for text in texts) / 2 ** 20
+    
+    with app.app_context():
+        stop_words = StopWordsService()
+    
+    def fresh_service() -> TextPreprocessingService:
+        return TextPreprocessingService(stop_words, cache_size=app.config['STEM_CACHE_SIZE'])
+    
+    preprocessing = fresh_service()
+    tokens = [preprocessing.tokenize(text) for text in texts]
+    
+    seconds = best_of(repeat, lambda: [preprocessing.tokenize(text) for text in texts])
+    results.add('tokenize_throughput', megabytes / seconds, 'MB/s')
+    
+    # Cache vide: un nouveau service à chaque exécution
+    durations = []
+    for _ in range(repeat):
+        cold = fresh_service()
+        start = time.perf_counter()
+        for document_tokens in tokens:
+            cold.stem(document_tokens)
+        durations.append(time.perf_counter() - start)
+    results.add('stem_cold_throughput', megabytes / min(durations), 'MB/s')
+    
+    seconds = best_of(repeat, lambda: [cold.stem(document_tokens) for document_tokens in tokens])
+    results.add('stem_warm_throughput', megabytes / seconds, 'MB/s')
+    
+    seconds = best_of(repeat, lambda: [cold.preprocess(text) for text in texts])
+    results.add('preprocess_throughput', megabytes / seconds, 'MB/s')
+
+
+def bench_model(results: Results, app, train_docs: List[TrainingDocument],
+                test_docs: List[TrainingDocument], repeat: int, batch_size: int):
+    """Entraînement, latence de classification, débit par lots et pic mémoire"""
+    with app.app_context():
+        stop_words = StopWordsService()
+    preprocessing = TextPreprocessingService(stop_words, cache_size=app.config['STEM_CACHE_SIZE'])
+    classifier = NaiveBayesClassifier(preprocessing)
+    
+    # Meilleure exécution: cache de stems chaud après la première
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        classifier.train(train_docs)
+        durations.append(time.perf_counter() - start)
+    results.add('train_throughput', len(train_docs) / min(durations), 'docs/s')
+    
+    texts = [document.content for document in test_docs]
+    classifier.classify_many(texts)  # Préchauffage
+    
+    durations = []
+    for _ in range(repeat):
+        for text in texts:
+            start = time.perf_counter()
+            classifier.classify(text)
+            durations.append(time.perf_counter() - start)
+    latency = percentiles_ms(durations)
+    results.add('classify_latency_p50', latency['p50'], 'ms')
+    results.add('classify_latency_p99', latency['p99'], 'ms')
+    
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    seconds = best_of(repeat, lambda: [classifier.classify_many(batch) for batch in batches])
+    results.add('batch_throughput', len(texts) / seconds, 'docs/s')
+    
+    predictions = [result.predicted_category for result in classifier.classify_many(texts)]
+    accuracy = np.mean([prediction == document.category for prediction, document in zip(predictions, test_docs)])
+    results.add('accuracy', accuracy, 'ratio')
+    
+    # Pic mémoire mesuré à part (tracemalloc ralentit l'entraînement)
+    memory_classifier = NaiveBayesClassifier(TextPreprocessingService(stop_words))
+    tracemalloc.start()
+    memory_classifier.train(train_docs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results.add('train_peak_memory', peak / 2 ** 20, 'MB')
+    results.add('model_memory', classifier.get_stats()['model_bytes'] / 2 ** 20, 'MB')
+
+
+def bench_http(results: Results, app, train_docs: List[TrainingDocument],
+               test_docs: List[TrainingDocument], repeat: int, batch_size: int):
+    """Débit de bout en bout de /api/classify et /api/classify/batch (client de test Flask)"""
+    client = app.test_client()
+    
+    with app.app_context():
+        _, _, classifier = routes.get_services()
+        classifier.train(train_docs)
+        cache = routes.get_result_cache()
+    
+    texts = [document.content for document in test_docs]
+    
+    def post(path: str, payload: dict):
+        response = client.post(path, json=payload)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}: {response.get_data(as_text=True)}")
+    
+    post('/api/classify', {'text': texts[0]})  # Préchauffage
+    
+    durations = []
+    total_seconds = []
+    for _ in range(repeat):
+        # Textes distincts et cache vidé: chaque requête classifie réellement
+        cache.cache.clear()
+        start_all = time.perf_counter()
+        for text in texts:
+            start = time.perf_counter()
+            post('/api/classify', {'text': text})
+            durations.append(time.perf_counter() - start)
+        total_seconds.append(time.perf_counter() - start_all)
+    
+    results.add('http_classify_throughput', len(texts) / min(total_seconds), 'req/s')
+    latency = percentiles_ms(durations)
+    results.add('http_classify_latency_p50', latency['p50'], 'ms')
+    results.add('http_classify_latency_p99', latency['p99'], 'ms')
+    
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    seconds = best_of(repeat, lambda: [post('/api/classify/batch', {'texts': batch}) for batch in batches])
+    results.add('http_batch_throughput', len(texts) / seconds, 'docs/s')
+
+
+def max_rss_mb() -> Optional[float]:
+    """Pic de mémoire résidente du processus (None si indisponible)"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Octets sous macOS, kilo-octets ailleurs
+    return max_rss / 2 ** 20 if sys.platform == 'darwin' else max_rss / 2 ** 10
+
+
+def environment() -> dict:
+    """Contexte de la mesure (les résultats ne sont comparables qu'à contexte égal)"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.machine(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Comparer les mesures à la référence
+    
+    Args:
+        report: Résultats de cette exécution
+        baseline: Résultats de référence
+        tolerance: Écart relatif toléré dans le mauvais sens (0.2 = 20 %)
+        
+    Returns:
+        Noms des mesures en régression
+    """
+    if baseline.get('corpus') != report['corpus'] or baseline.get('settings') != report['settings']:
+        print("⚠️  Baseline was measured on a different corpus or settings: the comparison is indicative")
+    
+    regressions = []
+    print(f"{'metric':<30}{'baseline':>12}{'current':>12}{'change':>9}")
+    for name, metric in report['results'].items():
+        reference = baseline.get('results', {}).get(name)
+        if reference is None or not reference['value']:
+            print(f"{name:<30}{'-':>12}{metric['value']:>12.3f}{'new':>9}")
+            continue
+        
+        change = metric['value'] / reference['value'] - 1
+        if metric['better'] == 'higher':
+            regressed = change < -tolerance
+        else:
+            regressed = change > tolerance
+        
+        marker = '  ❌' if regressed else ''
+        print(f"{name:<30}{reference['value']:>12.3f}{metric['value']:>12.3f}{change:>+9.1%}{marker}")
+        if regressed:
+            regressions.append(name)
+    
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    app = create_app('default', preload=False)
+    logging.getLogger('app').setLevel(logging.WARNING)
+    
+    parser = argparse.ArgumentParser(description='Pipeline throughput and latency benchmark')
+    add_spec_arguments(parser)
+    parser.add_argument('--test-size', type=float, default=app.config['TEST_SIZE'], help='Held-out fraction')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is kept)')
+    parser.add_argument('--batch-size', type=int, default=100, help='Texts per batch request')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare against this JSON file (exit 1 on regression)')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative regression')
+    parser.add_argument('--save-baseline', help='Write the results as a new baseline to this file')
+    args = parser.parse_args(argv)
+    
+    spec = spec_from_arguments(args)
+    
+    with app.app_context():
+        documents = generate_documents(spec, StopWordsService().stop_words)
+    
+    random.Random(spec.seed).shuffle(documents)
+    test_size = max(1, int(len(documents) * args.test_size))
+    train_docs, test_docs = documents[:-test_size], documents[-test_size:]
+    
+    megabytes = sum(len(document.content.encode('utf-8')) for document in documents) / 2 ** 20
+    print(f"📊 Synthetic corpus: {len(documents)} documents, {megabytes:.1f} MB "
+          f"({len(train_docs)} training / {len(test_docs)} test)")
+    
+    results = Results()
+    
+    # Pas de modèle sauvegardé chargé ni écrit par le benchmark
+    with tempfile.TemporaryDirectory() as model_dir:
+        app.config['MODEL_DIR'] = model_dir
+        app.config['AUTO_SAVE_MODEL'] = False
+        
+        print("🔤 Preprocessing")
+        bench_preprocessing(results, app, documents, args.repeat)
+        print("🧠 Model")
+        bench_model(results, app, train_docs, test_docs, args.repeat, args.batch_size)
+        print("🌐 HTTP")
+        bench_http(results, app, train_docs, test_docs, args.repeat, args.batch_size)
+    
+    rss = max_rss_mb()
+    if rss is not None:
+        results.add('max_rss', rss, 'MB')
+    
+    report = {
+        'environment': environment(),
+        'corpus': asdict(spec),
+        'settings': {'test_size': args.test_size, 'repeat': args.repeat, 'batch_size': args.batch_size},
+        'results': results.metrics
+    }
+    
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+                f.write('\n')
+            print(f"💾 Results written to {path}")
+    
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+        print(f"✅ No regression beyond {args.tolerance:.0%}")
+    
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
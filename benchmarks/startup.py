@@ -0,0 +1,104 @@
+"""
+Benchmark du temps de démarrage d'un worker
+
+Mesure, avec `python -X importtime`, le temps d'import du point d'entrée
+(run.py: création de l'application Flask) et échoue si la médiane dépasse
+le seuil, ou si un module réservé à l'entraînement/évaluation est chargé
+au démarrage.
+
+Usage:
+    python benchmarks/startup.py [--repeat 7] [--max-ms 600]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules qui ne doivent être chargés qu'au premier usage
+LAZY_MODULES = [
+    'scipy',
+    'sklearn',
+    'multiprocessing',
+    'app.utils.metrics',
+    'app.services.corpus_loader',
+    'app.services.preprocessed_cache'
+]
+
+# "import time:  self [us] | cumulative | module"
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+
+def measure(entry_point: str) -> Dict[str, int]:
+    """
+    Importer le point d'entrée dans un nouvel interpréteur
+    
+    Args:
+        entry_point: Module à importer
+        
+    Returns:
+        Temps cumulé (µs) de chaque module importé
+    """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {entry_point}'],
+        cwd=ROOT_DIR, capture_output=True, text=True
+    )
+    
+    if process.returncode != 0:
+        raise RuntimeError(f'Import of {entry_point} failed:\n{process.stderr}')
+    
+    modules = {}
+    for line in process.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            modules[match.group(4)] = int(match.group(2))
+    
+    return modules
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Startup import-time benchmark')
+    parser.add_argument('--entry-point', default='run', help='Module imported by the workers')
+    parser.add_argument('--repeat', type=int, default=7, help='Number of fresh interpreters')
+    parser.add_argument('--max-ms', type=float, default=600.0, help='Threshold for the median (ms)')
+    parser.add_argument('--top', type=int, default=10, help='Slowest modules to display')
+    args = parser.parse_args(argv)
+    
+    # Premier import à part: il compile les .pyc et chauffe le cache disque
+    measure(args.entry_point)
+    
+    runs = [measure(args.entry_point) for _ in range(args.repeat)]
+    totals = [run[args.entry_point] / 1000 for run in runs]
+    median = statistics.median(totals)
+    
+    print(f"⏱️  import {args.entry_point}: median {median:.1f} ms "
+          f"(min {min(totals):.1f}, max {max(totals):.1f}, n={args.repeat})")
+    
+    # Modules les plus coûteux (temps cumulé, dernière mesure)
+    slowest = sorted(runs[-1].items(), key=lambda item: item[1], reverse=True)
+    for module, cumulative in slowest[1:args.top + 1]:
+        print(f"   {cumulative / 1000:8.1f} ms  {module}")
+    
+    failed = False
+    
+    eager = [module for module in LAZY_MODULES if module in runs[-1]]
+    if eager:
+        print(f"❌ Loaded at startup (should be lazy): {', '.join(eager)}")
+        failed = True
+    
+    if median > args.max_ms:
+        print(f"❌ Startup regression: {median:.1f} ms > {args.max_ms:.1f} ms")
+        failed = True
+    
+    if not failed:
+        print(f"✅ Startup within budget ({args.max_ms:.1f} ms)")
+    
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
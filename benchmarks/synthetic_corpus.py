@@ -0,0 +1,184 @@
+"""
+Générateur de corpus arabe synthétique (reproductible)
+
+Chaque catégorie tire ses mots d'un vocabulaire de racines commun selon une
+loi de Zipf qui lui est propre (mêmes racines, rangs différents), mêlé à un
+fond de mots généraux et de stop words. Les mots reçoivent des préfixes
+(ال، و، ب...) et des suffixes (ون، ات، ها...) réalistes, ce qui exerce le
+tokenizer, le stemmer et le filtrage des stop words comme un vrai corpus.
+
+Usage:
+    python benchmarks/synthetic_corpus.py --output /tmp/corpus [--categories 8] [--documents 250]
+"""
+import argparse
+import bisect
+import itertools
+import logging
+import os
+import random
+import sys
+from dataclasses import asdict, dataclass
+from typing import List, Sequence
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from app import create_app
+from app.models import TrainingDocument
+from app.services.stop_words import StopWordsService
+
+# Lettres des racines (alphabet arabe de base)
+ARABIC_LETTERS = 'ابتثجحخدذرزسشصضطظعغفقكلمنهوي'
+
+# Préfixes courants (article, conjonctions, prépositions) et leur poids
+PREFIXES = ['', 'ال', 'و', 'ب', 'ل', 'ف', 'وال', 'بال', 'لل', 'كال']
+PREFIX_WEIGHTS = [50, 25, 6, 4, 3, 2, 4, 3, 2, 1]
+
+# Suffixes courants: ceux du stemmer et quelques autres qu'il ne retire pas
+SUFFIXES = ['', 'ون', 'ين', 'ات', 'ان', 'ها', 'هم', 'هن', 'كم', 'ني', 'ه', 'ة', 'ي', 'نا', 'وا']
+SUFFIX_WEIGHTS = [45, 5, 5, 6, 3, 5, 3, 1, 1, 1, 4, 12, 5, 2, 2]
+
+PUNCTUATION = ['،', '.', '؟', '!', '؛']
+
+
+@dataclass(frozen=True)
+class CorpusSpec:
+    """
+    Paramètres du corpus synthétique
+    
+    Attributes:
+        categories: Nombre de catégories
+        documents_per_category: Documents par catégorie
+        mean_length: Longueur moyenne d'un document (en mots)
+        vocabulary_size: Nombre de racines distinctes
+        topic_ratio: Part des mots tirés de la distribution de la catégorie
+                     (0.1: environ 90 % de précision, comme un corpus de presse)
+        stop_word_ratio: Part des stop words
+        seed: Graine du générateur
+    """
+    categories: int = 8
+    documents_per_category: int = 250
+    mean_length: int = 300
+    vocabulary_size: int = 20000
+    topic_ratio: float = 0.1
+    stop_word_ratio: float = 0.25
+    seed: int = 42
+
+
+def generate_documents(spec: CorpusSpec, stop_words: Sequence[str]) -> List[TrainingDocument]:
+    """
+    Générer les documents du corpus
+    
+    Args:
+        spec: Paramètres du corpus
+        stop_words: Stop words à mêler au texte (ceux du service)
+        
+    Returns:
+        Documents étiquetés, catégorie par catégorie
+    """
+    rng = random.Random(spec.seed)
+    stop_words = sorted(stop_words)
+    roots = _make_roots(rng, spec.vocabulary_size)
+    
+    # Loi de Zipf sur les rangs: fond commun et une permutation par catégorie
+    zipf = list(itertools.accumulate(1.0 / rank for rank in range(1, len(roots) + 1)))
+    general = roots[:]
+    rng.shuffle(general)
+    topics = []
+    for _ in range(spec.categories):
+        topic = roots[:]
+        rng.shuffle(topic)
+        topics.append(topic)
+    
+    def draw(vocabulary: List[str]) -> str:
+        return vocabulary[bisect.bisect_left(zipf, rng.random() * zipf[-1])]
+    
+    documents = []
+    for category_index, topic in enumerate(topics):
+        category = f'category_{category_index:02d}'
+        
+        for _ in range(spec.documents_per_category):
+            # Longueurs log-normales (beaucoup de documents courts, quelques longs)
+            length = max(5, int(rng.lognormvariate(0, 0.5) * spec.mean_length / 1.13))
+            words = []
+            for _ in range(length):
+                draw_value = rng.random()
+                if draw_value < spec.stop_word_ratio:
+                    words.append(rng.choice(stop_words))
+                    continue
+                
+                root = draw(topic) if draw_value < spec.stop_word_ratio + spec.topic_ratio else draw(general)
+                prefix = rng.choices(PREFIXES, PREFIX_WEIGHTS)[0]
+                suffix = rng.choices(SUFFIXES, SUFFIX_WEIGHTS)[0]
+                words.append(prefix + root + suffix)
+                
+                if rng.random() < 0.08:
+                    words[-1] += rng.choice(PUNCTUATION)
+            
+            documents.append(TrainingDocument(category=category, content=' '.join(words)))
+    
+    return documents
+
+
+def _make_roots(rng: random.Random, count: int) -> List[str]:
+    """Racines distinctes de 3 à 5 lettres"""
+    roots = set()
+    while len(roots) < count:
+        roots.add(''.join(rng.choice(ARABIC_LETTERS) for _ in range(rng.choice((3, 3, 4, 4, 5)))))
+    return sorted(roots)
+
+
+def write_corpus(documents: List[TrainingDocument], directory: str):
+    """Écrire les documents au format de data/training/ (<catégorie>/<n>.txt)"""
+    counters = {}
+    for document in documents:
+        category_dir = os.path.join(directory, document.category)
+        os.makedirs(category_dir, exist_ok=True)
+        counters[document.category] = index = counters.get(document.category, 0) + 1
+        with open(os.path.join(category_dir, f'{index:05d}.txt'), 'w', encoding='utf-8') as f:
+            f.write(document.content)
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser):
+    """Options de CorpusSpec, partagées par les benchmarks"""
+    defaults = CorpusSpec()
+    parser.add_argument('--categories', type=int, default=defaults.categories, help='Number of categories')
+    parser.add_argument('--documents', type=int, default=defaults.documents_per_category,
+                        help='Documents per category')
+    parser.add_argument('--length', type=int, default=defaults.mean_length, help='Mean document length (words)')
+    parser.add_argument('--vocabulary', type=int, default=defaults.vocabulary_size, help='Distinct roots')
+    parser.add_argument('--topic-ratio', type=float, default=defaults.topic_ratio,
+                        help='Fraction of category-specific words')
+    parser.add_argument('--seed', type=int, default=defaults.seed, help='Generator seed')
+
+
+def spec_from_arguments(args: argparse.Namespace) -> CorpusSpec:
+    """CorpusSpec des options de add_spec_arguments"""
+    return CorpusSpec(categories=args.categories, documents_per_category=args.documents,
+                      mean_length=args.length, vocabulary_size=args.vocabulary,
+                      topic_ratio=args.topic_ratio, seed=args.seed)
+
+
+def main(argv: List[str] = None) -> int:
+    app = create_app('default', preload=False)
+    logging.getLogger('app').setLevel(logging.WARNING)
+    
+    parser = argparse.ArgumentParser(description='Synthetic Arabic corpus generator')
+    parser.add_argument('--output', required=True, help='Directory to write (data/training layout)')
+    add_spec_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    spec = spec_from_arguments(args)
+    with app.app_context():
+        stop_words = StopWordsService().stop_words
+    documents = generate_documents(spec, stop_words)
+    write_corpus(documents, args.output)
+    
+    size = sum(len(document.content.encode('utf-8')) for document in documents)
+    print(f"✅ {len(documents)} documents ({size / 2 ** 20:.1f} MB) written to {args.output}")
+    print(f"   {asdict(spec)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Benchmark du scoring top-k en fonction du nombre de catégories
+
+Pour chaque nombre de catégories, un corpus synthétique (synthetic_corpus.py)
+est généré et appris, puis les mêmes textes prétraités sont classifiés avec
+toutes les catégories, avec top_k, et avec top_k élagué (prune). La latence
+compte le scoring, la normalisation et la sérialisation JSON du résultat
+(le prétraitement, identique dans les trois modes, est exclu). Chaque texte
+garde son meilleur temps sur les répétitions.
+
+Usage:
+    python benchmarks/top_k.py [--category-counts 8 64 256 1024] [--top-k 1 5]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import replace
+from typing import Callable, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from app import create_app
+from app.routes import result_to_dict
+from app.services.naive_bayes import NaiveBayesClassifier
+from app.services.stop_words import StopWordsService
+from app.services.text_preprocessing import TextPreprocessingService
+from synthetic_corpus import add_spec_arguments, generate_documents, spec_from_arguments
+
+
+def latency_us(classify: Callable[[List[str]], object], stems_list: List[List[str]], repeat: int) -> float:
+    """
+    Latence moyenne (µs) de classification et de sérialisation d'un texte
+    
+    Args:
+        classify: Fonction de classification des stems d'un texte
+        stems_list: Stems de chaque texte
+        repeat: Nombre de passes (le meilleur temps de chaque texte est gardé)
+        
+    Returns:
+        Moyenne des meilleurs temps, en microsecondes
+    """
+    best = [float('inf')] * len(stems_list)
+    for _ in range(repeat):
+        for i, stems in enumerate(stems_list):
+            start = time.perf_counter()
+            json.dumps(result_to_dict(classify(stems)), ensure_ascii=False)
+            best[i] = min(best[i], time.perf_counter() - start)
+    
+    return sum(best) / len(best) * 1e6
+
+
+def main(argv: List[str] = None) -> int:
+    app = create_app('default', preload=False)
+    logging.getLogger('app').setLevel(logging.WARNING)
+    
+    parser = argparse.ArgumentParser(description='Top-k scoring latency versus number of categories')
+    add_spec_arguments(parser)
+    parser.add_argument('--category-counts', type=int, nargs='*', default=[8, 64, 256, 1024],
+                        help='Numbers of categories to compare (overrides --categories)')
+    parser.add_argument('--top-k', type=int, nargs='*', default=[1, 5], help='Values of top_k to compare')
+    parser.add_argument('--texts', type=int, default=200, help='Texts classified per measure')
+    parser.add_argument('--repeat', type=int, default=10, help='Passes per mode (best time per text is kept)')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.set_defaults(documents=20)
+    args = parser.parse_args(argv)
+    
+    with app.app_context():
+        stop_words = StopWordsService()
+    
+    modes = [('all', None, False)]
+    for k in args.top_k:
+        modes += [(f'top{k}', k, False), (f'top{k}+prune', k, True)]
+    
+    results = []
+    for categories in args.category_counts:
+        documents = generate_documents(replace(spec_from_arguments(args), categories=categories),
+                                       stop_words.stop_words)
+        
+        classifier = NaiveBayesClassifier(TextPreprocessingService(stop_words))
+        classifier.train(documents)
+        
+        step = max(1, len(documents) // args.texts)
+        stems_list = [classifier.preprocessing.preprocess(document.content)
+                      for document in documents[::step][:args.texts]]
+        
+        result = {'categories': categories}
+        for name, top_k, prune in modes:
+            result[name] = latency_us(lambda stems: classifier.classify_stems(stems, top_k, prune),
+                                      stems_list, args.repeat)
+        results.append(result)
+        
+        print(f"📊 {categories} categories: " + ', '.join(f"{name} {result[name]:.0f} µs" for name, _, _ in modes))
+    
+    print(f"{'categories':>10}" + ''.join(f"{name:>13}" for name, _, _ in modes))
+    for result in results:
+        print(f"{result['categories']:>10}" + ''.join(f"{result[name]:>13.0f}" for name, _, _ in modes))
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
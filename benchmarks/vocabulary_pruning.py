@@ -0,0 +1,134 @@
+"""
+Benchmark de l'élagage du vocabulaire
+
+Entraîne le classificateur sur le même découpage train/test du corpus, sans
+élagage puis pour chaque critère demandé, et compare la taille du
+vocabulaire, la mémoire du modèle et la précision (écart à la référence).
+
+Usage:
+    python benchmarks/vocabulary_pruning.py [--min-count 2 3] [--min-df 2] [--max-df 0.5] [--top-n 10000]
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+from typing import List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from app import create_app
+from app.models import TrainingDocument
+from app.services.corpus_loader import CorpusLoader
+from app.services.naive_bayes import NaiveBayesClassifier
+from app.services.stop_words import StopWordsService
+from app.services.text_preprocessing import TextPreprocessingService
+from app.utils.metrics import MetricsCalculator
+from app.utils.pruning import VocabularyPruning
+
+
+def run_pruning(preprocessing: TextPreprocessingService, name: str, pruning: VocabularyPruning,
+                train_docs: List[TrainingDocument], test_docs: List[TrainingDocument]) -> dict:
+    """
+    Entraîner et évaluer un critère d'élagage
+    
+    Args:
+        preprocessing: Service de prétraitement (partagé: même cache de stems)
+        name: Nom affiché du critère
+        pruning: Critère d'élagage
+        train_docs: Documents d'entraînement
+        test_docs: Documents de test
+        
+    Returns:
+        Mesures du critère
+    """
+    classifier = NaiveBayesClassifier(preprocessing, pruning=pruning)
+    
+    start = time.perf_counter()
+    classifier.train(train_docs)
+    train_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    metrics = MetricsCalculator.evaluate(classifier, test_docs)
+    evaluate_seconds = time.perf_counter() - start
+    
+    stats = classifier.get_stats()
+    
+    return {
+        'pruning': name,
+        'vocabulary_size': stats['vocabulary_size'],
+        'pruned_features': stats['pruned_features'],
+        'model_bytes': stats['model_bytes'],
+        'train_seconds': train_seconds,
+        'evaluate_seconds': evaluate_seconds,
+        'accuracy': metrics.accuracy,
+        'macro_f1': metrics.macro_avg['f1_score']
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    app = create_app('default', preload=False)
+    logging.getLogger('app').setLevel(logging.WARNING)
+    
+    parser = argparse.ArgumentParser(description='Vocabulary pruning size/accuracy trade-off')
+    parser.add_argument('--training-dir', default=app.config['TRAINING_DIR'], help='Corpus directory')
+    parser.add_argument('--min-count', type=int, nargs='*', default=[2, 3], help='Minimum counts to compare')
+    parser.add_argument('--min-df', type=int, nargs='*', default=[2], help='Minimum document frequencies')
+    parser.add_argument('--max-df', type=float, nargs='*', default=[0.5], help='Maximum document-frequency ratios')
+    parser.add_argument('--top-n', type=int, nargs='*', default=[10000], help='Stems kept by information gain')
+    parser.add_argument('--test-size', type=float, default=app.config['TEST_SIZE'], help='Test fraction')
+    parser.add_argument('--seed', type=int, default=app.config['RANDOM_STATE'], help='Split seed')
+    parser.add_argument('--json', help='Write the results to this file')
+    args = parser.parse_args(argv)
+    
+    configurations = [('none', VocabularyPruning())]
+    configurations += [(f'min_count={value}', VocabularyPruning(min_count=value)) for value in args.min_count]
+    configurations += [(f'min_df={value}', VocabularyPruning(min_df=value)) for value in args.min_df]
+    configurations += [(f'max_df={value}', VocabularyPruning(max_df=value)) for value in args.max_df]
+    configurations += [(f'top_n={value}', VocabularyPruning(top_n=value)) for value in args.top_n]
+    
+    with app.app_context():
+        loader = CorpusLoader(args.training_dir, app.config['CORPUS_MANIFEST_FILE'],
+                              read_workers=app.config['CORPUS_READ_WORKERS'])
+        documents = list(loader.iter_documents(loader.scan()))
+        
+        test_size = int(len(documents) * args.test_size)
+        if not documents or test_size == 0:
+            print(f"❌ Not enough documents in {args.training_dir}")
+            return 1
+        
+        random.Random(args.seed).shuffle(documents)
+        train_docs, test_docs = documents[:-test_size], documents[-test_size:]
+        
+        preprocessing = TextPreprocessingService(StopWordsService(),
+                                                 cache_size=app.config['STEM_CACHE_SIZE'])
+        
+        print(f"📊 {len(train_docs)} training / {len(test_docs)} test documents")
+        results = []
+        for name, pruning in configurations:
+            try:
+                results.append(run_pruning(preprocessing, name, pruning, train_docs, test_docs))
+            except ValueError as e:
+                print(f"⚠️  {name}: {e}")
+    
+    baseline = results[0]
+    print(f"{'pruning':<16}{'stems':>10}{'model MB':>11}{'train s':>9}{'eval s':>8}"
+          f"{'accuracy':>10}{'Δ acc':>8}{'macro F1':>10}")
+    for result in results:
+        print(f"{result['pruning']:<16}{result['vocabulary_size']:>10}"
+              f"{result['model_bytes'] / 2 ** 20:>11.1f}{result['train_seconds']:>9.2f}"
+              f"{result['evaluate_seconds']:>8.2f}{result['accuracy']:>10.2%}"
+              f"{(result['accuracy'] - baseline['accuracy']) * 100:>+8.2f}{result['macro_f1']:>10.4f}")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
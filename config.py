@@ -18,10 +18,58 @@ class Config:
     DATA_DIR = os.path.join(BASE_DIR, 'data')
     TRAINING_DIR = os.path.join(DATA_DIR, 'training')
     STOPWORDS_FILE = os.path.join(DATA_DIR, 'stopwords', 'arabic_stopwords.txt')
+    MODEL_DIR = os.path.join(DATA_DIR, 'models')
+    CACHE_DIR = os.path.join(DATA_DIR, 'cache')
+    CORPUS_MANIFEST_FILE = os.path.join(CACHE_DIR, 'corpus_manifest.json')
+    PREPROCESSED_CACHE_DIR = os.path.join(CACHE_DIR, 'preprocessed')
     
     # Configuration du modèle
     TEST_SIZE = 0.2  # 20% pour le test
-    RANDOM_STATE = 42
+    RANDOM_STATE = 42  # Graine des découpages train/test et des folds
+    CV_FOLDS = 5  # Nombre de folds de la validation croisée
+    STEM_CACHE_SIZE = 100000  # Tokens max dans le cache de stems
+    STAGE_TIMING_SAMPLE = 16  # Un prétraitement sur N mesure tokenize et stem séparément (0 = jamais)
+    CORPUS_READ_WORKERS = 8  # Lectures de fichiers concurrentes
+    PREPROCESSED_CACHE_ENABLED = True  # Réutiliser les documents déjà prétraités
+    TRAINING_WORKERS = int(os.environ.get('TRAINING_WORKERS') or os.cpu_count() or 1)
+    FEATURE_HASHING_BITS = None  # Hacher les stems sur 2^k caractéristiques (ex: 20), None = vocabulaire exact
+    
+    # Classification hiérarchique: catégories en arborescence (dossiers imbriqués, ex: sports/football)
+    HIERARCHICAL_CLASSIFIER = os.environ.get('HIERARCHICAL_CLASSIFIER', 'False').lower() == 'true'
+    HIERARCHY_BEAM_WIDTH = 2  # Branches explorées à chaque niveau
+    
+    # Élagage du vocabulaire à l'entraînement (les valeurs par défaut ne retirent rien)
+    VOCAB_MIN_DF = 1  # Documents min contenant un stem
+    VOCAB_MIN_COUNT = 1  # Occurrences min d'un stem dans le corpus
+    VOCAB_MAX_DF = 1.0  # Part max des documents contenant un stem
+    VOCAB_TOP_N = None  # Garder les N stems de plus fort gain d'information (None = tous)
+    
+    # Persistance du modèle
+    AUTO_SAVE_MODEL = True  # Sauvegarder après chaque entraînement
+    MODEL_KEEP = 3  # Nombre de modèles sauvegardés conservés
+    
+    # Charger les services et le modèle à la création de l'application (avant le fork)
+    PRELOAD_SERVICES = os.environ.get('PRELOAD_SERVICES', 'False').lower() == 'true'
+    
+    # Configuration de l'API
+    MAX_BATCH_SIZE = 1000  # Textes max par requête /api/classify/batch
+    RESULT_CACHE_SIZE = 10000  # Résultats max en cache (0 = désactivé)
+    RESULT_CACHE_TTL = 3600  # Durée de vie d'un résultat en secondes (None = illimitée)
+    COALESCE_WINDOW = 0.002  # Attente max (s) pour regrouper les classifications concurrentes (0 = désactivé)
+    COALESCE_MAX_BATCH_SIZE = 64  # Textes max par lot regroupé
+    
+    # Flux NDJSON (/api/classify/stream)
+    STREAM_MAX_CONTENT_LENGTH = None  # Pas de limite de taille pour ce flux
+    STREAM_CHUNK_SIZE = 64 * 1024  # Taille des blocs lus
+    STREAM_MAX_LINE_LENGTH = 1024 * 1024  # 1 M caractères max par document
+    
+    # Serveur ASGI (asgi.py): scoring dans un pool de threads borné
+    ASGI_POOL_WORKERS = int(os.environ.get('ASGI_POOL_WORKERS') or os.cpu_count() or 1)
+    ASGI_QUEUE_SIZE = 64  # Jobs en attente max avant de répondre 503
+    ASGI_RETRY_AFTER = 1  # Secondes indiquées par Retry-After dans les réponses 503
+    
+    # Journalisation
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
     
     # Debug mode
     DEBUG = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
@@ -35,6 +83,7 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     """Configuration de production"""
     DEBUG = False
+    PRELOAD_SERVICES = True
 
 
 # Configuration par défaut
@@ -0,0 +1,18 @@
+"""
+Configuration gunicorn (production)
+
+    gunicorn run:app
+
+Le modèle est chargé une fois dans le processus maître (preload_app), puis
+partagé en copy-on-write par tous les workers.
+"""
+import os
+
+# Configuration Flask utilisée à l'import de run.py (dans le maître)
+os.environ.setdefault('FLASK_CONFIG', 'production')
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS') or (os.cpu_count() or 1) * 2 + 1)
+
+# Importer l'application (et charger le modèle) avant le fork des workers
+preload_app = True
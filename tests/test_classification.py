@@ -0,0 +1,173 @@
+"""
+Tests du scoring: top-k élagué et recherche en faisceau hiérarchique
+"""
+import random
+
+import numpy as np
+import pytest
+
+from app import create_app
+from app.models import TrainingDocument
+from app.services.hierarchical import HierarchicalClassifier
+from app.services.naive_bayes import NaiveBayesClassifier
+from app.services.stop_words import StopWordsService
+from app.services.text_preprocessing import TextPreprocessingService
+
+LETTERS = 'بتثجحخدذرزسشصضطظعغفقكلمن'
+
+
+class Corpus:
+    """Corpus arabe aléatoire: mots communs, mots de groupe et mots de catégorie"""
+    
+    def __init__(self, seed: int = 11):
+        self.rng = random.Random(seed)
+        self.common = self.words(200)
+    
+    def words(self, n: int):
+        return [''.join(self.rng.choice(LETTERS) for _ in range(self.rng.randint(3, 6))) for _ in range(n)]
+    
+    def text(self, *vocabularies, length: int = 40):
+        words = []
+        for _ in range(length):
+            draw = self.rng.random()
+            vocabulary = self.common
+            for share, topic in vocabularies:
+                if draw < share:
+                    vocabulary = topic
+                    break
+                draw -= share
+            words.append(self.rng.choice(vocabulary))
+        return ' '.join(words)
+
+
+@pytest.fixture(scope='module')
+def preprocessing():
+    app = create_app('default', preload=False)
+    with app.app_context():
+        return TextPreprocessingService(StopWordsService())
+
+
+@pytest.fixture(scope='module')
+def flat_model(preprocessing):
+    """64 catégories: des stems communs (lignes denses) et des stems propres à chaque catégorie"""
+    corpus = Corpus()
+    topics = [corpus.words(15) for _ in range(64)]
+    documents = [TrainingDocument(content=corpus.text((0.5, topic)), category=f'category_{i}')
+                 for i, topic in enumerate(topics) for _ in range(5)]
+    
+    model = NaiveBayesClassifier(preprocessing)
+    model.train(documents)
+    texts = [corpus.text((0.5, topic)) for topic in topics[:16]] + [corpus.text(length=60)]
+    return model, texts
+
+
+@pytest.mark.parametrize('top_k', [1, 3, 10])
+def test_pruned_top_k_matches_full_scoring(preprocessing, flat_model, top_k, monkeypatch):
+    model, texts = flat_model
+    assert model.snapshot.dense_rows.ids.size > 0
+    
+    # Nombre de catégories entièrement scorées par le dernier appel
+    scored = []
+    top_indices = NaiveBayesClassifier._top_indices
+    monkeypatch.setattr(NaiveBayesClassifier, '_top_indices',
+                        staticmethod(lambda log_probs, k: scored.append(len(log_probs)) or top_indices(log_probs, k)))
+    pruned = 0
+    
+    for text in texts:
+        # Référence: log probabilités de toutes les catégories (les probabilités
+        # des catégories lointaines s'annulent et ne permettent pas de les classer)
+        log_probs = NaiveBayesClassifier._calculate_log_probabilities(model.snapshot, preprocessing.preprocess(text))
+        threshold = np.sort(log_probs)[-top_k] - 1e-9 * abs(log_probs.max())
+        
+        for prune in (False, True):
+            result = model.classify(text, top_k=top_k, prune=prune)
+            pruned += prune and scored[-1] < len(model.snapshot.categories)
+            
+            # Les k meilleures catégories (n'importe lesquelles en cas d'égalité au k-ième rang)
+            kept = np.array([model.snapshot.categories.index(category) for category in result.probabilities])
+            assert len(kept) == top_k and (log_probs[kept] >= threshold).all()
+            assert log_probs[model.snapshot.categories.index(result.predicted_category)] == log_probs.max()
+            
+            expected = np.exp(log_probs[kept] - log_probs.max())
+            assert list(result.probabilities.values()) == pytest.approx((expected / expected.sum()).tolist())
+    
+    # Le chemin élagué a bien servi (et pas seulement le repli sur le scoring complet)
+    assert pruned > 0
+
+
+def test_pruned_prediction_matches_full_scoring(flat_model):
+    model, texts = flat_model
+    
+    for text in texts:
+        assert model.classify(text, prune=True).predicted_category == model.classify(text).predicted_category
+
+
+@pytest.fixture(scope='module')
+def taxonomy():
+    """4 groupes de 3 catégories (groupe/catégorie), et des textes de chaque catégorie"""
+    corpus = Corpus(seed=5)
+    groups = [corpus.words(20) for _ in range(4)]
+    topics = [[corpus.words(20) for _ in range(3)] for _ in range(4)]
+    
+    documents, texts = [], []
+    for g, group in enumerate(groups):
+        for c, topic in enumerate(topics[g]):
+            for _ in range(6):
+                documents.append(TrainingDocument(content=corpus.text((0.2, group), (0.2, topic)),
+                                                  category=f'g{g}/c{c}'))
+            texts.append(corpus.text((0.1, group), (0.1, topic)))
+    texts.append(corpus.text(length=60))
+    return documents, texts
+
+
+def make_hierarchy(preprocessing, documents, beam_width):
+    hierarchy = HierarchicalClassifier(NaiveBayesClassifier(preprocessing), beam_width=beam_width)
+    hierarchy.train(documents)
+    return hierarchy
+
+
+def test_hierarchy_matches_per_level_models(preprocessing, taxonomy):
+    documents, texts = taxonomy
+    hierarchy = make_hierarchy(preprocessing, documents, beam_width=4)
+    
+    # Chaque nœud est le Naive Bayes entraîné sur les documents de sa branche
+    root = NaiveBayesClassifier(preprocessing)
+    root.train([TrainingDocument(content=doc.content, category=doc.category.split('/')[0]) for doc in documents])
+    nodes = {}
+    for group in root.snapshot.categories:
+        nodes[group] = NaiveBayesClassifier(preprocessing)
+        nodes[group].train([doc for doc in documents if doc.category.startswith(group + '/')])
+    
+    for text in texts:
+        expected = {}
+        for group, group_probability in root.classify(text).probabilities.items():
+            for category, probability in nodes[group].classify(text).probabilities.items():
+                expected[category] = group_probability * probability
+        
+        probabilities = hierarchy.classify(text).probabilities
+        assert set(probabilities) == set(expected)
+        for category, probability in expected.items():
+            assert probabilities[category] == pytest.approx(probability, rel=1e-9, abs=1e-300)
+
+
+@pytest.mark.parametrize('beam_width', [1, 2, 3])
+def test_beam_keeps_the_best_branches(preprocessing, taxonomy, beam_width):
+    documents, texts = taxonomy
+    exhaustive = make_hierarchy(preprocessing, documents, beam_width=4)
+    beam = make_hierarchy(preprocessing, documents, beam_width=beam_width)
+    
+    for text in texts:
+        full = exhaustive.classify(text).probabilities
+        result = beam.classify(text)
+        
+        # Les beam_width groupes les plus probables, avec toutes leurs catégories
+        group_probabilities = {}
+        for category, probability in full.items():
+            group = category.split('/')[0]
+            group_probabilities[group] = group_probabilities.get(group, 0.0) + probability
+        best = sorted(group_probabilities, key=group_probabilities.get, reverse=True)[:beam_width]
+        
+        assert set(result.probabilities) == {category for category in full if category.split('/')[0] in best}
+        for category, probability in result.probabilities.items():
+            assert probability == pytest.approx(full[category], rel=1e-9, abs=1e-300)
+        assert result.predicted_category == max(result.probabilities, key=result.probabilities.get)
@@ -0,0 +1,90 @@
+"""
+Tests du chargeur du corpus: documents ajoutés par l'API et manifeste
+"""
+import os
+
+import pytest
+
+from app.models import TrainingDocument
+from app.services.corpus_loader import CorpusLoader
+
+
+def make_loader(tmp_path, hierarchical=False):
+    return CorpusLoader(str(tmp_path / 'training'), str(tmp_path / 'cache' / 'manifest.json'),
+                        read_workers=2, hierarchical=hierarchical)
+
+
+@pytest.mark.parametrize('hierarchical, category', [(False, 'رياضة'), (True, 'رياضة/كرة')])
+def test_written_documents_are_read_back(tmp_path, hierarchical, category):
+    loader = make_loader(tmp_path, hierarchical)
+    documents = [TrainingDocument(category=category, content=f'نص رقم {i}') for i in range(3)]
+    
+    files = loader.write_documents(documents)
+    
+    assert sorted(files, key=lambda corpus_file: corpus_file.path) == loader.scan()
+    read = sorted((doc.category, doc.content) for doc in loader.iter_documents(loader.scan()))
+    assert read == sorted((doc.category, doc.content) for doc in documents)
+
+
+@pytest.mark.parametrize('hierarchical, category', [
+    (False, '..'),
+    (False, 'رياضة/كرة'),
+    (True, '../رياضة'),
+    (True, 'رياضة//كرة'),
+    (True, '/tmp'),
+])
+def test_category_outside_training_dir_is_rejected(tmp_path, hierarchical, category):
+    loader = make_loader(tmp_path, hierarchical)
+    
+    with pytest.raises(ValueError):
+        loader.write_documents([TrainingDocument(category='سياسة', content='نص'),
+                                TrainingDocument(category=category, content='نص')])
+    assert loader.scan() == []
+
+
+def test_extended_manifest_marks_documents_as_trained(tmp_path):
+    loader = make_loader(tmp_path)
+    loader.write_documents([TrainingDocument(category='سياسة', content='نص أول')])
+    loader.save_manifest(loader.scan(), 'v1')
+    
+    # Documents ajoutés au modèle v1 par mise à jour incrémentale (modèle v2)
+    files = loader.write_documents([TrainingDocument(category='اقتصاد', content='نص ثان')])
+    assert loader.diff(loader.scan(), 'v1').added == files
+    loader.extend_manifest(files, 'v1', 'v2')
+    
+    changes = loader.diff(loader.scan(), 'v2')
+    assert changes.incremental and not changes.added and changes.unchanged == 2
+    
+    # Manifeste d'un autre modèle: inchangé (le prochain entraînement est complet)
+    loader.extend_manifest(loader.write_documents([TrainingDocument(category='فن', content='نص')]), 'v1', 'v3')
+    assert loader.load_manifest()['model_version'] == 'v2'
+
+
+def test_manifest_diff(tmp_path):
+    loader = make_loader(tmp_path)
+    kept, modified, removed = loader.write_documents([TrainingDocument(category='سياسة', content=f'نص {i}')
+                                                      for i in range(3)])
+    loader.save_manifest(loader.scan(), 'v1')
+    
+    # Sans changement: mise à jour incrémentale sans fichier à lire
+    changes = loader.diff(loader.scan(), 'v1')
+    assert changes.incremental and not changes.added and changes.unchanged == 3
+    
+    # Ajout seul: incrémental
+    added = loader.write_documents([TrainingDocument(category='فن', content='نص جديد')])
+    changes = loader.diff(loader.scan(), 'v1')
+    assert changes.incremental and changes.added == added and changes.unchanged == 3
+    
+    # Modification et suppression: réentraînement complet
+    with open(modified.path, 'a', encoding='utf-8') as f:
+        f.write(' مضاف')
+    os.remove(removed.path)
+    changes = loader.diff(loader.scan(), 'v1')
+    assert not changes.incremental
+    assert [corpus_file.path for corpus_file in changes.modified] == [modified.path]
+    assert changes.removed == [removed.path] and changes.unchanged == 1
+    
+    # Autre modèle publié (ou aucun): tout est considéré comme modifié
+    for version in ('v2', None):
+        changes = loader.diff(loader.scan(), version)
+        assert not changes.incremental and len(changes.modified) == 3
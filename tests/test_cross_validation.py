@@ -0,0 +1,119 @@
+"""
+Tests de l'élagage, du hachage et de la validation croisée par soustraction
+"""
+import random
+
+import numpy as np
+import pytest
+
+from app import create_app
+from app.models import TrainingDocument
+from app.services.naive_bayes import NaiveBayesClassifier, _count_documents, _SparseCounts
+from app.services.preprocessed_cache import PreprocessedCorpusCache
+from app.services.stop_words import StopWordsService
+from app.services.text_preprocessing import TextPreprocessingService
+from app.utils.metrics import MetricsCalculator
+from app.utils.pruning import VocabularyPruning
+from app.utils.vocabulary import HashedVocabulary
+
+LETTERS = 'بتثجحخدذرزسشصضطظعغفقكلمن'
+
+PRUNINGS = [
+    VocabularyPruning(),
+    VocabularyPruning(min_count=3),
+    VocabularyPruning(min_df=2),
+    VocabularyPruning(max_df=0.5),
+    VocabularyPruning(top_n=60),
+]
+
+
+def make_documents(categories: int = 4, per_category: int = 20, seed: int = 7):
+    """Corpus arabe aléatoire: mots communs et mots propres à chaque catégorie"""
+    rng = random.Random(seed)
+    
+    def word():
+        return ''.join(rng.choice(LETTERS) for _ in range(rng.randint(3, 6)))
+    
+    common = [word() for _ in range(150)]
+    topics = [[word() for _ in range(40)] for _ in range(categories)]
+    
+    documents = []
+    for category, topic in enumerate(topics):
+        for _ in range(per_category):
+            words = [rng.choice(topic if rng.random() < 0.3 else common) for _ in range(rng.randint(20, 60))]
+            documents.append(TrainingDocument(content=' '.join(words), category=f'category_{category}'))
+    rng.shuffle(documents)
+    return documents
+
+
+@pytest.fixture(scope='module')
+def preprocessing():
+    app = create_app('default', preload=False)
+    with app.app_context():
+        return TextPreprocessingService(StopWordsService())
+
+
+@pytest.fixture(scope='module')
+def documents():
+    return make_documents()
+
+
+def document_frequencies(category_counts, word_counts, frequencies, hashed):
+    counts = _SparseCounts(hashed)
+    counts.add(category_counts, word_counts, frequencies)
+    return counts.document_frequencies().toarray(), list(counts.category_ids)
+
+
+def test_hashed_document_frequencies_count_documents(preprocessing, documents, tmp_path):
+    # 8 bits: beaucoup de stems en collision dans un même document
+    hashed = HashedVocabulary(8)
+    category_counts, word_counts, _, frequencies = _count_documents(preprocessing, documents, True, hashed)
+    df, categories = document_frequencies(category_counts, word_counts, frequencies, hashed)
+    
+    # Présence de chaque caractéristique, document par document
+    expected = np.zeros_like(df)
+    for doc in documents:
+        features = np.unique(hashed.lookup(preprocessing.preprocess(doc.content)))
+        expected[features, categories.index(doc.category)] += 1
+    
+    assert (df <= np.array([category_counts[category] for category in categories])).all()
+    np.testing.assert_array_equal(df, expected)
+    
+    # Même résultat en passant par le cache des documents prétraités
+    cache = PreprocessedCorpusCache(str(tmp_path), preprocessing)
+    for _ in range(2):  # Remplissage, puis lecture du cache
+        cached = cache.count_documents(documents, document_frequency=True, hashed=hashed)
+        np.testing.assert_array_equal(document_frequencies(cached[0], cached[1], cached[3], hashed)[0], df)
+
+
+def fold_split(n_documents: int, k: int, random_state: int):
+    """Folds de MetricsCalculator.cross_validate"""
+    permutation = np.random.RandomState(random_state).permutation(n_documents)
+    return np.array_split(permutation, k)
+
+
+@pytest.mark.parametrize('hash_bits', [None, 8])
+@pytest.mark.parametrize('pruning', PRUNINGS, ids=repr)
+def test_cross_validation_matches_retraining(preprocessing, documents, hash_bits, pruning):
+    model = NaiveBayesClassifier(preprocessing, hash_bits=hash_bits, pruning=pruning)
+    metrics = MetricsCalculator.cross_validate(model, documents, k=4, random_state=3)
+    
+    accuracies = []
+    for test_indices in fold_split(len(documents), 4, 3):
+        test = set(test_indices.tolist())
+        fold_model = NaiveBayesClassifier(preprocessing, hash_bits=hash_bits, pruning=pruning)
+        fold_model.train([doc for i, doc in enumerate(documents) if i not in test])
+        accuracies.append(MetricsCalculator.evaluate(fold_model, [documents[i] for i in test_indices]).accuracy)
+    
+    assert metrics.fold_accuracies == pytest.approx(accuracies)
+
+
+@pytest.mark.parametrize('pruning', [VocabularyPruning(min_df=2), VocabularyPruning(top_n=60)], ids=repr)
+def test_parallel_hashed_training_matches_sequential(preprocessing, documents, pruning):
+    sequential = NaiveBayesClassifier(preprocessing, hash_bits=8, pruning=pruning)
+    sequential.train(documents)
+    parallel = NaiveBayesClassifier(preprocessing, hash_bits=8, pruning=pruning)
+    parallel.train(documents, workers=2)
+    
+    assert parallel.get_stats()['vocabulary_size'] == sequential.get_stats()['vocabulary_size']
+    assert (parallel.snapshot.log_counts != sequential.snapshot.log_counts).nnz == 0
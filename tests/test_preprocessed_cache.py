@@ -0,0 +1,103 @@
+"""
+Tests du cache des documents prétraités: relecture entre processus et écritures interrompues
+"""
+import multiprocessing
+import random
+
+import pytest
+
+from app import create_app
+from app.services.preprocessed_cache import PreprocessedCorpusCache
+from app.services.stop_words import StopWordsService
+from app.services.text_preprocessing import TextPreprocessingService
+
+TEXTS = ['كتاب مدرسة جميلة', 'شمس قمر نجوم', 'بيت كبير قديم', 'كتاب قمر بيت']
+
+
+@pytest.fixture(scope='module')
+def preprocessing():
+    app = create_app('default', preload=False)
+    with app.app_context():
+        return TextPreprocessingService(StopWordsService())
+
+
+def check_cache(directory, preprocessing):
+    """Un nouveau cache (autre processus) relit chaque texte tel que prétraité"""
+    cache = PreprocessedCorpusCache(directory, preprocessing)
+    for text in TEXTS:
+        assert cache.preprocess(text) == preprocessing.preprocess(text)
+    return cache
+
+
+def test_documents_are_shared_between_instances(preprocessing, tmp_path):
+    writer = PreprocessedCorpusCache(str(tmp_path), preprocessing)
+    for text in TEXTS:
+        writer.preprocess(text)
+    
+    reader = check_cache(str(tmp_path), preprocessing)
+    assert reader.hits == len(TEXTS) and reader.misses == 0
+
+
+def test_stem_being_appended_is_not_skipped(preprocessing, tmp_path):
+    writer = PreprocessedCorpusCache(str(tmp_path), preprocessing)
+    writer.preprocess(TEXTS[0])
+    
+    # Un autre processus est en train d'ajouter un stem
+    with open(writer._stems_file, 'a', encoding='utf-8') as f:
+        f.write('زهر')
+    reader = PreprocessedCorpusCache(str(tmp_path), preprocessing)
+    with open(writer._stems_file, 'a', encoding='utf-8') as f:
+        f.write('ة\n')
+    
+    reader.preprocess(TEXTS[1])
+    assert 'زهرة' in reader._stems
+    assert PreprocessedCorpusCache(str(tmp_path), preprocessing)._stems == reader._stems
+    check_cache(str(tmp_path), preprocessing)
+
+
+@pytest.mark.parametrize('name, torn', [
+    ('ids.bin', b'\x01\x02\x03'),
+    ('stems.txt', 'نصف'.encode('utf-8')),
+    ('index.tsv', b'0123456789abcdef\t12'),
+])
+def test_interrupted_write_is_discarded(preprocessing, tmp_path, name, torn):
+    cache = PreprocessedCorpusCache(str(tmp_path), preprocessing)
+    cache.preprocess(TEXTS[0])
+    
+    # Écriture interrompue (processus tué au milieu d'un ajout)
+    with open(tmp_path / cache.fingerprint / name, 'ab') as f:
+        f.write(torn)
+    
+    for text in TEXTS[1:]:
+        PreprocessedCorpusCache(str(tmp_path), preprocessing).preprocess(text)
+    
+    assert (tmp_path / cache.fingerprint / 'ids.bin').stat().st_size % 4 == 0
+    check_cache(str(tmp_path), preprocessing)
+
+
+def write_documents(directory, preprocessing, seed):
+    """Prétraiter des textes (en partie communs aux autres processus) dans un ordre aléatoire"""
+    texts = TEXTS + [f'{text} {seed}' for text in TEXTS] + [' '.join(TEXTS[seed % len(TEXTS)].split()[::-1])]
+    random.Random(seed).shuffle(texts)
+    cache = PreprocessedCorpusCache(directory, preprocessing)
+    for text in texts:
+        cache.preprocess(text)
+
+
+def test_concurrent_writers_share_one_cache(preprocessing, tmp_path):
+    # Processus écrivant en même temps: chaque ajout se fait sous le verrou de fichier
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=write_documents, args=(str(tmp_path), preprocessing, seed))
+                 for seed in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+        assert process.exitcode == 0
+    
+    cache = check_cache(str(tmp_path), preprocessing)
+    assert len(cache._stems) == len(set(cache._stems))
+    for seed in range(4):
+        text = ' '.join(TEXTS[seed % len(TEXTS)].split()[::-1])
+        assert cache.preprocess(text) == preprocessing.preprocess(text)
+    assert cache.misses == 0
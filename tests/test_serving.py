@@ -0,0 +1,257 @@
+"""
+Tests du service de classification: regroupement en lots, cache des résultats et pool ASGI borné
+"""
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from app import create_app, routes
+from app.asgi import AsgiApplication, BoundedPool, QueueFull
+from app.models import TrainingDocument
+from app.services.coalescer import RequestCoalescer
+from app.services.naive_bayes import NaiveBayesClassifier
+from app.services.result_cache import ResultCache
+from app.services.stop_words import StopWordsService
+from app.services.text_preprocessing import TextPreprocessingService
+
+DOCUMENTS = [
+    ('رياضة', 'فاز الفريق بالمباراة وسجل اللاعب هدفا في الملعب'),
+    ('رياضة', 'المدرب يختار اللاعبين للمباراة النهائية في البطولة'),
+    ('اقتصاد', 'ارتفعت أسعار النفط وتراجعت الأسهم في البورصة'),
+    ('اقتصاد', 'البنك المركزي يرفع الفائدة لمواجهة التضخم والأسعار'),
+    ('علوم', 'اكتشف العلماء كوكبا جديدا بواسطة التلسكوب الفضائي'),
+    ('علوم', 'تجربة مخبرية جديدة في الفيزياء والكيمياء والخلايا'),
+]
+
+TEXTS = [
+    'سجل اللاعب هدفا في المباراة',
+    'تراجعت الأسهم في البورصة',
+    'التلسكوب يرصد كوكبا بعيدا',
+    'الفريق والبنك والعلماء',
+    'نص لا يعرفه النموذج',
+]
+
+
+def train(classifier):
+    classifier.train([TrainingDocument(category=category, content=content) for category, content in DOCUMENTS])
+    return classifier
+
+
+@pytest.fixture(scope='module')
+def classifier():
+    app = create_app('default', preload=False)
+    with app.app_context():
+        return train(NaiveBayesClassifier(TextPreprocessingService(StopWordsService())))
+
+
+def assert_same_result(result, expected):
+    assert result.predicted_category == expected.predicted_category
+    assert result.probabilities == pytest.approx(expected.probabilities)
+    assert (result.total_tokens, result.unique_tokens) == (expected.total_tokens, expected.unique_tokens)
+    assert result.model_version == expected.model_version
+
+
+class BlockingClassifier:
+    """Classificateur dont le premier classify() attend d'être libéré"""
+    
+    def __init__(self, classifier):
+        self.classifier = classifier
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.batch_sizes = []
+    
+    def classify(self, text, top_k=None, prune=False):
+        if not self.started.is_set():
+            self.started.set()
+            self.release.wait(5)
+        return self.classifier.classify(text, top_k, prune)
+    
+    def classify_many(self, texts, top_k=None):
+        self.batch_sizes.append(len(texts))
+        return self.classifier.classify_many(texts, top_k)
+
+
+@pytest.mark.parametrize('top_k', [None, 2])
+def test_coalesced_batch_matches_single_calls(classifier, top_k):
+    blocking = BlockingClassifier(classifier)
+    coalescer = RequestCoalescer(blocking, window=1.0, max_batch_size=64)
+    texts = TEXTS * 4
+    results = [None] * len(texts)
+    
+    def classify(i):
+        results[i] = coalescer.classify(texts[i], top_k)
+    
+    # Le premier texte est scoré seul; les suivants s'accumulent pendant ce temps
+    threads = [threading.Thread(target=classify, args=(i,)) for i in range(len(texts))]
+    threads[0].start()
+    assert blocking.started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    while len(coalescer._queue) < len(texts) - 1:
+        time.sleep(0.001)
+    blocking.release.set()
+    for thread in threads:
+        thread.join(5)
+    
+    assert blocking.batch_sizes == [len(texts) - 1]
+    assert coalescer.get_stats()['batches'] == 2
+    for text, result in zip(texts, results):
+        assert_same_result(result, classifier.classify(text, top_k))
+
+
+def test_coalesced_batch_error_reaches_every_call(classifier):
+    class FailingClassifier(BlockingClassifier):
+        def classify_many(self, texts, top_k=None):
+            raise RuntimeError('scoring failed')
+    
+    failing = FailingClassifier(classifier)
+    coalescer = RequestCoalescer(failing, window=1.0)
+    errors = []
+    
+    def classify(text):
+        try:
+            coalescer.classify(text)
+        except RuntimeError as e:
+            errors.append(str(e))
+    
+    threads = [threading.Thread(target=classify, args=(text,)) for text in TEXTS]
+    threads[0].start()
+    assert failing.started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    while len(coalescer._queue) < len(TEXTS) - 1:
+        time.sleep(0.001)
+    failing.release.set()
+    for thread in threads:
+        thread.join(5)
+    
+    assert errors == ['scoring failed'] * (len(TEXTS) - 1)
+
+
+class CountingClassify:
+    """Fonction de classification qui compte ses appels"""
+    
+    def __init__(self, classifier):
+        self.classifier = classifier
+        self.calls = 0
+    
+    def __call__(self, text, top_k=None, prune=False):
+        self.calls += 1
+        return self.classifier.classify(text, top_k, prune)
+
+
+def test_result_cache_reuses_results(classifier):
+    classify = CountingClassify(classifier)
+    cache = ResultCache(classifier, maxsize=100, classify=classify)
+    
+    result = cache.classify(TEXTS[0])
+    assert_same_result(result, classifier.classify(TEXTS[0]))
+    
+    # Même texte aux espaces près, et prune qui ne change pas le résultat
+    assert cache.classify('  ' + TEXTS[0].replace(' ', '\n  ') + ' ') is result
+    assert cache.classify(TEXTS[0], top_k=1, prune=True) is cache.classify(TEXTS[0], top_k=1)
+    assert classify.calls == 2
+    
+    # Un autre top_k est un autre résultat
+    assert len(cache.classify(TEXTS[0], top_k=2).probabilities) == 2
+    assert classify.calls == 3
+
+
+def test_result_cache_is_cleared_by_a_new_model():
+    app = create_app('default', preload=False)
+    with app.app_context():
+        classifier = train(NaiveBayesClassifier(TextPreprocessingService(StopWordsService())))
+    classify = CountingClassify(classifier)
+    cache = ResultCache(classifier, maxsize=100, classify=classify)
+    
+    old = cache.classify(TEXTS[1])
+    train(classifier)
+    new = cache.classify(TEXTS[1])
+    
+    assert classify.calls == 2
+    assert new.model_version == classifier.model_version != old.model_version
+    assert cache.get_stats()['size'] == 1
+
+
+@pytest.fixture
+def asgi_app(tmp_path, monkeypatch):
+    """Application ASGI sur un modèle entraîné, avec un seul job possible à la fois"""
+    for name in ('_stop_words_service', '_preprocessing_service', '_classifier', '_result_cache',
+                 '_coalescer', '_preprocessed_cache'):
+        monkeypatch.setattr(routes, name, None)
+    
+    flask_app = create_app('default', preload=False)
+    flask_app.config.update(MODEL_DIR=str(tmp_path / 'models'), ASGI_POOL_WORKERS=1, ASGI_QUEUE_SIZE=0,
+                            ASGI_RETRY_AFTER=7)
+    app = AsgiApplication(flask_app)
+    train(app.classifier)
+    yield app
+    app.pool.shutdown()
+
+
+async def call(app, method, path, payload=None):
+    """Envoyer une requête à l'application ASGI: (statut, en-têtes, corps JSON)"""
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    scope = {'type': 'http', 'method': method, 'path': path,
+             'headers': [(b'content-length', str(len(body)).encode('latin-1'))]}
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+    
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+    
+    async def send(message):
+        sent.append(message)
+    
+    await app(scope, receive, send)
+    start = sent[0]
+    return start['status'], dict(start['headers']), json.loads(b''.join(m.get('body', b'') for m in sent[1:]))
+
+
+def test_full_pool_returns_503_with_retry_after(asgi_app):
+    async def scenario():
+        release = threading.Event()
+        busy = asyncio.ensure_future(asgi_app.pool.run(release.wait, 5))
+        while not asgi_app.pool.full:
+            await asyncio.sleep(0)
+        
+        status, headers, payload = await call(asgi_app, 'POST', '/api/classify', {'text': TEXTS[0]})
+        assert status == 503
+        assert headers[b'retry-after'] == b'7'
+        assert 'error' in payload
+        
+        # Place libérée: la même requête passe
+        release.set()
+        await busy
+        status, _, payload = await call(asgi_app, 'POST', '/api/classify', {'text': TEXTS[0]})
+        assert status == 200
+        assert payload['predicted_category'] == asgi_app.classifier.classify(TEXTS[0]).predicted_category
+    
+    asyncio.run(scenario())
+
+
+def test_pool_waits_for_a_place_when_asked():
+    async def scenario():
+        pool = BoundedPool(workers=1, queue_size=0)
+        release = threading.Event()
+        busy = asyncio.ensure_future(pool.run(release.wait, 5))
+        while not pool.full:
+            await asyncio.sleep(0)
+        
+        with pytest.raises(QueueFull):
+            await pool.run(sum, [1, 2])
+        
+        waiting = asyncio.ensure_future(pool.run(sum, [1, 2], wait=True))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        
+        release.set()
+        assert await busy is True
+        assert await waiting == 3
+        assert pool.pending == 0
+        pool.shutdown()
+    
+    asyncio.run(scenario())
@@ -0,0 +1,86 @@
+"""
+Tests du tokenizer: identique à l'ancienne chaîne regex/split/strip
+"""
+import re
+import sys
+
+import pytest
+
+from app import create_app
+from app.services.stop_words import StopWordsService
+from app.services.text_preprocessing import (PREPROCESS_SECONDS, STEM_SECONDS, TOKENIZE_SECONDS,
+                                             TextPreprocessingService)
+
+
+def legacy_tokenize(text: str):
+    """Tokenizer d'origine (remplacé par iter_tokens)"""
+    text = re.sub(r'[^\u0600-\u06FF\s]', ' ', text)
+    tokens = text.split()
+    return [token.strip() for token in tokens if token.strip()]
+
+
+@pytest.fixture(scope='module')
+def preprocessing():
+    app = create_app('default', preload=False)
+    with app.app_context():
+        return TextPreprocessingService(StopWordsService())
+
+
+@pytest.mark.parametrize('text', [
+    '',
+    'كتاب',
+    'ذهب الولد إلى المدرسة.',
+    'Le مدرسة est جميلة, isn\'t it?',
+    'abcكتابdef',
+    'عام 2024 و١٢٣ و۴۵۶',
+    'مرحبا،كيف الحال؟ «جيد»! (نعم) [لا] {ربما}; ...',
+    'كتاب\u00a0قلم\u2003بيت\u3000باب\u2028شمس\u2029قمر\u1680نور\x1c\x1d\x1e\x1f\x85ماء',
+    '\t\n\r\f\v كتاب \t\n',
+    'كتاب\u200bقلم\u200cبيت\u200dباب\ufeffشمس',
+    'كتابٌ مُدَرِّسَةٌ ـــ',
+    'كتاب\U0001F600قلم',
+])
+def test_tokenize_matches_legacy(preprocessing, text):
+    assert preprocessing.tokenize(text) == legacy_tokenize(text)
+
+
+@pytest.mark.parametrize('first, last', [
+    (0x0000, 0x0600),  # Avant le bloc arabe (ASCII, Latin, hébreu...)
+    (0x0600, 0x0700),  # Bloc arabe
+    (0x0700, 0x0800),  # Après le bloc arabe (syriaque, supplément arabe...)
+    (0x0800, 0xD800),
+    (0xE000, sys.maxunicode + 1),
+])
+def test_tokenize_every_code_point(preprocessing, first, last):
+    # Chaque caractère entre deux lettres arabes, puis isolé entre deux espaces
+    characters = [chr(code) for code in range(first, last)]
+    text = ''.join('ب' + character + 'ت' for character in characters)
+    text += ' ' + ' '.join(characters)
+    
+    assert preprocessing.tokenize(text) == legacy_tokenize(text)
+
+
+def test_iter_tokens_is_lazy(preprocessing):
+    tokens = preprocessing.iter_tokens('كتاب قلم')
+    
+    assert next(tokens) == 'كتاب'
+    assert list(tokens) == ['قلم']
+
+
+def observations(histogram):
+    return sum(histogram.snapshot()[0])
+
+
+@pytest.mark.parametrize('timing_sample, sampled', [(0, 0), (1, 4), (3, 2)])
+def test_stage_timing_is_sampled(preprocessing, timing_sample, sampled):
+    text = 'ذهب الولد إلى المدرسة'
+    expected = preprocessing.preprocess(text)
+    service = TextPreprocessingService(preprocessing.stop_words_service, timing_sample=timing_sample)
+    histograms = (PREPROCESS_SECONDS, TOKENIZE_SECONDS, STEM_SECONDS)
+    before = [observations(histogram) for histogram in histograms]
+    
+    for _ in range(4):
+        assert service.preprocess(text) == expected
+    
+    added = [observations(histogram) - count for histogram, count in zip(histograms, before)]
+    assert added == [4, sampled, sampled]